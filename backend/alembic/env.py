@@ -9,7 +9,7 @@ import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app.core.config import settings
-from app.models import Base
+from app.models import Base, FTS_TABLES
 
 config = context.config
 
@@ -18,6 +18,10 @@ if config.config_file_name is not None:
 
 target_metadata = Base.metadata
 
+def include_object(object, name, type_, reflected, compare_to):
+    # FTS5 indexes and their shadow tables are written by hand; autogenerate would drop them
+    return not (type_ == "table" and reflected and name.startswith(tuple(FTS_TABLES.values())))
+
 def run_migrations_offline() -> None:
     url = settings.DATABASE_URL
     context.configure(
@@ -25,6 +29,8 @@ def run_migrations_offline() -> None:
         target_metadata=target_metadata,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
+        include_object=include_object,
+        render_as_batch=url.startswith("sqlite"),
     )
 
     with context.begin_transaction():
@@ -41,7 +47,11 @@ def run_migrations_online() -> None:
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection,
+            target_metadata=target_metadata,
+            # SQLite can't ALTER most constraints in place; use batch mode there
+            render_as_batch=connection.dialect.name == "sqlite",
+            include_object=include_object,
         )
 
         with context.begin_transaction():
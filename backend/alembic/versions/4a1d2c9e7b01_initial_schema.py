@@ -0,0 +1,75 @@
+"""initial schema
+
+Revision ID: 4a1d2c9e7b01
+Revises: 
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4a1d2c9e7b01'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'media',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('filename', sa.String(), nullable=True),
+        sa.Column('file_path', sa.String(), nullable=True),
+        sa.Column('audio_path', sa.String(), nullable=True),
+        sa.Column('created_at', sa.Float(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_media_id'), 'media', ['id'], unique=False)
+    op.create_index(op.f('ix_media_filename'), 'media', ['filename'], unique=False)
+
+    op.create_table(
+        'transcriptions',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('media_id', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['media_id'], ['media.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_transcriptions_id'), 'transcriptions', ['id'], unique=False)
+
+    op.create_table(
+        'chunks',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('media_id', sa.Integer(), nullable=True),
+        sa.Column('text', sa.Text(), nullable=True),
+        sa.Column('start_time', sa.Float(), nullable=True),
+        sa.Column('end_time', sa.Float(), nullable=True),
+        sa.ForeignKeyConstraint(['media_id'], ['media.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_chunks_id'), 'chunks', ['id'], unique=False)
+
+    op.create_table(
+        'transcription_segments',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('transcription_id', sa.Integer(), nullable=True),
+        sa.Column('text', sa.Text(), nullable=True),
+        sa.Column('start_time', sa.Float(), nullable=True),
+        sa.Column('end_time', sa.Float(), nullable=True),
+        sa.ForeignKeyConstraint(['transcription_id'], ['transcriptions.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_transcription_segments_id'), 'transcription_segments', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_transcription_segments_id'), table_name='transcription_segments')
+    op.drop_table('transcription_segments')
+    op.drop_index(op.f('ix_chunks_id'), table_name='chunks')
+    op.drop_table('chunks')
+    op.drop_index(op.f('ix_transcriptions_id'), table_name='transcriptions')
+    op.drop_table('transcriptions')
+    op.drop_index(op.f('ix_media_filename'), table_name='media')
+    op.drop_index(op.f('ix_media_id'), table_name='media')
+    op.drop_table('media')
@@ -0,0 +1,35 @@
+"""add hot query indexes
+
+Revision ID: 8c3e5f0a2d14
+Revises: 4a1d2c9e7b01
+Create Date: 2026-10-19 09:05:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '8c3e5f0a2d14'
+down_revision = '4a1d2c9e7b01'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Media listing and relationship loads filter on these foreign keys
+    op.create_index(op.f('ix_media_created_at'), 'media', ['created_at'], unique=False)
+    op.create_index(op.f('ix_transcriptions_media_id'), 'transcriptions', ['media_id'], unique=False)
+    op.create_index(op.f('ix_chunks_media_id'), 'chunks', ['media_id'], unique=False)
+    op.create_index(
+        op.f('ix_transcription_segments_transcription_id'),
+        'transcription_segments',
+        ['transcription_id'],
+        unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_transcription_segments_transcription_id'), table_name='transcription_segments')
+    op.drop_index(op.f('ix_chunks_media_id'), table_name='chunks')
+    op.drop_index(op.f('ix_transcriptions_media_id'), table_name='transcriptions')
+    op.drop_index(op.f('ix_media_created_at'), table_name='media')
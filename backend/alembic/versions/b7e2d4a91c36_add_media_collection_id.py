@@ -0,0 +1,31 @@
+"""add media collection id
+
+Revision ID: b7e2d4a91c36
+Revises: 8c3e5f0a2d14
+Create Date: 2026-10-19 14:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e2d4a91c36'
+down_revision = '8c3e5f0a2d14'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Existing media join the default collection
+    with op.batch_alter_table('media') as batch_op:
+        batch_op.add_column(
+            sa.Column('collection_id', sa.String(), nullable=False, server_default='default')
+        )
+        batch_op.create_index(batch_op.f('ix_media_collection_id'), ['collection_id'], unique=False)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('media') as batch_op:
+        batch_op.drop_index(batch_op.f('ix_media_collection_id'))
+        batch_op.drop_column('collection_id')
@@ -0,0 +1,37 @@
+"""add audio fingerprints
+
+Revision ID: d3a8f61c2e57
+Revises: b7e2d4a91c36
+Create Date: 2026-10-19 16:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd3a8f61c2e57'
+down_revision = 'b7e2d4a91c36'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'audio_fingerprints',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('media_id', sa.Integer(), nullable=True),
+        sa.Column('hash', sa.Integer(), nullable=True),
+        sa.Column('frame', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['media_id'], ['media.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    # Lookups go by hash; deletes by media
+    op.create_index(op.f('ix_audio_fingerprints_hash'), 'audio_fingerprints', ['hash'], unique=False)
+    op.create_index(op.f('ix_audio_fingerprints_media_id'), 'audio_fingerprints', ['media_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_audio_fingerprints_media_id'), table_name='audio_fingerprints')
+    op.drop_index(op.f('ix_audio_fingerprints_hash'), table_name='audio_fingerprints')
+    op.drop_table('audio_fingerprints')
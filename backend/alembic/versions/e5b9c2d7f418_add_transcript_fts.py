@@ -0,0 +1,53 @@
+"""add transcript fts
+
+Revision ID: e5b9c2d7f418
+Revises: d3a8f61c2e57
+Create Date: 2026-10-19 21:10:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5b9c2d7f418'
+down_revision = 'd3a8f61c2e57'
+branch_labels = None
+depends_on = None
+
+TOKENIZER = "porter unicode61 remove_diacritics 2"
+FTS_TABLES = {"chunks": "chunks_fts", "transcription_segments": "transcription_segments_fts"}
+
+
+def upgrade() -> None:
+    # FTS5 is SQLite's; other databases keep lexical search in OpenSearch
+    if op.get_bind().dialect.name != "sqlite":
+        return
+    for table, fts_table in FTS_TABLES.items():
+        op.execute(
+            f"CREATE VIRTUAL TABLE {fts_table} USING fts5("
+            f"text, content='{table}', content_rowid='id', tokenize='{TOKENIZER}')"
+        )
+        op.execute(
+            f"CREATE TRIGGER {table}_fts_insert AFTER INSERT ON {table} BEGIN "
+            f"INSERT INTO {fts_table}(rowid, text) VALUES (new.id, new.text); END"
+        )
+        op.execute(
+            f"CREATE TRIGGER {table}_fts_delete AFTER DELETE ON {table} BEGIN "
+            f"INSERT INTO {fts_table}({fts_table}, rowid, text) VALUES ('delete', old.id, old.text); END"
+        )
+        op.execute(
+            f"CREATE TRIGGER {table}_fts_update AFTER UPDATE OF text ON {table} BEGIN "
+            f"INSERT INTO {fts_table}({fts_table}, rowid, text) VALUES ('delete', old.id, old.text); "
+            f"INSERT INTO {fts_table}(rowid, text) VALUES (new.id, new.text); END"
+        )
+        # Index the transcripts stored so far
+        op.execute(f"INSERT INTO {fts_table}({fts_table}) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "sqlite":
+        return
+    for table, fts_table in FTS_TABLES.items():
+        for event in ("insert", "delete", "update"):
+            op.execute(f"DROP TRIGGER IF EXISTS {table}_fts_{event}")
+        op.execute(f"DROP TABLE IF EXISTS {fts_table}")
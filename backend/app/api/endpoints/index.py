@@ -0,0 +1,65 @@
+from ...services.opensearch_service import opensearch_service, KNN_ENGINES, SPACE_TYPES, QUANTIZATION_MODES
+from ...services.reindex import reindex_service
+from fastapi import APIRouter, BackgroundTasks, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from typing import Optional
+
+router = APIRouter()
+
+@router.get("/status")
+async def index_status():
+    """
+    Show the indices behind the search alias, their kNN parameters, the
+    dedicated collection aliases and the last reindex.
+    """
+    indices = await run_in_threadpool(opensearch_service.get_alias_indices)
+    aliases = await run_in_threadpool(opensearch_service.search_aliases)
+    return {
+        "alias": opensearch_service.index_name,
+        "indices": indices,
+        "config": vars(opensearch_service.index_config),
+        "collections": {
+            alias: {
+                "indices": await run_in_threadpool(opensearch_service.get_alias_indices, alias),
+                "config": vars(opensearch_service.config_for(alias))
+            }
+            for alias in aliases[1:]
+        },
+        "reindex": reindex_service.status
+    }
+
+@router.post("/reindex", status_code=202)
+async def reindex(
+    background_tasks: BackgroundTasks,
+    engine: Optional[str] = None,
+    space_type: Optional[str] = None,
+    m: Optional[int] = None,
+    ef_construction: Optional[int] = None,
+    ef_search: Optional[int] = None,
+    quantization: Optional[str] = None,
+    collection_id: Optional[str] = None,
+    delete_old: bool = False
+):
+    """
+    Build a new index with the given kNN parameters (settings for any left out)
+    in the background, then atomically swap the search alias onto it.
+    collection_id rebuilds a dedicated collection's index instead.
+    """
+    for name, value, choices in (("engine", engine, KNN_ENGINES), ("space type", space_type, SPACE_TYPES),
+                                 ("quantization", quantization, QUANTIZATION_MODES)):
+        if value is not None and value not in choices:
+            raise HTTPException(status_code=400, detail=f"Unknown {name} '{value}'. Choose from: {', '.join(choices)}")
+    if reindex_service.running:
+        raise HTTPException(status_code=409, detail="A reindex is already running")
+    background_tasks.add_task(
+        reindex_service.run,
+        delete_old=delete_old,
+        collection_id=collection_id,
+        engine=engine,
+        space_type=space_type,
+        m=m,
+        ef_construction=ef_construction,
+        ef_search=ef_search,
+        quantization=quantization
+    )
+    return {"message": "Reindex started"}
@@ -0,0 +1,34 @@
+from ...core.profiling import list_profiles, profile_path
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import FileResponse
+import json
+
+router = APIRouter()
+
+@router.get("/")
+async def get_profiles():
+    """
+    List saved request profiles with their per-stage timings and allocation peaks.
+    """
+    return list_profiles()
+
+@router.get("/{profile_id}")
+async def get_profile(profile_id: str):
+    """
+    Return a profile summary, including the top functions by cumulative time.
+    """
+    path = profile_path(profile_id, "json")
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    with open(path) as f:
+        return json.load(f)
+
+@router.get("/{profile_id}/download")
+async def download_profile(profile_id: str):
+    """
+    Download the raw pstats file (open with snakeviz or pstats).
+    """
+    path = profile_path(profile_id, "prof")
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="application/octet-stream", filename=f"{profile_id}.prof")
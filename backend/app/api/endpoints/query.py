@@ -1,11 +1,28 @@
 from ...services.embedding import embedding_service
-from ...services.opensearch_service import opensearch_service
-from fastapi import APIRouter, Depends, HTTPException, Query
-from typing import List, Optional, Dict
+from ...services.opensearch_service import opensearch_service, COLLECTION_ID_PATTERN
+from ...services.scheduler import embedding_scheduler
+from ...services.result_grouping import RANK_MODES, group_results
+from ...services.reranker import reranker_service
+from ...services.lexical_search import lexical_search_service, LEXICAL_SOURCES
+from ...db.session import get_async_db
+from ...core.config import settings
+from ...core.metrics import SEARCH_MODE
+from fastapi import APIRouter, Depends, HTTPException, Query, Header
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from opensearchpy.exceptions import ConnectionError as OpenSearchConnectionError
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import AsyncIterator, List, Optional, Dict
+import json
+import logging
 from pydantic import BaseModel
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
+SEARCH_MODES = ("semantic", "lexical")
+
 class SearchResult(BaseModel):
     text: str
     media_id: str
@@ -17,20 +34,135 @@ class SearchResult(BaseModel):
         from_attributes = True
 
 @router.post("/search")
-async def search_media(query: str, min_score: float = 0.6, k: int = 5):
-    try:
-        # Generate embedding for query
-        query_vector = embedding_service.generate_embedding(query)
+async def search_media(
+    query: str,
+    min_score: float = Query(0.6, description="Minimum vector similarity (0-1) of semantic hits"),
+    k: int = 5,
+    group: bool = Query(False, description="Group hits by media; k is then the number of media"),
+    rank_by: str = Query("best", description=f"Media ranking when grouping: {', '.join(RANK_MODES)}"),
+    max_hits_per_media: int = Query(3, ge=1, description="Spans returned per media when grouping"),
+    merge_gap: float = Query(settings.SEARCH_MERGE_GAP_SECONDS, ge=0,
+                             description="Hits closer than this many seconds merge into one span"),
+    stream: bool = Query(False, description="Stream results as NDJSON, one per line"),
+    rerank: Optional[bool] = Query(None, description="Re-rank candidates with a cross-encoder"),
+    candidates: Optional[int] = Query(None, ge=1, description="kNN candidates to fetch for re-ranking or grouping"),
+    collection_id: Optional[str] = Query(None, pattern=COLLECTION_ID_PATTERN,
+                                         description="Search only this collection (all collections if omitted)"),
+    mode: str = Query("semantic", description=f"Search mode: {', '.join(SEARCH_MODES)}"),
+    source: str = Query("chunks", description=f"What lexical mode searches: {', '.join(LEXICAL_SOURCES)}"),
+    tenant: str = Header("default", alias=settings.TENANT_HEADER),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Semantic (kNN over chunk embeddings) or lexical search. Lexical mode
+    ranks chunks or transcript segments by BM25 with SQLite's full-text
+    index, supports "quoted phrases" and word* prefixes, ignores min_score
+    and returns each hit's snippet and match offsets. It needs neither
+    OpenSearch nor the embedding model; semantic searches fall back to it
+    when OpenSearch is unreachable.
+    
+    min_score drops semantic hits below that vector similarity before
+    anything else, so it applies alike to flat, grouped and re-ranked
+    results. With stream, flat results are written as they are produced;
+    grouping and re-ranking need all candidates first.
+    """
+    if rank_by not in RANK_MODES:
+        raise HTTPException(status_code=400, detail=f"Unknown rank mode '{rank_by}'. Choose from: {', '.join(RANK_MODES)}")
+    if mode not in SEARCH_MODES:
+        raise HTTPException(status_code=400, detail=f"Unknown mode '{mode}'. Choose from: {', '.join(SEARCH_MODES)}")
+    if source not in LEXICAL_SOURCES:
+        raise HTTPException(status_code=400, detail=f"Unknown source '{source}'. Choose from: {', '.join(LEXICAL_SOURCES)}")
+    if mode == "lexical" and not lexical_search_service.available(db):
+        raise HTTPException(status_code=400, detail="Lexical search needs an SQLite database")
+    
+    use_rerank = settings.RERANK_ENABLED if rerank is None else rerank
+    
+    async def search() -> AsyncIterator[Dict]:
+        # Grouping needs enough chunk hits to fill k media; re-ranking needs a
+        # candidate pool to reorder
+        pool = k
+        if group:
+            pool = k * settings.SEARCH_GROUP_OVERSAMPLE
+        if use_rerank:
+            pool = max(pool, settings.RERANK_CANDIDATES)
+        pool = min(candidates or pool, settings.SEARCH_MAX_CANDIDATES)
         
-        # Search OpenSearch
-        results = opensearch_service.search_similar(
-            query_vector=query_vector,
-            query_text=query,
-            k=k,
-            min_score=min_score
-        )
+        answered_by = mode
+        if mode == "lexical":
+            hits = lexical_search_service.stream(db, query, k=pool, collection_id=collection_id, source=source)
+        else:
+            try:
+                hits = _each(await _semantic_search(query, pool, min_score, collection_id, tenant))
+            except OpenSearchConnectionError as e:
+                if not (settings.SEARCH_LEXICAL_FALLBACK and lexical_search_service.available(db)):
+                    raise
+                logger.warning("OpenSearch is unreachable (%s); answering lexically", e)
+                answered_by = "lexical_fallback"
+                hits = lexical_search_service.stream(db, query, k=pool, collection_id=collection_id)
+        SEARCH_MODE.labels(mode=answered_by).inc()
         
-        return results  # Return the list directly instead of grouping by media_id
+        if not (use_rerank or group):
+            # Return the list directly instead of grouping by media_id
+            count = 0
+            async for result in hits:
+                yield result
+                count += 1
+                if count == k:
+                    return
+            return
         
+        results = [result async for result in hits]
+        if use_rerank and results:
+            results = await embedding_scheduler.run(
+                reranker_service.rerank,
+                query,
+                results,
+                k=k,
+                priority="interactive",
+                tenant=tenant
+            )
+        if group:
+            results = group_results(results, rank_by=rank_by, max_hits_per_media=max_hits_per_media,
+                                    merge_gap=merge_gap)
+        for result in results[:k]:
+            yield result
+    
+    if stream:
+        return StreamingResponse(_ndjson(search()), media_type="application/x-ndjson")
+    
+    try:
+        return [result async for result in search()]
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+async def _each(results: List[Dict]) -> AsyncIterator[Dict]:
+    for result in results:
+        yield result
+
+async def _semantic_search(query: str, k: int, min_score: float, collection_id: Optional[str],
+                           tenant: str) -> List[Dict]:
+    # Generate embedding for query; interactive, so it runs ahead of batch uploads
+    query_vector = await embedding_scheduler.run(
+        embedding_service.generate_embedding,
+        query,
+        priority="interactive",
+        tenant=tenant
+    )
+    
+    # Search OpenSearch
+    return await run_in_threadpool(
+        opensearch_service.search_similar,
+        query_vector=query_vector,
+        query_text=query,
+        k=k,
+        min_score=min_score,
+        collection_id=collection_id
+    )
+
+async def _ndjson(results: AsyncIterator[Dict]) -> AsyncIterator[bytes]:
+    """One JSON document per line; errors after the headers are sent become an error line"""
+    try:
+        async for item in results:
+            yield (json.dumps(item) + "\n").encode()
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+        yield (json.dumps({"error": str(e)}) + "\n").encode()
@@ -1,96 +1,131 @@
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, BackgroundTasks, Query, Header, Request
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
 from ...services.media_processor import MediaProcessor
-from ...services.transcription import TranscriptionService
-from ...services.chunking import ChunkingService
-from ...services.embedding import embedding_service
-from ...services.opensearch_service import opensearch_service
-from ...crud import crud_media
-from ...schemas.media import MediaCreate, MediaInDB
-from ...db.session import get_db
-from typing import List
+from ...services.transcription import TRANSCRIPTION_TIERS, resolve_tier
+from ...services.ingest import ingest_service, IngestError
+from ...services.opensearch_service import COLLECTION_ID_PATTERN
+from ...services.deletion import deletion_service
+from ...services.streaming import stream_file, byte_offset
+from ...services.clips import clip_service
+from ...services.audio_storage import audio_storage_service
+from ...services.scheduler import PRIORITY_CLASSES
+from ...crud import async_crud_media
+from ...schemas.media import MediaInDB
+from ...db.session import get_async_db
+from ...core.config import settings
+from typing import List, Optional
+import os
 
 router = APIRouter()
-transcription_service = TranscriptionService()
-chunking_service = ChunkingService()
 
 @router.post("/upload", response_model=MediaInDB)
 async def upload_media(
     file: UploadFile = File(...),
-    db: Session = Depends(get_db)
+    tier: Optional[str] = Query(None, description=f"Transcription speed/accuracy tier: {', '.join(TRANSCRIPTION_TIERS)}"),
+    model_size: Optional[str] = Query(None, description="Whisper model size; overrides the tier's"),
+    priority: str = Query("interactive", description=f"Scheduling class: {', '.join(PRIORITY_CLASSES)}"),
+    tenant: str = Header("default", alias=settings.TENANT_HEADER),
+    collection_id: str = Query(settings.DEFAULT_COLLECTION, pattern=COLLECTION_ID_PATTERN,
+                               description="Collection the media is indexed and searched in"),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Upload a media file, process it, and store results in database and OpenSearch.
+    Transcription and embedding wait for a scheduler slot so concurrent uploads
+    don't oversubscribe the CPU. Long media is processed in windows that are
+    searchable as soon as they finish; uploading the same file again after a
+    failure resumes from the last finished window. A re-encoded or trimmed
+    copy of a processed recording reuses its transcription.
     """
+    model_size, decoding_options = resolve_tier(tier, model_size)
+    if priority not in PRIORITY_CLASSES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown priority '{priority}'. Choose from: {', '.join(PRIORITY_CLASSES)}"
+        )
     try:
-        # Save and process file
         file_path = await MediaProcessor.save_upload(file)
-        audio_path = MediaProcessor.extract_audio(file_path)
-        
-        # Transcribe audio
-        segments = transcription_service.transcribe_audio(audio_path)
-        
-        # Create chunks
-        chunks = chunking_service.create_chunks(segments)
-        
-        # Generate embeddings for chunks
-        chunk_texts = [chunk.text for chunk in chunks]
-        chunk_embeddings = embedding_service.generate_embeddings_batch(chunk_texts)
-        
-        # Prepare media data
-        media_create = MediaCreate(
-            filename=file.filename,
-            file_path=file_path,
-            audio_path=audio_path
+        media_id = await ingest_service.ingest(
+            db, file_path, file.filename,
+            model_size=model_size,
+            decoding_options=decoding_options,
+            collection_id=collection_id,
+            priority=priority,
+            tenant=tenant
         )
-        
-        # Save to database
-        db_media = crud_media.create_with_transcription(
-            db=db,
-            media=media_create,
-            segments=segments,
-            chunks=[{
-                "text": chunk.text,
-                "start_time": chunk.start_time,
-                "end_time": chunk.end_time
-            } for chunk in chunks]
-        )
-        
-        # Index chunks in OpenSearch
-        for chunk, embedding in zip(chunks, chunk_embeddings):
-            vector = embedding_service.generate_embedding(chunk.text)
-            opensearch_service.index_chunk(
-                chunk_id=chunk.segment_ids[0],
-                media_id=db_media.id,
-                text=chunk.text,
-                start_time=chunk.start_time,
-                end_time=chunk.end_time,
-                vector=vector
-            )
-        
-        return db_media
-        
+        return await async_crud_media.get_with_relations(db, media_id)
+    except IngestError as e:
+        if isinstance(e.error, HTTPException) and e.error.status_code < 500:
+            raise e.error
+        raise _processing_error(str(e), e.media_id)
+    except HTTPException as e:
+        if e.status_code < 500:
+            raise
+        raise _processing_error(e.detail, None)
     except Exception as e:
-        # Clean up any indexed chunks if database operation failed
-        if 'db_media' in locals():
-            try:
-                opensearch_service.delete_by_media_id(db_media.id)
-            except:
-                pass  # Ignore cleanup errors
+        raise _processing_error(str(e), None)
+
+def _processing_error(detail: str, media_id: Optional[int]) -> HTTPException:
+    # Finished windows stay stored and searchable; the checkpoint lets a retry resume
+    if media_id is not None:
+        detail = f"{detail}. Media {media_id} is partially processed; upload the same file again to resume"
+    return HTTPException(
+        status_code=500,
+        detail=f"Error processing media: {detail}"
+    )
+
+@router.get("/storage")
+async def media_storage(
+    skip: int = 0,
+    limit: int = 100,
+    collection_id: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Disk used by each media's original upload and extracted audio, with
+    totals and the state of the last audio compaction.
+    """
+    rows = await async_crud_media.get_file_paths(db, collection_id=collection_id)
+    # The storage gauges hold totals over all media
+    return await run_in_threadpool(
+        audio_storage_service.report, rows, skip, limit, update_metrics=collection_id is None
+    )
+
+@router.post("/storage/compact", status_code=202)
+async def compact_audio(
+    background_tasks: BackgroundTasks,
+    storage_format: str = Query(settings.AUDIO_STORAGE_FORMAT, alias="format",
+                                description="flac, opus or wav"),
+    drop: bool = Query(False, description="Delete extracted audio instead of re-encoding it")
+):
+    """
+    Re-encode the extracted audio of existing media to the storage format
+    (or drop it) in the background.
+    """
+    if storage_format not in MediaProcessor.AUDIO_FORMATS:
         raise HTTPException(
-            status_code=500,
-            detail=f"Error processing media: {str(e)}"
+            status_code=400,
+            detail=f"Unknown format '{storage_format}'. Choose from: {', '.join(MediaProcessor.AUDIO_FORMATS)}"
         )
+    if audio_storage_service.running:
+        raise HTTPException(status_code=409, detail="Audio compaction is already running")
+    background_tasks.add_task(
+        audio_storage_service.compact,
+        storage_format=storage_format,
+        keep=settings.AUDIO_KEEP_AFTER_INGEST and not drop
+    )
+    return {"message": "Audio compaction started"}
 
 @router.get("/{media_id}", response_model=MediaInDB)
 async def get_media(
     media_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Retrieve media and its associated transcription/chunks by ID.
     """
-    db_media = crud_media.get_with_relations(db, media_id)
+    db_media = await async_crud_media.get_with_relations(db, media_id)
     if not db_media:
         raise HTTPException(
             status_code=404,
@@ -98,37 +133,144 @@ async def get_media(
         )
     return db_media
 
+MEDIA_SOURCES = ("original", "audio")
+
+async def _media_file(db: AsyncSession, media_id: int, source: str):
+    """The media row and the path of its original upload or extracted audio"""
+    if source not in MEDIA_SOURCES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown source '{source}'. Choose from: {', '.join(MEDIA_SOURCES)}"
+        )
+    db_media = await async_crud_media.get(db, media_id)
+    if not db_media:
+        raise HTTPException(status_code=404, detail="Media not found")
+    path = db_media.file_path if source == "original" else db_media.audio_path
+    if not path or not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail="Media file not found")
+    return db_media, path
+
+def _byte_offset(db_media, path: str, t: float):
+    # The extracted audio has the upload's duration and cheap metadata to read
+    return byte_offset(path, t, MediaProcessor.audio_duration(db_media.audio_path or db_media.file_path))
+
+@router.api_route("/{media_id}/stream", methods=["GET", "HEAD"])
+async def stream_media(
+    media_id: int,
+    request: Request,
+    source: str = Query("original", description=f"File to stream: {', '.join(MEDIA_SOURCES)}"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Stream an uploaded file for playback, with byte ranges (206), ETag and
+    Last-Modified. Players jump to a search hit's start_time by seeking
+    themselves, or with a Range from the /seek offset, without downloading
+    the whole file.
+    """
+    _, path = await _media_file(db, media_id, source)
+    return stream_file(path, request.headers)
+
+def _parse_spans(spans: List[str]) -> List[tuple]:
+    parsed = []
+    for span in spans:
+        try:
+            start, end = (float(value) for value in span.split("-", 1))
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Invalid span '{span}'; expected <start>-<end> in seconds")
+        if not 0 <= start < end:
+            raise HTTPException(status_code=400, detail=f"Invalid span '{span}'; start must be before end")
+        parsed.append((start, end))
+    if len(parsed) > settings.CLIP_MAX_SPANS:
+        raise HTTPException(status_code=400, detail=f"At most {settings.CLIP_MAX_SPANS} spans per clip")
+    return parsed
+
+@router.get("/{media_id}/clip")
+async def get_clip(
+    media_id: int,
+    request: Request,
+    spans: List[str] = Query(..., alias="span",
+                             description="start-end in seconds, e.g. a search hit's start_time-end_time; repeatable"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    A clip of the given time spans of the original upload, cut without
+    re-encoding. Each span starts at the keyframe at or before its start;
+    several spans are joined into one clip. Clips are cached on disk.
+    """
+    parsed = _parse_spans(spans)
+    _, path = await _media_file(db, media_id, "original")
+    clip_path = await run_in_threadpool(clip_service.extract, path, parsed)
+    return stream_file(clip_path, request.headers)
+
+@router.get("/{media_id}/seek")
+async def seek_media(
+    media_id: int,
+    t: float = Query(..., ge=0, description="Time in seconds"),
+    source: str = Query("original", description=f"File to seek in: {', '.join(MEDIA_SOURCES)}"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Byte offset of a time in the streamed file, to request as "Range: bytes=<offset>-".
+    Exact for WAV audio and for containers whose packet positions ffprobe
+    reads (the keyframe at or before t); interpolated from the duration, and
+    not exact, otherwise. Compressed files only play from there once the
+    player has their headers (e.g. an MP4's moov box).
+    """
+    db_media, path = await _media_file(db, media_id, source)
+    offset, exact = await run_in_threadpool(_byte_offset, db_media, path, t)
+    return {"t": t, "byte_offset": offset, "exact": exact, "range": f"bytes={offset}-"}
+
 @router.get("/", response_model=List[MediaInDB])
 async def list_media(
     skip: int = 0,
     limit: int = 10,
-    db: Session = Depends(get_db)
+    collection_id: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
-    List all media files with their transcriptions and chunks.
+    List all media files (optionally of one collection) with their transcriptions and chunks.
     """
-    return crud_media.get_multi(db, skip=skip, limit=limit)
+    return await async_crud_media.get_multi(db, skip=skip, limit=limit, collection_id=collection_id)
+
+@router.delete("/")
+async def delete_media_bulk(
+    background_tasks: BackgroundTasks,
+    ids: List[int] = Query(..., description="Media ids to delete"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Delete many media files and their associated data in batches.
+    Physical files are removed in the background after the response is sent.
+    """
+    try:
+        deleted_ids = await deletion_service.delete_media(db, ids, background_tasks)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error deleting media: {str(e)}"
+        )
+    missing_ids = sorted(set(ids) - set(deleted_ids))
+    return {"deleted": deleted_ids, "not_found": missing_ids}
 
 @router.delete("/{media_id}")
 async def delete_media(
     media_id: int,
-    db: Session = Depends(get_db)
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Delete a media file and its associated data.
     """
     try:
-        media = crud_media.remove(db, id=media_id)
-        if not media:
-            raise HTTPException(
-                status_code=404,
-                detail="Media not found"
-            )
-        # Also delete the physical files
-        MediaProcessor.delete_files(media.file_path, media.audio_path)
-        return {"message": "Media deleted successfully"}
+        deleted_ids = await deletion_service.delete_media(db, [media_id], background_tasks)
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Error deleting media: {str(e)}"
-        ) 
\ No newline at end of file
+        )
+    if not deleted_ids:
+        raise HTTPException(
+            status_code=404,
+            detail="Media not found"
+        )
+    return {"message": "Media deleted successfully"}
@@ -0,0 +1,296 @@
+"""
+Command-line tools that run the processing pipeline without the HTTP API.
+
+    python -m app.cli ingest /archive/lectures --workers 4 --collection lectures
+    python -m app.cli export /backups/snapshot
+    python -m app.cli import /backups/snapshot
+
+ingest walks a directory and processes every media file in a pool of worker
+processes, each with its own models, event loop and database connections.
+A manifest records finished files, so an interrupted run picks up where it
+stopped; a file that failed part-way resumes from its transcription
+checkpoint.
+
+export and import move the database and chunk index between environments
+as a snapshot, so a new node starts with everything searchable without
+transcribing or embedding it again.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional, Tuple
+from .core.config import settings
+# Nothing from app.services at module level: importing it builds the models
+# and schedulers, which workers must only do after _init_worker
+
+class IngestManifest:
+    """
+    Append-only JSON-lines log of ingest results keyed by path relative to
+    the ingested directory; the last entry for a path wins. A file counts as
+    done only while its size and mtime match the entry.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # Torn last line of a killed run
+                    self.entries[entry["path"]] = entry
+
+    def is_done(self, relative_path: str, stat: os.stat_result) -> bool:
+        entry = self.entries.get(relative_path)
+        return entry is not None and entry["status"] == "done" \
+            and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime
+
+    def status(self, relative_path: str) -> Optional[str]:
+        entry = self.entries.get(relative_path)
+        return entry["status"] if entry else None
+
+    def record(self, entry: Dict[str, Any]):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "a") as f:
+            f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.entries[entry["path"]] = entry
+
+def default_manifest_path(directory: str) -> str:
+    digest = hashlib.sha256(os.path.abspath(directory).encode()).hexdigest()[:16]
+    return os.path.join(settings.CHECKPOINT_DIR, f"ingest-{digest}.jsonl")
+
+def find_media(directory: str) -> List[str]:
+    """Media files under directory, as sorted relative paths"""
+    from .services.media_processor import MediaProcessor
+
+    found = []
+    for root, dirs, files in os.walk(directory):
+        dirs[:] = [name for name in dirs if not name.startswith(".")]
+        for name in files:
+            if os.path.splitext(name)[1].lower() in MediaProcessor.ALLOWED_EXTENSIONS:
+                found.append(os.path.relpath(os.path.join(root, name), directory))
+    return sorted(found)
+
+def upload_path(relative_path: str) -> str:
+    """
+    Where an ingested file is placed in UPLOAD_FOLDER. Directories are folded
+    into the name so same-named files from different folders don't collide.
+    """
+    return os.path.join(settings.UPLOAD_FOLDER, relative_path.replace(os.sep, "__"))
+
+def place_upload(source: str, destination: str):
+    """
+    Hard-link (or copy, across filesystems) a file into UPLOAD_FOLDER, so
+    deleting the media later never touches the archive.
+    """
+    os.makedirs(os.path.dirname(destination) or ".", exist_ok=True)
+    if os.path.exists(destination):
+        os.remove(destination)
+    try:
+        os.link(source, destination)
+    except OSError:
+        shutil.copy2(source, destination)
+
+_worker_loop: Optional[asyncio.AbstractEventLoop] = None
+
+def _init_worker(core_budget: int):
+    # Runs before the pipeline is imported (spawned workers import this module,
+    # which keeps app.services out), so its schedulers and models pick these
+    # up: one file at a time per worker, with its share of the cores
+    settings.TRANSCRIPTION_CONCURRENCY = 1
+    settings.TRANSCRIPTION_CORE_BUDGET = core_budget
+    settings.EMBEDDING_PROCESSES = 0
+    global _worker_loop
+    _worker_loop = asyncio.new_event_loop()
+
+def _ingest_file(source: str, relative_path: str, options: Dict[str, Any]) -> Dict[str, Any]:
+    """Process one file in a worker; failures are returned rather than raised"""
+    from .services.ingest import ingest_service, IngestError
+    from .services.media_processor import MediaProcessor
+    from .db.session import AsyncSessionLocal
+
+    start = time.perf_counter()
+    result: Dict[str, Any] = {"media_id": None}
+    try:
+        destination = upload_path(relative_path)
+        place_upload(source, destination)
+
+        async def run():
+            async with AsyncSessionLocal() as db:
+                return await ingest_service.ingest(
+                    db, destination, os.path.basename(relative_path), priority="batch", **options
+                )
+
+        result["media_id"] = _worker_loop.run_until_complete(run())
+        result["status"] = "done"
+        try:
+            result["audio_seconds"] = MediaProcessor.audio_duration(destination)
+        except Exception:
+            result["audio_seconds"] = None
+    except IngestError as e:
+        result.update(status="failed", error=str(e), media_id=e.media_id)
+    except Exception as e:
+        result.update(status="failed", error=getattr(e, "detail", None) or str(e))
+    result["seconds"] = round(time.perf_counter() - start, 3)
+    return result
+
+def _clock(seconds: float) -> str:
+    seconds = int(seconds)
+    return f"{seconds // 3600}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+def ingest_directory(directory: str, workers: int = settings.INGEST_WORKERS,
+                     manifest_path: Optional[str] = None, retry_failed: bool = True,
+                     **options) -> Dict[str, Any]:
+    """
+    Ingest every media file under directory that the manifest doesn't list
+    as done, printing progress, and return a throughput summary. options
+    are passed to IngestService.ingest (model_size, decoding_options,
+    collection_id).
+    """
+    manifest = IngestManifest(manifest_path or default_manifest_path(directory))
+    pending: List[Tuple[str, str, os.stat_result]] = []
+    skipped = 0
+    for relative_path in find_media(directory):
+        source = os.path.join(directory, relative_path)
+        stat = os.stat(source)
+        if manifest.is_done(relative_path, stat) or \
+                (not retry_failed and manifest.status(relative_path) == "failed"):
+            skipped += 1
+        else:
+            pending.append((relative_path, source, stat))
+    print(f"{len(pending)} files to ingest, {skipped} skipped (manifest: {manifest.path})")
+
+    summary: Dict[str, Any] = {
+        "files": len(pending) + skipped, "ingested": 0, "failed": 0, "skipped": skipped,
+        "audio_seconds": 0.0, "workers": workers,
+    }
+    start = time.perf_counter()
+    if pending:
+        core_budget = max(1, (settings.TRANSCRIPTION_CORE_BUDGET or os.cpu_count() or 1) // workers)
+        # Spawned workers load their own models and open their own connections
+        # instead of inheriting the parent's threads and sockets
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=_init_worker, initargs=(core_budget,)) as pool:
+            futures = {
+                pool.submit(_ingest_file, source, relative_path, options): (relative_path, stat)
+                for relative_path, source, stat in pending
+            }
+            try:
+                for finished, future in enumerate(as_completed(futures), start=1):
+                    relative_path, stat = futures[future]
+                    result = future.result()
+                    manifest.record({"path": relative_path, "size": stat.st_size, "mtime": stat.st_mtime, **result})
+                    if result["status"] == "done":
+                        summary["ingested"] += 1
+                        summary["audio_seconds"] += result["audio_seconds"] or 0.0
+                        detail = f"media {result['media_id']}"
+                        if result["audio_seconds"]:
+                            detail += f", {result['audio_seconds']:.1f}s audio"
+                    else:
+                        summary["failed"] += 1
+                        detail = result["error"]
+                    elapsed = time.perf_counter() - start
+                    eta = elapsed / finished * (len(pending) - finished)
+                    print(f"[{finished}/{len(pending)}] {result['status']:<6} {relative_path} "
+                          f"({detail}; {result['seconds']:.1f}s) elapsed {_clock(elapsed)}, eta {_clock(eta)}",
+                          flush=True)
+            except KeyboardInterrupt:
+                # Finished files are in the manifest; the next run continues from there
+                pool.shutdown(wait=False, cancel_futures=True)
+                summary["interrupted"] = True
+
+    wall = time.perf_counter() - start
+    summary["wall_seconds"] = round(wall, 3)
+    summary["files_per_hour"] = round(summary["ingested"] / wall * 3600, 1) if wall > 0 else 0.0
+    # Seconds of media processed per wall-clock second
+    summary["realtime_factor"] = round(summary["audio_seconds"] / wall, 2) if wall > 0 else 0.0
+    return summary
+
+def snapshot(args: argparse.Namespace) -> int:
+    from .services.snapshot import snapshot_service
+    if args.command == "export":
+        result = snapshot_service.export(args.directory, collection_id=args.collection, batch_size=args.batch_size)
+        verb = "Exported"
+    else:
+        try:
+            result = snapshot_service.import_snapshot(args.directory, batch_size=args.batch_size)
+        except ValueError as e:
+            print(f"Cannot import {args.directory}: {e}", file=sys.stderr)
+            return 1
+        verb = "Imported"
+    counts = result["counts"]
+    print(f"{verb} {counts['media']} media, {counts['chunks']} chunks and {counts['vectors']} vectors "
+          f"({args.directory}) in {result['seconds']:.1f}s")
+    return 0
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description=__doc__.split("\n\n")[0].strip())
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    ingest = commands.add_parser("ingest", help="Ingest every media file under a directory")
+    ingest.add_argument("directory")
+    ingest.add_argument("--workers", type=int, default=settings.INGEST_WORKERS, help="Worker processes")
+    ingest.add_argument("--manifest", help="Resume manifest (default: one per directory in CHECKPOINT_DIR)")
+    ingest.add_argument("--collection", default=settings.DEFAULT_COLLECTION)
+    ingest.add_argument("--tier", help="Transcription speed/accuracy tier")
+    ingest.add_argument("--model-size", help="Whisper model size; overrides the tier's")
+    ingest.add_argument("--skip-failed", action="store_true", help="Don't retry files that failed in an earlier run")
+    ingest.add_argument("--output", help="Write the summary as JSON to this file")
+
+    export = commands.add_parser("export", help="Write a snapshot of media, transcripts and the chunk index")
+    export.add_argument("directory")
+    export.add_argument("--collection", help="Export only this collection")
+    export.add_argument("--batch-size", type=int, default=settings.SNAPSHOT_BATCH_SIZE)
+
+    load = commands.add_parser("import", help="Load a snapshot into the database and chunk index")
+    load.add_argument("directory")
+    load.add_argument("--batch-size", type=int, default=settings.SNAPSHOT_BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    if args.command in ("export", "import"):
+        return snapshot(args)
+
+    if not os.path.isdir(args.directory):
+        parser.error(f"Not a directory: {args.directory}")
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    from .services.transcription import resolve_tier
+    from .services.opensearch_service import COLLECTION_ID_PATTERN
+    try:
+        model_size, decoding_options = resolve_tier(args.tier, args.model_size)
+    except Exception as e:
+        parser.error(getattr(e, "detail", str(e)))
+    if not re.match(COLLECTION_ID_PATTERN, args.collection):
+        parser.error(f"Invalid collection id '{args.collection}'")
+
+    summary = ingest_directory(
+        args.directory,
+        workers=args.workers,
+        manifest_path=args.manifest,
+        retry_failed=not args.skip_failed,
+        model_size=model_size,
+        decoding_options=decoding_options,
+        collection_id=args.collection
+    )
+    print(f"\nIngested {summary['ingested']} of {summary['files']} files "
+          f"({summary['skipped']} skipped, {summary['failed']} failed) in {_clock(summary['wall_seconds'])}")
+    print(f"{summary['files_per_hour']} files/hour, {_clock(summary['audio_seconds'])} of media "
+          f"at {summary['realtime_factor']}x real time with {summary['workers']} workers")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(summary, f, indent=2)
+    return 1 if summary["failed"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,3 +1,4 @@
+from pydantic import field_validator
 from pydantic_settings import BaseSettings
 from functools import lru_cache
 import os
@@ -14,6 +15,24 @@ class Settings(BaseSettings):
     
     UPLOAD_FOLDER: str = "uploads"
     DATABASE_URL: str = "sqlite:///multimedia_query.db"
+    ASYNC_DATABASE_URL: str = ""  # Derived from DATABASE_URL when empty
+    
+    # Database engine settings
+    DB_POOL_SIZE: int = 10          # Persistent connections per process (Postgres)
+    DB_MAX_OVERFLOW: int = 20       # Extra connections allowed under burst load
+    DB_POOL_TIMEOUT: int = 30       # Seconds to wait for a pooled connection
+    DB_POOL_RECYCLE: int = 1800     # Recycle connections older than this (seconds)
+    DB_POOL_PRE_PING: bool = True   # Validate connections before handing them out
+    DB_ECHO: bool = False
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    
+    # Profiling (per request via header, or every upload/search when enabled)
+    PROFILING_ENABLED: bool = False
+    PROFILING_HEADER: str = "X-Profile"
+    PROFILE_DIR: str = "profiles"
+    PROFILE_TOP_FUNCTIONS: int = 40
     
     # Chunking settings
     CHUNK_SIZE_SECONDS: int = 30
@@ -27,9 +46,127 @@ class Settings(BaseSettings):
     OPENSEARCH_USER: str = os.getenv("OPENSEARCH_USER", "")
     OPENSEARCH_PASSWORD: str = os.getenv("OPENSEARCH_PASSWORD", "")
     AWS_REGION: str = os.getenv("AWS_REGION", "us-east-1")
+    OPENSEARCH_BACKEND: str = "opensearch"  # "local" uses an in-process stand-in
+    
+    # kNN index parameters (applied when a new versioned index is built)
+    OPENSEARCH_KNN_ENGINE: str = "nmslib"
+    OPENSEARCH_SPACE_TYPE: str = "innerproduct"  # Embeddings are unit-normalized
+    OPENSEARCH_HNSW_M: int = 24
+    OPENSEARCH_HNSW_EF_CONSTRUCTION: int = 128
+    OPENSEARCH_HNSW_EF_SEARCH: int = 100
+    OPENSEARCH_CONFIG_REFRESH_SECONDS: int = 60  # How often to re-read the live index parameters
+    OPENSEARCH_NUMBER_OF_SHARDS: int = 1
+    
+    # Collections: routed by collection_id within the shared index, except
+    # dedicated ones, which get an index (alias "<OPENSEARCH_INDEX>-collection-<id>") of their own
+    DEFAULT_COLLECTION: str = "default"
+    DEDICATED_COLLECTIONS: list = []
+    REINDEX_BATCH_SIZE: int = 500
+    
+    # Near-duplicate chunks (MinHash over word shingles) reuse an indexed
+    # chunk's vector instead of being embedded and indexed again
+    DEDUP_ENABLED: bool = True
+    DEDUP_THRESHOLD: float = 0.9         # Estimated Jaccard similarity that counts as a duplicate
+    DEDUP_NUM_PERM: int = 64
+    DEDUP_BANDS: int = 16                # LSH bands; num_perm / bands rows each
+    DEDUP_SHINGLE_SIZE: int = 3          # Words per shingle
+    DEDUP_MAX_CANDIDATES: int = 1000     # Indexed chunks compared per transcription window
+    
+    # Audio fingerprints: uploads that are a re-encoded or trimmed copy of a
+    # processed recording reuse its transcription
+    FINGERPRINT_ENABLED: bool = True
+    FINGERPRINT_PROBE_SECONDS: float = 60.0     # Audio looked up from the start, middle and end of an upload
+    FINGERPRINT_MIN_MATCHES: int = 20           # Hashes that must align at one offset
+    FINGERPRINT_MIN_MATCH_RATIO: float = 0.1    # ... as a fraction of the hashes looked up
+    FINGERPRINT_TRIM_TOLERANCE_SECONDS: float = 2.0
+    
+    # Clips of search hits (ffmpeg stream copy), cached on disk
+    CLIP_CACHE_DIR: str = "clips"
+    CLIP_CACHE_MAX_MB: int = 2048          # Least recently used clips are evicted past this
+    CLIP_MAX_SPANS: int = 20               # Time spans per clip
+    CLIP_MERGE_GAP_SECONDS: float = 2.0    # Spans closer than this are cut as one
+    CLIP_CACHE_GRACE_SECONDS: float = 60.0 # Clips served this recently are never evicted
+    
+    # Search result grouping
+    SEARCH_GROUP_OVERSAMPLE: int = 10     # Chunk candidates fetched per requested media
+    SEARCH_MAX_CANDIDATES: int = 1000
+    SEARCH_MERGE_GAP_SECONDS: float = 1.0
+    
+    # Lexical transcript search (SQLite FTS5 with BM25), also the fallback when OpenSearch is down
+    LEXICAL_SNIPPET_TOKENS: int = 12      # Tokens of context around the matches in a snippet
+    SEARCH_LEXICAL_FALLBACK: bool = True  # Answer semantic searches lexically when OpenSearch is unreachable
+    
+    # Cross-encoder re-ranking of kNN candidates
+    RERANK_ENABLED: bool = False  # Default for requests that don't say
+    RERANK_MODEL: str = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+    RERANK_CANDIDATES: int = 50   # kNN candidates fetched for re-ranking
+    RERANK_BUDGET_MS: float = 150.0
+    RERANK_BATCH_SIZE: int = 32
+    RERANK_CACHE_SIZE: int = 10000
     
     # Embedding Settings
+    EMBEDDING_MODEL: str = "all-MiniLM-L6-v2"  # "hashing" needs no model download
     EMBEDDING_DIMENSION: int = 384  # for 'all-MiniLM-L6-v2'
+    EMBEDDING_BACKEND: str = "torch"  # "onnx" or "onnx-int8" run an exported model on ONNX Runtime
+    ONNX_MODEL_DIR: str = "onnx_models"  # Exported (and quantized) models are cached here
+    EMBEDDING_BATCH_SIZE: int = 32
+    EMBEDDING_PROCESSES: int = 0          # Encode pool workers for large batches in batch jobs and scripts; keep 0 for the API server
+    EMBEDDING_POOL_MIN_TEXTS: int = 512   # Smaller batches aren't worth sending to the pool
+    EMBEDDING_THREADS: int = 0            # Per ONNX session and pool worker; 0 = library default / cores split between workers
+    EMBEDDING_CPU_AFFINITY: str = ""      # e.g. "0-7": CPUs the pool workers are pinned to, split between them
+    
+    # Extracted audio storage: 16 kHz mono FLAC or Opus (or WAV at the source
+    # rate), decoded to a temporary WAV only while it is transcribed
+    AUDIO_STORAGE_FORMAT: str = "flac"      # flac, opus or wav
+    AUDIO_SAMPLE_RATE: int = 16000
+    AUDIO_OPUS_BITRATE: str = "32k"
+    AUDIO_KEEP_AFTER_INGEST: bool = True    # False drops extracted audio once the media is indexed
+    AUDIO_COMPACTION_BATCH_SIZE: int = 100
+    
+    # Transcription Settings
+    WHISPER_BACKEND: str = "openai"  # "faster-whisper" uses CTranslate2 (pip install faster-whisper)
+    WHISPER_MODEL: str = "base"      # Default size; uploads can pick another tier
+    WHISPER_MODEL_SIZES: list = ["tiny", "base", "small"]
+    WHISPER_DEVICE: str = "cpu"
+    WHISPER_COMPUTE_TYPE: str = "int8"  # faster-whisper only: int8, int8_float16, float16, float32
+    WHISPER_BEAM_SIZE: int = 0          # 0 = greedy decoding
+    WHISPER_CONDITION_ON_PREVIOUS_TEXT: bool = True
+    WHISPER_TEMPERATURE_FALLBACK: bool = True
+    TRANSCRIPTION_WINDOW_SECONDS: int = 600  # Long media is transcribed, stored and indexed window by window
+    CHECKPOINT_DIR: str = "checkpoints"      # Per-window progress, so restarted uploads resume
+    
+    # Voice activity detection: only speech regions are transcribed
+    VAD_ENABLED: bool = True
+    VAD_FRAME_MS: int = 30
+    VAD_ENERGY_MARGIN_DB: float = 12.0  # Speech must be this far above the noise floor
+    VAD_MIN_ENERGY_DB: float = -50.0    # Absolute floor (dBFS) for speech frames
+    VAD_MAX_ZCR: float = 0.35           # Zero-crossing rate above this looks like noise unless loud
+    VAD_MIN_SPEECH_MS: int = 250
+    VAD_MIN_SILENCE_MS: int = 600       # Shorter pauses stay inside a speech region
+    VAD_PADDING_MS: int = 200
+    VAD_MIN_SKIP_SECONDS: float = 2.0   # Transcribe the original when less silence than this is found
+    
+    # Job scheduling: concurrent jobs per stage, and cores shared by transcriptions (0 = all)
+    TRANSCRIPTION_CONCURRENCY: int = 2
+    TRANSCRIPTION_CORE_BUDGET: int = 0
+    EMBEDDING_CONCURRENCY: int = 2
+    TENANT_HEADER: str = "X-Tenant-Id"  # Uploads are fair-queued per tenant
+    INGEST_WORKERS: int = 2             # Worker processes for "python -m app.cli ingest"; cores are split between them
+    SNAPSHOT_BATCH_SIZE: int = 1000     # Rows per insert and documents per bulk request when importing snapshots
+    
+    # Vector storage: float32, float16 or int8 (byte vectors)
+    VECTOR_QUANTIZATION: str = "float32"
+    VECTOR_RESCORE_OVERSAMPLE: int = 4  # Candidates fetched per result for full-precision rescoring
+    VECTOR_BYTE_SCALE: float = 127.0    # int8 codes of new, empty indices; reindexing calibrates it from the stored vectors
+    
+    @field_validator("VECTOR_QUANTIZATION")
+    @classmethod
+    def check_vector_quantization(cls, value: str) -> str:
+        # Chunk indices need a knn_vector encoding; product quantization
+        # (pq) only exists in LocalVectorStore, for benchmarks
+        if value not in ("float32", "float16", "int8"):
+            raise ValueError(f"Unsupported VECTOR_QUANTIZATION '{value}'. Choose from: float32, float16, int8")
+        return value
     
     class Config:
         case_sensitive = True
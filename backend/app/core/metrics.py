@@ -0,0 +1,127 @@
+from contextlib import contextmanager
+from functools import wraps
+import inspect
+import time
+from prometheus_client import Counter, Gauge, Histogram
+from .profiling import current_session, profile_stage
+
+# Buckets span fast index/DB calls (ms) through long transcriptions (minutes)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS
+)
+
+STAGE_LATENCY = Histogram(
+    "pipeline_stage_duration_seconds",
+    "Latency of ingest and query pipeline stages",
+    ["stage"],
+    buckets=LATENCY_BUCKETS
+)
+
+STAGE_ERRORS = Counter(
+    "pipeline_stage_errors_total",
+    "Pipeline stage calls that raised",
+    ["stage"]
+)
+
+EMBEDDING_BATCH_SIZE = Histogram(
+    "embedding_batch_size",
+    "Number of texts per embedding encode call",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+)
+
+VAD_AUDIO_SECONDS = Counter(
+    "vad_audio_seconds_total",
+    "Seconds of audio classified by voice activity detection",
+    ["kind"]
+)
+
+DEDUP_CHUNKS = Counter(
+    "dedup_chunks_total",
+    "Chunks indexed, by whether they were unique or a near-duplicate of an indexed chunk",
+    ["kind"]
+)
+
+FINGERPRINT_LOOKUPS = Counter(
+    "fingerprint_lookups_total",
+    "Uploads looked up in the audio fingerprint index, by whether a processed copy was found",
+    ["result"]
+)
+
+CLIP_CACHE = Counter(
+    "clip_cache_requests_total",
+    "Clip requests, by whether the clip was in the disk cache",
+    ["result"]
+)
+
+SEARCH_MODE = Counter(
+    "search_requests_total",
+    "Searches by how they were answered (lexical_fallback: OpenSearch was unreachable)",
+    ["mode"]
+)
+
+MEDIA_STORAGE_BYTES = Gauge(
+    "media_storage_bytes",
+    "Disk used by media files, by kind (original upload or extracted audio)",
+    ["kind"]
+)
+
+SCHEDULER_QUEUE_WAIT = Histogram(
+    "scheduler_queue_wait_seconds",
+    "Time jobs wait for a scheduler slot",
+    ["queue", "priority"],
+    buckets=LATENCY_BUCKETS
+)
+
+SCHEDULER_QUEUE_DEPTH = Gauge(
+    "scheduler_queue_depth",
+    "Jobs waiting for a scheduler slot",
+    ["queue"]
+)
+
+SCHEDULER_RUNNING = Gauge(
+    "scheduler_running_jobs",
+    "Jobs currently holding a scheduler slot",
+    ["queue"]
+)
+
+@contextmanager
+def track_stage(stage: str):
+    """
+    Time a block as a pipeline stage, counting it as an error if it raises.
+    Inside a profiled request the stage is also profiled.
+    """
+    session = current_session.get()
+    start = time.perf_counter()
+    try:
+        if session is None:
+            yield
+        else:
+            with profile_stage(session, stage):
+                yield
+    except Exception:
+        STAGE_ERRORS.labels(stage=stage).inc()
+        raise
+    finally:
+        STAGE_LATENCY.labels(stage=stage).observe(time.perf_counter() - start)
+
+def timed(stage: str):
+    """Decorator form of track_stage for sync and async functions"""
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with track_stage(stage):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with track_stage(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
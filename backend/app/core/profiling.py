@@ -0,0 +1,164 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+import cProfile
+import io
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from .config import settings
+
+@dataclass
+class ProfileSession:
+    """Profiling state for one request; stages report into it from any thread"""
+    name: str
+    thread_id: int = field(default_factory=threading.get_ident)
+    started_at: float = field(default_factory=time.time)
+    stages: List[Dict] = field(default_factory=list)
+    profiles: List[cProfile.Profile] = field(default_factory=list)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    profile_id: Optional[str] = None
+
+current_session: ContextVar[Optional[ProfileSession]] = ContextVar("profile_session", default=None)
+
+# Profiled requests share tracemalloc; it runs while at least one is active
+_tracemalloc_users = 0
+_tracemalloc_started = False
+_tracemalloc_lock = threading.Lock()
+
+def _enable(profiler: cProfile.Profile) -> bool:
+    """Start a profiler unless another one already owns this thread"""
+    if sys.getprofile() is not None:
+        return False
+    try:
+        profiler.enable()
+        return True
+    except ValueError:  # Python 3.12+: another profiling tool is active
+        return False
+
+def _start_tracemalloc():
+    global _tracemalloc_users, _tracemalloc_started
+    with _tracemalloc_lock:
+        if _tracemalloc_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracemalloc_started = True
+        _tracemalloc_users += 1
+
+def _stop_tracemalloc():
+    global _tracemalloc_users, _tracemalloc_started
+    with _tracemalloc_lock:
+        _tracemalloc_users -= 1
+        if _tracemalloc_users == 0 and _tracemalloc_started:
+            tracemalloc.stop()
+            _tracemalloc_started = False
+
+# Endpoints that can be profiled, by path
+PROFILED_ROUTES = {
+    f"{settings.API_V1_STR}/media/upload": "upload_media",
+    f"{settings.API_V1_STR}/query/search": "search_media",
+}
+
+def should_profile(headers) -> bool:
+    return settings.PROFILING_ENABLED or headers.get(settings.PROFILING_HEADER, "").lower() in ("1", "true", "yes")
+
+@contextmanager
+def profile_stage(session: ProfileSession, stage: str):
+    """
+    Record the tracemalloc peak of a pipeline stage. Stages running off the
+    request's thread (threadpool work) get their own cProfile, merged on save.
+    Allocation peaks are process-wide, so concurrent profiled requests overlap.
+    """
+    profiler = None
+    if threading.get_ident() != session.thread_id:
+        profiler = cProfile.Profile()
+    start_current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    start = time.perf_counter()
+    if profiler is not None and not _enable(profiler):
+        profiler = None
+    try:
+        yield
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        _, peak = tracemalloc.get_traced_memory()
+        with session.lock:
+            session.stages.append({
+                "stage": stage,
+                "seconds": time.perf_counter() - start,
+                "peak_alloc_bytes": max(0, peak - start_current),
+            })
+            if profiler is not None:
+                session.profiles.append(profiler)
+
+@contextmanager
+def profile_request(name: str):
+    """
+    Profile the current request and save artifacts on exit. The event-loop
+    profile also sees other requests' coroutines interleaved with this one.
+    """
+    session = ProfileSession(name=name)
+    token = current_session.set(session)
+    _start_tracemalloc()
+    # Only one request at a time can profile the event-loop thread; others keep stage data
+    profiler = cProfile.Profile()
+    if not _enable(profiler):
+        profiler = None
+    try:
+        yield session
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            session.profiles.insert(0, profiler)
+        current_session.reset(token)
+        _stop_tracemalloc()
+        save_profile(session)
+
+def save_profile(session: ProfileSession) -> str:
+    """Write <id>.prof (pstats, e.g. for snakeviz) and <id>.json (summary); return the id"""
+    os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+    profile_id = f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(session.started_at))}-{session.name}-{uuid.uuid4().hex[:8]}"
+
+    top = io.StringIO()
+    if session.profiles:
+        stats = pstats.Stats(*session.profiles, stream=top)
+        stats.dump_stats(os.path.join(settings.PROFILE_DIR, f"{profile_id}.prof"))
+        stats.sort_stats("cumulative").print_stats(settings.PROFILE_TOP_FUNCTIONS)
+    summary = {
+        "id": profile_id,
+        "name": session.name,
+        "started_at": session.started_at,
+        "duration": time.time() - session.started_at,
+        "stages": session.stages,
+        "top_functions": top.getvalue(),
+    }
+    with open(os.path.join(settings.PROFILE_DIR, f"{profile_id}.json"), "w") as f:
+        json.dump(summary, f, indent=2)
+    session.profile_id = profile_id
+    return profile_id
+
+def list_profiles() -> List[Dict]:
+    """Summaries of saved profiles, newest first"""
+    if not os.path.isdir(settings.PROFILE_DIR):
+        return []
+    summaries = []
+    for filename in sorted(os.listdir(settings.PROFILE_DIR), reverse=True):
+        if filename.endswith(".json"):
+            with open(os.path.join(settings.PROFILE_DIR, filename)) as f:
+                summary = json.load(f)
+            summary.pop("top_functions", None)
+            summaries.append(summary)
+    return summaries
+
+def profile_path(profile_id: str, extension: str) -> Optional[str]:
+    """Path of a saved artifact, or None if the id is unknown or not a plain name"""
+    if os.path.basename(profile_id) != profile_id or profile_id.startswith("."):
+        return None
+    path = os.path.join(settings.PROFILE_DIR, f"{profile_id}.{extension}")
+    return path if os.path.isfile(path) else None
@@ -1 +1 @@
-from .media import crud_media 
\ No newline at end of file
+from .media import crud_media, async_crud_media
\ No newline at end of file
@@ -1,5 +1,7 @@
 from typing import Any, Dict, Generic, List, Optional, Type, TypeVar, Union
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import SQLAlchemyError
 from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
@@ -63,4 +65,63 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
             return obj
         except SQLAlchemyError as e:
             db.rollback()
-            raise e 
\ No newline at end of file
+            raise e
+
+class AsyncCRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
+    """Async counterpart of CRUDBase for use with AsyncSession in request handlers"""
+    def __init__(self, model: Type[ModelType]):
+        self.model = model
+
+    async def get(self, db: AsyncSession, id: Any) -> Optional[ModelType]:
+        return await db.get(self.model, id)
+
+    async def get_multi(self, db: AsyncSession, *, skip: int = 0, limit: int = 100) -> List[ModelType]:
+        result = await db.execute(select(self.model).offset(skip).limit(limit))
+        return list(result.scalars().all())
+
+    async def create(self, db: AsyncSession, *, obj_in: CreateSchemaType) -> ModelType:
+        obj_in_data = jsonable_encoder(obj_in)
+        db_obj = self.model(**obj_in_data)
+        try:
+            db.add(db_obj)
+            await db.commit()
+            await db.refresh(db_obj)
+            return db_obj
+        except SQLAlchemyError as e:
+            await db.rollback()
+            raise e
+
+    async def update(
+        self,
+        db: AsyncSession,
+        *,
+        db_obj: ModelType,
+        obj_in: Union[UpdateSchemaType, Dict[str, Any]]
+    ) -> ModelType:
+        if isinstance(obj_in, dict):
+            update_data = obj_in
+        else:
+            update_data = obj_in.dict(exclude_unset=True)
+        for field in self.model.__table__.columns.keys():
+            if field in update_data:
+                setattr(db_obj, field, update_data[field])
+        try:
+            db.add(db_obj)
+            await db.commit()
+            await db.refresh(db_obj)
+            return db_obj
+        except SQLAlchemyError as e:
+            await db.rollback()
+            raise e
+
+    async def remove(self, db: AsyncSession, *, id: int) -> Optional[ModelType]:
+        obj = await db.get(self.model, id)
+        if obj is None:
+            return None
+        try:
+            await db.delete(obj)
+            await db.commit()
+            return obj
+        except SQLAlchemyError as e:
+            await db.rollback()
+            raise e
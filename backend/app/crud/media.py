@@ -1,9 +1,45 @@
-from typing import List, Optional
-from sqlalchemy.orm import Session
-from .base import CRUDBase
-from ..models.media import Media, Transcription, TranscriptionSegment, Chunk
+from typing import List, Optional, Tuple
+from sqlalchemy import select, delete, insert, func
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy.ext.asyncio import AsyncSession
+from .base import CRUDBase, AsyncCRUDBase
+from ..models.media import Media, Transcription, TranscriptionSegment, Chunk, AudioFingerprint
+from ..core.metrics import track_stage
 from ..schemas.media import MediaCreate, MediaUpdate, TranscriptionCreate, TranscriptionSegmentCreate, ChunkCreate
 
+# Keep IN lists under SQLite's bound-parameter limit
+DELETE_BATCH_SIZE = 500
+
+# Eager-load everything MediaInDB serializes; async sessions can't lazy-load
+MEDIA_RELATIONS = (
+    selectinload(Media.transcription).selectinload(Transcription.segments),
+    selectinload(Media.chunks),
+)
+
+def _build_media_graph(media: MediaCreate, segments: List[tuple], chunks: List[dict]) -> Media:
+    """Build a Media row with its transcription, segments and chunks attached"""
+    db_transcription = Transcription(
+        segments=[
+            TranscriptionSegment(text=text, start_time=start_time, end_time=end_time)
+            for text, start_time, end_time in segments
+        ]
+    )
+    return Media(
+        filename=media.filename,
+        file_path=media.file_path,
+        audio_path=media.audio_path,
+        collection_id=media.collection_id,
+        transcription=db_transcription,
+        chunks=[
+            Chunk(
+                text=chunk_data["text"],
+                start_time=chunk_data["start_time"],
+                end_time=chunk_data["end_time"]
+            )
+            for chunk_data in chunks
+        ]
+    )
+
 class CRUDMedia(CRUDBase[Media, MediaCreate, MediaUpdate]):
     def create_with_transcription(
         self,
@@ -13,42 +49,12 @@ class CRUDMedia(CRUDBase[Media, MediaCreate, MediaUpdate]):
         segments: List[tuple],
         chunks: List[dict]
     ) -> Media:
-        # Create media entry
-        db_media = Media(
-            filename=media.filename,
-            file_path=media.file_path,
-            audio_path=media.audio_path
-        )
+        db_media = _build_media_graph(media, segments, chunks)
         db.add(db_media)
-        db.flush()  # Get ID without committing
-
-        # Create transcription
-        db_transcription = Transcription(media_id=db_media.id)
-        db.add(db_transcription)
-        db.flush()
-
-        # Create segments
-        for text, start_time, end_time in segments:
-            segment = TranscriptionSegment(
-                transcription_id=db_transcription.id,
-                text=text,
-                start_time=start_time,
-                end_time=end_time
-            )
-            db.add(segment)
-
-        # Create chunks
-        for chunk_data in chunks:
-            chunk = Chunk(
-                media_id=db_media.id,
-                text=chunk_data["text"],
-                start_time=chunk_data["start_time"],
-                end_time=chunk_data["end_time"]
-            )
-            db.add(chunk)
 
         try:
-            db.commit()
+            with track_stage("db_commit"):
+                db.commit()
             db.refresh(db_media)
             return db_media
         except Exception as e:
@@ -58,4 +64,220 @@ class CRUDMedia(CRUDBase[Media, MediaCreate, MediaUpdate]):
     def get_with_relations(self, db: Session, id: int) -> Optional[Media]:
         return db.query(Media).filter(Media.id == id).first()
 
-crud_media = CRUDMedia(Media) 
\ No newline at end of file
+    def get_with_audio(self, db: Session, *, after_id: int = 0, limit: int = 100) -> List[Media]:
+        """Media that still have extracted audio, in id order after after_id (keyset pagination)"""
+        return (
+            db.query(Media)
+            .filter(Media.id > after_id, Media.audio_path.isnot(None))
+            .order_by(Media.id)
+            .limit(limit)
+            .all()
+        )
+
+class AsyncCRUDMedia(AsyncCRUDBase[Media, MediaCreate, MediaUpdate]):
+    async def create_with_transcription(
+        self,
+        db: AsyncSession,
+        *,
+        media: MediaCreate,
+        segments: List[tuple],
+        chunks: List[dict]
+    ) -> Media:
+        db_media = _build_media_graph(media, segments, chunks)
+        db.add(db_media)
+
+        try:
+            with track_stage("db_commit"):
+                await db.commit()
+        except Exception as e:
+            await db.rollback()
+            raise e
+        return await self.get_with_relations(db, db_media.id)
+
+    async def replace_window(
+        self,
+        db: AsyncSession,
+        *,
+        media_id: int,
+        start_time: float,
+        end_time: float,
+        segments: List[tuple],
+        chunks: List[dict]
+    ) -> None:
+        """
+        Store the segments and chunks of one transcription window, replacing
+        any that an interrupted attempt already wrote for [start_time, end_time).
+        """
+        try:
+            transcription_id = (await db.execute(
+                select(Transcription.id).where(Transcription.media_id == media_id)
+            )).scalar_one()
+            await db.execute(
+                delete(TranscriptionSegment)
+                .where(TranscriptionSegment.transcription_id == transcription_id,
+                       TranscriptionSegment.start_time >= start_time,
+                       TranscriptionSegment.start_time < end_time)
+                .execution_options(synchronize_session=False)
+            )
+            await db.execute(
+                delete(Chunk)
+                .where(Chunk.media_id == media_id,
+                       Chunk.start_time >= start_time,
+                       Chunk.start_time < end_time)
+                .execution_options(synchronize_session=False)
+            )
+            db.add_all([
+                TranscriptionSegment(transcription_id=transcription_id, text=text,
+                                     start_time=start, end_time=end)
+                for text, start, end in segments
+            ])
+            db.add_all([
+                Chunk(media_id=media_id, text=chunk_data["text"],
+                      start_time=chunk_data["start_time"], end_time=chunk_data["end_time"])
+                for chunk_data in chunks
+            ])
+            with track_stage("db_commit"):
+                await db.commit()
+        except Exception as e:
+            await db.rollback()
+            raise e
+        # Loaded Media graphs don't see rows added by foreign key
+        db.expire_all()
+
+    async def get_with_relations(self, db: AsyncSession, id: int) -> Optional[Media]:
+        result = await db.execute(
+            select(Media).options(*MEDIA_RELATIONS).where(Media.id == id)
+        )
+        return result.scalars().first()
+
+    async def get_segments(self, db: AsyncSession, media_id: int) -> List[Tuple[str, float, float]]:
+        """A media's transcription segments as (text, start_time, end_time), in time order"""
+        result = await db.execute(
+            select(TranscriptionSegment.text, TranscriptionSegment.start_time, TranscriptionSegment.end_time)
+            .join(Transcription, TranscriptionSegment.transcription_id == Transcription.id)
+            .where(Transcription.media_id == media_id)
+            .order_by(TranscriptionSegment.start_time)
+        )
+        return [tuple(row) for row in result.all()]
+
+    async def replace_fingerprint(
+        self,
+        db: AsyncSession,
+        *,
+        media_id: int,
+        hashes: List[int],
+        frames: List[int]
+    ) -> None:
+        """Store a media's audio fingerprint, replacing any it had"""
+        try:
+            await db.execute(
+                delete(AudioFingerprint)
+                .where(AudioFingerprint.media_id == media_id)
+                .execution_options(synchronize_session=False)
+            )
+            if hashes:
+                await db.execute(
+                    insert(AudioFingerprint),
+                    [{"media_id": media_id, "hash": hash_, "frame": frame} for hash_, frame in zip(hashes, frames)]
+                )
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            raise e
+
+    async def find_fingerprint_hashes(self, db: AsyncSession, hashes: List[int]) -> List[Tuple[int, int, int]]:
+        """Fingerprint index rows (hash, media_id, frame) for any of the hashes"""
+        rows = []
+        for i in range(0, len(hashes), DELETE_BATCH_SIZE):
+            result = await db.execute(
+                select(AudioFingerprint.hash, AudioFingerprint.media_id, AudioFingerprint.frame)
+                .where(AudioFingerprint.hash.in_(hashes[i:i + DELETE_BATCH_SIZE]))
+            )
+            rows.extend(tuple(row) for row in result.all())
+        return rows
+
+    async def fingerprint_extent(self, db: AsyncSession, media_id: int) -> int:
+        """Last fingerprinted frame of a media (0 if it has no fingerprint)"""
+        result = await db.execute(
+            select(func.max(AudioFingerprint.frame)).where(AudioFingerprint.media_id == media_id)
+        )
+        return result.scalar() or 0
+
+    async def get_file_paths(self, db: AsyncSession, collection_id: Optional[str] = None
+                             ) -> List[Tuple[int, str, str, Optional[str]]]:
+        """(id, filename, file_path, audio_path) of every media, in id order"""
+        query = select(Media.id, Media.filename, Media.file_path, Media.audio_path)
+        if collection_id is not None:
+            query = query.where(Media.collection_id == collection_id)
+        result = await db.execute(query.order_by(Media.id))
+        return [tuple(row) for row in result.all()]
+
+    async def get_multi(self, db: AsyncSession, *, skip: int = 0, limit: int = 100,
+                        collection_id: Optional[str] = None) -> List[Media]:
+        query = select(Media).options(*MEDIA_RELATIONS)
+        if collection_id is not None:
+            query = query.where(Media.collection_id == collection_id)
+        result = await db.execute(query.order_by(Media.id).offset(skip).limit(limit))
+        return list(result.scalars().all())
+
+    async def remove_many(
+        self,
+        db: AsyncSession,
+        *,
+        ids: List[int],
+        commit: bool = True
+    ) -> List[Tuple[int, str, str]]:
+        """
+        Bulk-delete media with their transcriptions, segments and chunks.
+        Returns (id, file_path, audio_path) for each media that existed.
+        """
+        removed = []
+        try:
+            for i in range(0, len(ids), DELETE_BATCH_SIZE):
+                batch = ids[i:i + DELETE_BATCH_SIZE]
+                result = await db.execute(
+                    select(Media.id, Media.file_path, Media.audio_path).where(Media.id.in_(batch))
+                )
+                rows = [tuple(row) for row in result.all()]
+                if not rows:
+                    continue
+                media_ids = [row[0] for row in rows]
+                transcription_ids = select(Transcription.id).where(Transcription.media_id.in_(media_ids))
+
+                # Children first so FK constraints hold without ON DELETE CASCADE
+                await db.execute(
+                    delete(TranscriptionSegment)
+                    .where(TranscriptionSegment.transcription_id.in_(transcription_ids))
+                    .execution_options(synchronize_session=False)
+                )
+                await db.execute(
+                    delete(Transcription)
+                    .where(Transcription.media_id.in_(media_ids))
+                    .execution_options(synchronize_session=False)
+                )
+                await db.execute(
+                    delete(Chunk)
+                    .where(Chunk.media_id.in_(media_ids))
+                    .execution_options(synchronize_session=False)
+                )
+                await db.execute(
+                    delete(AudioFingerprint)
+                    .where(AudioFingerprint.media_id.in_(media_ids))
+                    .execution_options(synchronize_session=False)
+                )
+                await db.execute(
+                    delete(Media)
+                    .where(Media.id.in_(media_ids))
+                    .execution_options(synchronize_session=False)
+                )
+                removed.extend(rows)
+
+            if commit:
+                await db.commit()
+            return removed
+        except Exception as e:
+            await db.rollback()
+            raise e
+
+crud_media = CRUDMedia(Media)
+async_crud_media = AsyncCRUDMedia(Media)
@@ -1,13 +1,93 @@
-from sqlalchemy import create_engine
+from typing import Any, Dict
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from ..core.config import settings
 
-engine = create_engine(settings.DATABASE_URL)
+def engine_options(database_url: str) -> Dict[str, Any]:
+    """
+    Build create_engine keyword arguments for the backend in the URL.
+
+    SQLite gets a thread-shareable connection with a busy timeout so concurrent
+    writers wait instead of failing; server databases get a sized, pre-pinged pool.
+    """
+    url = make_url(database_url)
+    options: Dict[str, Any] = {"echo": settings.DB_ECHO}
+
+    if url.get_backend_name() == "sqlite":
+        options["connect_args"] = {
+            "check_same_thread": False,
+            "timeout": settings.SQLITE_BUSY_TIMEOUT_MS / 1000,
+        }
+    else:
+        options.update(
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+            pool_pre_ping=settings.DB_POOL_PRE_PING,
+        )
+    return options
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    """Apply per-connection SQLite pragmas (WAL, synchronous, busy timeout, FKs)"""
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+        cursor.execute("PRAGMA foreign_keys=ON")
+    finally:
+        cursor.close()
+
+def create_db_engine(database_url: str) -> Engine:
+    """Create an engine using the profile that matches the database backend"""
+    db_engine = create_engine(database_url, **engine_options(database_url))
+    if db_engine.dialect.name == "sqlite":
+        event.listen(db_engine, "connect", _set_sqlite_pragmas)
+    return db_engine
+
+# Async drivers for each sync backend understood by create_db_engine
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+def async_database_url(database_url: str) -> str:
+    """Translate a sync database URL to its async-driver equivalent"""
+    url = make_url(database_url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for database backend '{backend}'")
+    return url.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+def create_async_db_engine(database_url: str) -> AsyncEngine:
+    """Create an async engine with the same profile as the sync engine"""
+    db_engine = create_async_engine(database_url, **engine_options(database_url))
+    if db_engine.dialect.name == "sqlite":
+        event.listen(db_engine.sync_engine, "connect", _set_sqlite_pragmas)
+    return db_engine
+
+engine = create_db_engine(settings.DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_engine = create_async_db_engine(
+    settings.ASYNC_DATABASE_URL or async_database_url(settings.DATABASE_URL)
+)
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    autoflush=False,
+    expire_on_commit=False,  # Objects are serialized after commit; avoid lazy reloads
+)
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,36 @@
+"""
+Worker side of the embedding encode pool (EMBEDDING_PROCESSES).
+
+Workers are spawned, not forked: a fork of a process whose torch/OpenMP
+or server thread pools are already running can deadlock. Spawned workers
+import this module, which keeps app.services out until init_worker has set
+the worker's settings, so the embedding service built on import loads the
+model once, with the worker's share of the threads.
+"""
+import os
+from typing import List, Optional
+import numpy as np
+from .core.config import settings
+
+_service = None
+
+def init_worker(model_name: str, backend: str, threads: int, cpu_sets):
+    """Pin the worker to its CPUs and load its own copy of the model"""
+    global _service
+    cpus: Optional[List[int]] = cpu_sets.get() if cpu_sets is not None else None
+    if cpus and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cpus)
+    settings.EMBEDDING_MODEL = model_name
+    settings.EMBEDDING_BACKEND = backend
+    settings.EMBEDDING_THREADS = threads
+    settings.EMBEDDING_PROCESSES = 0
+    if backend == "torch":
+        import torch
+        torch.set_num_threads(threads)
+    from .services.embedding import embedding_service
+    _service = embedding_service
+
+def encode(texts: List[str], batch_size: int) -> np.ndarray:
+    embeddings = np.empty((len(texts), _service.dimension), dtype=np.float32)
+    _service._encode_into(embeddings, np.arange(len(texts)), texts, batch_size)
+    return embeddings
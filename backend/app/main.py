@@ -1,7 +1,12 @@
-from fastapi import FastAPI
+import time
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from app.api.endpoints import upload, query
+from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
+from app.api.endpoints import upload, query, index, profiles
 from app.core.config import settings
+from app.core.metrics import REQUEST_LATENCY
+from app.core.profiling import PROFILED_ROUTES, should_profile, profile_request
+from app.services.embedding import embedding_service
 
 app = FastAPI(title=settings.PROJECT_NAME)
 
@@ -13,6 +18,33 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Label by route template (not raw path) to keep label cardinality bounded
+        route = request.scope.get("route")
+        REQUEST_LATENCY.labels(
+            method=request.method,
+            route=route.path if route is not None else "unmatched",
+            status=str(status)
+        ).observe(time.perf_counter() - start)
+
+@app.middleware("http")
+async def profile_requests(request: Request, call_next):
+    name = PROFILED_ROUTES.get(request.url.path)
+    if name is None or not should_profile(request.headers):
+        return await call_next(request)
+    with profile_request(name) as session:
+        response = await call_next(request)
+    response.headers["X-Profile-Id"] = session.profile_id
+    return response
+
 # Include routers
 app.include_router(
     upload.router,
@@ -26,10 +58,30 @@ app.include_router(
     tags=["query"]
 )
 
+app.include_router(
+    index.router,
+    prefix=settings.API_V1_STR + "/index",
+    tags=["index"]
+)
+
+app.include_router(
+    profiles.router,
+    prefix=settings.API_V1_STR + "/profiles",
+    tags=["profiles"]
+)
+
+@app.on_event("shutdown")
+def shutdown_encode_pool():
+    embedding_service.close()
+
 @app.get("/")
 async def root():
     return {"message": "Multimedia Query Tool API"}
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"} 
\ No newline at end of file
+    return {"status": "healthy"}
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
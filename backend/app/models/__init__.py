@@ -1,2 +1,3 @@
 from .base import Base
-from .media import Media, Transcription, TranscriptionSegment, Chunk 
\ No newline at end of file
+from .media import Media, Transcription, TranscriptionSegment, Chunk, AudioFingerprint
+from .fts import FTS_TABLES
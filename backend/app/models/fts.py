@@ -0,0 +1,35 @@
+from typing import List
+from sqlalchemy import DDL, event
+from .media import Chunk, TranscriptionSegment
+
+# Full-text indexes (SQLite FTS5) over transcript text. They are external
+# content tables: the text lives only in the source table, and triggers keep
+# the index in step with every insert, update and delete, bulk ones included.
+FTS_TOKENIZER = "porter unicode61 remove_diacritics 2"
+FTS_TABLES = {
+    Chunk.__tablename__: "chunks_fts",
+    TranscriptionSegment.__tablename__: "transcription_segments_fts",
+}
+
+def fts_statements(table: str, fts_table: str) -> List[str]:
+    """DDL for a source table's FTS5 index and the triggers that sync it"""
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts_table} USING fts5("
+        f"text, content='{table}', content_rowid='id', tokenize='{FTS_TOKENIZER}')",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_fts_insert AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {fts_table}(rowid, text) VALUES (new.id, new.text); END",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_fts_delete AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {fts_table}({fts_table}, rowid, text) VALUES ('delete', old.id, old.text); END",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_fts_update AFTER UPDATE OF text ON {table} BEGIN "
+        f"INSERT INTO {fts_table}({fts_table}, rowid, text) VALUES ('delete', old.id, old.text); "
+        f"INSERT INTO {fts_table}(rowid, text) VALUES (new.id, new.text); END",
+    ]
+
+# Tables made with metadata.create_all (tests, benchmarks) get their indexes
+# too; migrated databases get them from the add_transcript_fts revision
+for _model in (Chunk, TranscriptionSegment):
+    _fts_table = FTS_TABLES[_model.__tablename__]
+    for _statement in fts_statements(_model.__tablename__, _fts_table):
+        event.listen(_model.__table__, "after_create", DDL(_statement).execute_if(dialect="sqlite"))
+    event.listen(_model.__table__, "after_drop",
+                 DDL(f"DROP TABLE IF EXISTS {_fts_table}").execute_if(dialect="sqlite"))
@@ -10,27 +10,31 @@ class Media(Base):
     filename = Column(String, index=True)
     file_path = Column(String)
     audio_path = Column(String)
-    created_at = Column(Float, default=lambda: datetime.datetime.now().timestamp())
+    collection_id = Column(String, index=True, nullable=False, default="default", server_default="default")
+    created_at = Column(Float, default=lambda: datetime.datetime.now().timestamp(), index=True)
     
     # Relationships
-    transcription = relationship("Transcription", back_populates="media", uselist=False)
-    chunks = relationship("Chunk", back_populates="media")
+    transcription = relationship("Transcription", back_populates="media", uselist=False,
+                                 cascade="all, delete-orphan")
+    chunks = relationship("Chunk", back_populates="media", cascade="all, delete-orphan")
+    fingerprints = relationship("AudioFingerprint", back_populates="media", cascade="all, delete-orphan")
 
 class Transcription(Base):
     __tablename__ = "transcriptions"
     
     id = Column(Integer, primary_key=True, index=True)
-    media_id = Column(Integer, ForeignKey("media.id"))
+    media_id = Column(Integer, ForeignKey("media.id"), index=True)
     
     # Relationships
     media = relationship("Media", back_populates="transcription")
-    segments = relationship("TranscriptionSegment", back_populates="transcription")
+    segments = relationship("TranscriptionSegment", back_populates="transcription",
+                            cascade="all, delete-orphan")
 
 class TranscriptionSegment(Base):
     __tablename__ = "transcription_segments"
     
     id = Column(Integer, primary_key=True, index=True)
-    transcription_id = Column(Integer, ForeignKey("transcriptions.id"))
+    transcription_id = Column(Integer, ForeignKey("transcriptions.id"), index=True)
     text = Column(Text)
     start_time = Column(Float)
     end_time = Column(Float)
@@ -42,10 +46,22 @@ class Chunk(Base):
     __tablename__ = "chunks"
     
     id = Column(Integer, primary_key=True, index=True)
-    media_id = Column(Integer, ForeignKey("media.id"))
+    media_id = Column(Integer, ForeignKey("media.id"), index=True)
     text = Column(Text)
     start_time = Column(Float)
     end_time = Column(Float)
     
     # Relationships
-    media = relationship("Media", back_populates="chunks") 
\ No newline at end of file
+    media = relationship("Media", back_populates="chunks") 
+
+class AudioFingerprint(Base):
+    """Inverted index of audio landmark hashes: one row per hash occurrence"""
+    __tablename__ = "audio_fingerprints"
+    
+    id = Column(Integer, primary_key=True)
+    media_id = Column(Integer, ForeignKey("media.id"), index=True)
+    hash = Column(Integer, index=True)
+    frame = Column(Integer)  # Anchor time in fingerprint frames
+    
+    # Relationships
+    media = relationship("Media", back_populates="fingerprints")
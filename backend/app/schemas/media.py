@@ -49,7 +49,8 @@ class TranscriptionInDB(TranscriptionBase):
 class MediaBase(BaseModel):
     filename: str
     file_path: str
-    audio_path: str
+    audio_path: Optional[str]  # None once dropped after ingest
+    collection_id: str = "default"
 
 class MediaCreate(MediaBase):
     pass
@@ -3,3 +3,4 @@ from .transcription import TranscriptionService
 from .chunking import ChunkingService
 from .embedding import embedding_service
 from .opensearch_service import opensearch_service
+from .deletion import deletion_service
\ No newline at end of file
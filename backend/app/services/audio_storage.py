@@ -0,0 +1,178 @@
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from pydub import AudioSegment
+from .media_processor import MediaProcessor
+from ..crud import crud_media
+from ..db.session import SessionLocal
+from ..core.config import settings
+from ..core.metrics import MEDIA_STORAGE_BYTES
+
+logger = logging.getLogger(__name__)
+
+def file_size(path: Optional[str]) -> int:
+    return os.path.getsize(path) if path and os.path.isfile(path) else 0
+
+def audio_format(audio_path: Optional[str]) -> Optional[str]:
+    """Storage format of extracted audio, from its extension"""
+    if not audio_path:
+        return None
+    ext = os.path.splitext(audio_path)[1].lower()
+    return next((name for name, (format_ext, _) in MediaProcessor.AUDIO_FORMATS.items() if format_ext == ext), ext[1:])
+
+class AudioStorageService:
+    """
+    Reports per-media disk usage and compacts the extracted audio of media
+    ingested before the current storage policy: WAV intermediates are
+    re-encoded to AUDIO_STORAGE_FORMAT, or dropped when extracted audio
+    isn't kept after ingest. Compaction walks the media table in id batches,
+    commits each batch before deleting the files it replaced, and can run
+    in the background next to uploads.
+    """
+    def __init__(self, session_factory=SessionLocal):
+        self.session_factory = session_factory
+        self._lock = threading.Lock()
+        self.status: Dict[str, Any] = {"state": "idle"}
+
+    @property
+    def running(self) -> bool:
+        return self.status["state"] == "running"
+
+    def report(self, rows: Sequence[Tuple[int, str, str, Optional[str]]], skip: int = 0, limit: int = 100,
+               update_metrics: bool = True) -> Dict[str, Any]:
+        """
+        Disk usage of the media in rows ((id, filename, file_path, audio_path)):
+        totals over all of them and per-media sizes for one page. An extracted
+        audio file that is the original upload itself is only counted once.
+        """
+        media = []
+        totals = {"original_bytes": 0, "audio_bytes": 0}
+        for media_id, filename, file_path, audio_path in rows:
+            original_bytes = file_size(file_path)
+            audio_bytes = 0 if audio_path == file_path else file_size(audio_path)
+            totals["original_bytes"] += original_bytes
+            totals["audio_bytes"] += audio_bytes
+            media.append({
+                "id": media_id,
+                "filename": filename,
+                "original_bytes": original_bytes,
+                "audio_bytes": audio_bytes,
+                "audio_format": audio_format(audio_path),
+                "total_bytes": original_bytes + audio_bytes,
+            })
+        if update_metrics:
+            MEDIA_STORAGE_BYTES.labels(kind="original").set(totals["original_bytes"])
+            MEDIA_STORAGE_BYTES.labels(kind="audio").set(totals["audio_bytes"])
+        return {
+            "media_count": len(media),
+            **totals,
+            "total_bytes": totals["original_bytes"] + totals["audio_bytes"],
+            "media": media[skip:skip + limit],
+            "compaction": self.status,
+        }
+
+    def _compact_media(self, media, storage_format: str, keep: bool, replaced: List[str], created: List[str]):
+        """Apply the storage policy to one media row; returns the outcome counted in the status"""
+        old_path = media.audio_path
+        if not os.path.isfile(old_path):
+            media.audio_path = None
+            return "missing"
+        if old_path == media.file_path:
+            # The upload itself serves as the audio; re-encoding would add a file
+            if not keep:
+                media.audio_path = None
+                return "dropped"
+            return "skipped"
+        if not keep:
+            media.audio_path = None
+            replaced.append(old_path)
+            return "dropped"
+        new_path = MediaProcessor.audio_storage_path(media.file_path, storage_format)
+        if audio_format(old_path) == storage_format or new_path == media.file_path:
+            return "skipped"
+        try:
+            MediaProcessor.export_audio(AudioSegment.from_file(old_path), new_path, storage_format)
+        except Exception:
+            MediaProcessor.delete_files(new_path)  # Partly written
+            raise
+        created.append(new_path)
+        media.audio_path = new_path
+        replaced.append(old_path)
+        return "converted"
+
+    def compact(self, storage_format: str = settings.AUDIO_STORAGE_FORMAT,
+                keep: bool = settings.AUDIO_KEEP_AFTER_INGEST,
+                batch_size: int = settings.AUDIO_COMPACTION_BATCH_SIZE) -> Dict[str, Any]:
+        if storage_format not in MediaProcessor.AUDIO_FORMATS:
+            raise ValueError(f"Unknown audio storage format '{storage_format}'")
+        if not self._lock.acquire(blocking=False):
+            raise RuntimeError("Audio compaction is already running")
+        try:
+            self.status = {
+                "state": "running",
+                "format": storage_format,
+                "keep": keep,
+                "converted": 0, "dropped": 0, "skipped": 0, "missing": 0, "failed": 0,
+                "bytes_before": 0,
+                "bytes_after": 0,
+                "started_at": time.time(),
+            }
+            last_id = 0
+            with self.session_factory() as db:
+                while True:
+                    batch = crud_media.get_with_audio(db, after_id=last_id, limit=batch_size)
+                    if not batch:
+                        break
+                    replaced: List[str] = []
+                    created: List[str] = []
+                    for media in batch:
+                        last_id = media.id
+                        before = 0 if media.audio_path == media.file_path else file_size(media.audio_path)
+                        try:
+                            outcome = self._compact_media(media, storage_format, keep, replaced, created)
+                        except Exception as e:
+                            logger.warning("Could not compact audio of media %s: %s", media.id, e)
+                            outcome = "failed"
+                        self.status[outcome] += 1
+                        if outcome in ("converted", "dropped"):
+                            self.status["bytes_before"] += before
+                            self.status["bytes_after"] += file_size(media.audio_path)
+                    try:
+                        db.commit()
+                    except Exception:
+                        db.rollback()
+                        MediaProcessor.delete_files(*created)
+                        raise
+                    # Rows point at the new files now; the old ones can go
+                    for path in replaced:
+                        try:
+                            MediaProcessor.delete_files(path)
+                        except Exception as e:
+                            logger.warning("Could not delete %s: %s", path, e)
+            self.status.update(state="completed", finished_at=time.time())
+            return self.status
+        except Exception as e:
+            self.status.update(state="failed", error=str(e), finished_at=time.time())
+            raise
+        finally:
+            self._lock.release()
+
+audio_storage_service = AudioStorageService()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-encode or drop the extracted audio of existing media")
+    parser.add_argument("--format", choices=list(MediaProcessor.AUDIO_FORMATS), default=settings.AUDIO_STORAGE_FORMAT)
+    parser.add_argument("--drop", action="store_true", help="Delete extracted audio instead of re-encoding it")
+    parser.add_argument("--batch-size", type=int, default=settings.AUDIO_COMPACTION_BATCH_SIZE)
+    args = parser.parse_args()
+
+    result = audio_storage_service.compact(
+        storage_format=args.format,
+        keep=settings.AUDIO_KEEP_AFTER_INGEST and not args.drop,
+        batch_size=args.batch_size
+    )
+    print(json.dumps(result, indent=2))
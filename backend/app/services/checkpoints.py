@@ -0,0 +1,77 @@
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional, Tuple
+import hashlib
+import json
+import os
+from ..core.config import settings
+
+def file_digest(path: str, block_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+@dataclass
+class TranscriptionCheckpoint:
+    """
+    Per-window progress of a windowed transcription, persisted as JSON.
+
+    Keyed by the media's content and the transcription parameters, so a
+    restarted upload of the same file resumes where the last attempt stopped:
+    transcribed windows are not sent to Whisper again and windows already
+    stored and indexed for `media_id` are skipped.
+    """
+    path: str
+    media_id: Optional[int] = None
+    # Window index (as a string, for JSON) -> {"segments": [[text, start, end], ...], "indexed": bool}
+    windows: Dict[str, Dict] = field(default_factory=dict)
+
+    @classmethod
+    def open(cls, media_path: str, **params) -> "TranscriptionCheckpoint":
+        """Load the checkpoint for a media file and parameters, or start a new one"""
+        key = hashlib.sha256(
+            (file_digest(media_path) + json.dumps(params, sort_keys=True, default=str)).encode()
+        ).hexdigest()
+        path = os.path.join(settings.CHECKPOINT_DIR, f"{key}.json")
+        if os.path.exists(path):
+            with open(path) as f:
+                state = json.load(f)
+            return cls(path=path, media_id=state.get("media_id"), windows=state.get("windows", {}))
+        return cls(path=path)
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        state = asdict(self)
+        state.pop("path")
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.path)  # Atomic, so a crash never leaves a torn file
+
+    def discard(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def segments(self, index: int) -> Optional[List[Tuple[str, float, float]]]:
+        window = self.windows.get(str(index))
+        return [tuple(segment) for segment in window["segments"]] if window else None
+
+    def is_indexed(self, index: int) -> bool:
+        return self.windows.get(str(index), {}).get("indexed", False)
+
+    def record_window(self, index: int, segments: List[Tuple[str, float, float]]):
+        self.windows[str(index)] = {"segments": [list(segment) for segment in segments], "indexed": False}
+        self.save()
+
+    def mark_indexed(self, index: int):
+        self.windows[str(index)]["indexed"] = True
+        self.save()
+
+    def attach_media(self, media_id: int):
+        """Store results under media_id; windows indexed for another media must be redone"""
+        if media_id != self.media_id:
+            for window in self.windows.values():
+                window["indexed"] = False
+            self.media_id = media_id
+            self.save()
@@ -3,6 +3,7 @@ from dataclasses import dataclass
 import spacy
 from concurrent.futures import ThreadPoolExecutor
 from langchain.text_splitter import MarkdownTextSplitter
+from ..core.metrics import timed
 
 @dataclass
 class Chunk:
@@ -21,6 +22,7 @@ class ChunkingService:
             chunk_overlap=overlap_size
         )
     
+    @timed("chunking")
     def create_chunks(self, segments: List[Tuple[str, float, float]]) -> List[Chunk]:
         """Create overlapping chunks while preserving timing information"""
         if not segments:
@@ -0,0 +1,177 @@
+from typing import Dict, List, Sequence, Tuple
+import hashlib
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from fastapi import HTTPException
+from ..core.config import settings
+from ..core.metrics import CLIP_CACHE, track_stage
+
+Span = Tuple[float, float]
+
+def merge_spans(spans: Sequence[Span], gap: float = 0.0) -> List[Span]:
+    """Sort spans and merge those that overlap or are at most gap seconds apart"""
+    merged: List[List[float]] = []
+    for start, end in sorted(spans):
+        if merged and start - merged[-1][1] <= gap:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return [(start, end) for start, end in merged]
+
+def snap_to_keyframes(spans: Sequence[Span], keyframes: Sequence[float]) -> List[Span]:
+    """
+    Move each span's start back to the last keyframe at or before it, where a
+    stream-copied cut has to begin. Without keyframes (audio, where every
+    frame decodes on its own) spans are left as they are.
+    """
+    keyframes = sorted(keyframes)
+    snapped = []
+    for start, end in spans:
+        before = [time for time in keyframes if time <= start + 1e-3]
+        snapped.append((before[-1] if before else start, end))
+    return snapped
+
+class ClipService:
+    """
+    Cuts time spans out of uploaded media with ffmpeg stream copy, so clips
+    cost a remux rather than a transcode. Cuts start on the keyframe at or
+    before each span; several spans are concatenated into one clip. Clips
+    are kept in a size-bounded on-disk cache, evicted least recently used
+    first. Recency is the access time, set explicitly on every hit (so
+    noatime mounts don't matter); the modification time is left alone, as
+    the clip's ETag and Last-Modified come from it. Clips used within the
+    grace period are never evicted, so one isn't deleted between being
+    returned and its response opening it.
+    """
+    def __init__(self, cache_dir: str = settings.CLIP_CACHE_DIR,
+                 max_bytes: int = settings.CLIP_CACHE_MAX_MB * 1024 * 1024,
+                 merge_gap: float = settings.CLIP_MERGE_GAP_SECONDS,
+                 grace_seconds: float = settings.CLIP_CACHE_GRACE_SECONDS):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.merge_gap = merge_gap
+        self.grace_seconds = grace_seconds
+        self._lock = threading.Lock()
+        self._building: Dict[str, threading.Lock] = {}
+
+    @staticmethod
+    def _run(command: List[str]) -> str:
+        try:
+            return subprocess.run(command, check=True, capture_output=True, text=True).stdout
+        except FileNotFoundError:
+            raise HTTPException(status_code=503, detail=f"{command[0]} is not installed")
+        except subprocess.CalledProcessError as e:
+            raise HTTPException(status_code=500, detail=f"Error extracting clip: {e.stderr.strip()[-500:]}")
+
+    def keyframes(self, path: str, spans: Sequence[Span]) -> List[float]:
+        """
+        Times of the video keyframes the spans start after. Seeking puts
+        ffprobe on the keyframe before each start, so one packet per span is
+        read rather than the whole stream.
+        """
+        intervals = ",".join(f"{start:.3f}%+#1" for start, _ in spans)
+        output = self._run([
+            "ffprobe", "-v", "error", "-select_streams", "V:0",  # V skips cover art
+            "-read_intervals", intervals,
+            "-show_entries", "packet=pts_time,flags", "-of", "csv=p=0", path
+        ])
+        times = []
+        for line in output.splitlines():
+            pts_time, _, flags = line.partition(",")
+            if "K" in flags and pts_time not in ("", "N/A"):
+                times.append(float(pts_time))
+        return times
+
+    def _cut(self, path: str, span: Span, output: str):
+        start, end = span
+        self._run([
+            "ffmpeg", "-nostdin", "-v", "error", "-y",
+            "-ss", f"{start:.3f}", "-i", path, "-t", f"{end - start:.3f}",
+            "-map", "0:v?", "-map", "0:a?", "-c", "copy", "-avoid_negative_ts", "make_zero",
+            output
+        ])
+
+    def _concat(self, parts: List[str], output: str):
+        listing = os.path.join(os.path.dirname(output), "parts.txt")
+        with open(listing, "w") as f:
+            f.writelines(f"file '{os.path.abspath(part)}'\n" for part in parts)
+        self._run([
+            "ffmpeg", "-nostdin", "-v", "error", "-y",
+            "-f", "concat", "-safe", "0", "-i", listing, "-c", "copy", output
+        ])
+
+    def _cache_key(self, path: str, spans: Sequence[Span]) -> str:
+        stat = os.stat(path)
+        # A replaced source file gets new clips
+        source = f"{os.path.abspath(path)}:{stat.st_mtime_ns}:{stat.st_size}"
+        key = source + "|" + ";".join(f"{start:.3f}-{end:.3f}" for start, end in spans)
+        return hashlib.sha256(key.encode()).hexdigest()[:32]
+
+    def _evict(self, keep: str):
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_file():
+                stat = entry.stat()
+                entries.append((stat.st_atime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        in_use_after = time.time() - self.grace_seconds
+        for used_at, size, clip_path in sorted(entries):
+            if total <= self.max_bytes or used_at >= in_use_after:
+                break  # The rest were used more recently
+            if clip_path == keep:
+                continue
+            try:
+                os.remove(clip_path)
+            except FileNotFoundError:
+                pass  # Evicted concurrently
+            total -= size
+
+    def extract(self, path: str, spans: Sequence[Span]) -> str:
+        """Path of a cached clip of the spans (seconds) of the media file at path"""
+        spans = merge_spans(spans, self.merge_gap)
+        clip_path = os.path.join(self.cache_dir, self._cache_key(path, spans) + os.path.splitext(path)[1])
+        with self._lock:
+            building = self._building.setdefault(clip_path, threading.Lock())
+        # One build per clip; concurrent requests for it wait and then hit the cache
+        try:
+            with building:
+                try:
+                    os.utime(clip_path, ns=(time.time_ns(), os.stat(clip_path).st_mtime_ns))
+                    CLIP_CACHE.labels(result="hit").inc()
+                    return clip_path
+                except FileNotFoundError:
+                    pass
+                CLIP_CACHE.labels(result="miss").inc()
+                self._build(path, spans, clip_path)
+        finally:
+            with self._lock:
+                self._building.pop(clip_path, None)
+        with self._lock:
+            self._evict(keep=clip_path)
+        return clip_path
+
+    def _build(self, path: str, spans: Sequence[Span], clip_path: str):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        work_dir = tempfile.mkdtemp(dir=self.cache_dir)
+        try:
+            with track_stage("clip_extract"):
+                # Snapping can make neighbouring cuts overlap, so merge again
+                cuts = merge_spans(snap_to_keyframes(spans, self.keyframes(path, spans)))
+                ext = os.path.splitext(path)[1]
+                parts = [os.path.join(work_dir, f"part{i}{ext}") for i in range(len(cuts))]
+                for cut, part in zip(cuts, parts):
+                    self._cut(path, cut, part)
+                if len(parts) == 1:
+                    clip = parts[0]
+                else:
+                    clip = os.path.join(work_dir, f"clip{ext}")
+                    self._concat(parts, clip)
+                os.replace(clip, clip_path)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+clip_service = ClipService()
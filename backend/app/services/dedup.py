@@ -0,0 +1,111 @@
+from typing import Dict, List, Optional, Sequence
+import base64
+import re
+import zlib
+import numpy as np
+from ..core.config import settings
+
+# Mersenne prime for the universal hash family (a * x + b) mod p
+_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64(0xFFFFFFFF)
+
+class NearDuplicateDetector:
+    """
+    MinHash near-duplicate detection over word shingles.
+
+    The fraction of equal slots in two signatures estimates the Jaccard
+    similarity of the texts' shingle sets. Signatures are split into bands
+    for locality-sensitive hashing: texts above the threshold share at least
+    one band key with high probability, so candidates are found by exact
+    lookups on band keys and only those are compared.
+    """
+    TOKEN_PATTERN = re.compile(r"[a-z0-9']+")
+
+    def __init__(self, num_perm: int = settings.DEDUP_NUM_PERM, bands: int = settings.DEDUP_BANDS,
+                 shingle_size: int = settings.DEDUP_SHINGLE_SIZE, threshold: float = settings.DEDUP_THRESHOLD,
+                 seed: int = 1):
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands})")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.shingle_size = shingle_size
+        self.threshold = threshold
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, int(_PRIME), size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, int(_PRIME), size=num_perm, dtype=np.uint64)
+
+    def shingles(self, text: str) -> List[str]:
+        tokens = self.TOKEN_PATTERN.findall(text.lower())
+        if len(tokens) <= self.shingle_size:
+            return [" ".join(tokens)] if tokens else []
+        return [" ".join(tokens[i:i + self.shingle_size]) for i in range(len(tokens) - self.shingle_size + 1)]
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        """MinHash signature (uint32), or None for text without words"""
+        shingles = self.shingles(text)
+        if not shingles:
+            return None
+        hashes = np.array([zlib.crc32(shingle.encode("utf-8")) for shingle in set(shingles)], dtype=np.uint64)
+        # uint64 products wrap around; as in common MinHash implementations
+        # that still spreads the values well enough
+        permuted = (np.outer(hashes, self._a) + self._b) % _PRIME & _MAX_HASH
+        return permuted.min(axis=0).astype(np.uint32)
+
+    def band_keys(self, signature: np.ndarray) -> List[str]:
+        """LSH keys: one per band, prefixed with the band number"""
+        rows = signature.reshape(self.bands, -1)
+        return [f"{band}:{zlib.crc32(row.tobytes()):08x}" for band, row in enumerate(rows)]
+
+    @staticmethod
+    def similarity(a: np.ndarray, b: np.ndarray) -> float:
+        """Estimated Jaccard similarity of the shingle sets"""
+        return float(np.mean(a == b))
+
+    def within(self, signatures: Sequence[Optional[np.ndarray]]) -> List[Optional[int]]:
+        """For each signature, the index of an earlier near-duplicate in the list (or None)"""
+        buckets: Dict[str, List[int]] = {}
+        result: List[Optional[int]] = []
+        for i, signature in enumerate(signatures):
+            match = None
+            if signature is not None:
+                keys = self.band_keys(signature)
+                candidates = sorted({j for key in keys for j in buckets.get(key, [])})
+                match = next((j for j in candidates
+                              if self.similarity(signature, signatures[j]) >= self.threshold), None)
+                if match is None:
+                    # Only originals are candidates, so chains of duplicates don't drift
+                    for key in keys:
+                        buckets.setdefault(key, []).append(i)
+            result.append(match)
+        return result
+
+    def collapse(self, results: List[Dict]) -> List[Dict]:
+        """
+        Fold near-duplicate search results (best first) into the first one
+        of their kind, listed under its "duplicates"
+        """
+        kept: List[Dict] = []
+        kept_signatures: List[Optional[np.ndarray]] = []
+        for result in results:
+            signature = self.signature(result["text"])
+            match = None
+            if signature is not None:
+                match = next((i for i, other in enumerate(kept_signatures)
+                              if other is not None and self.similarity(signature, other) >= self.threshold), None)
+            if match is None:
+                kept.append(result)
+                kept_signatures.append(signature)
+            else:
+                kept[match].setdefault("duplicates", []).extend(
+                    [{"media_id": result["media_id"], "start_time": result["start_time"],
+                      "end_time": result["end_time"]}] + result.get("duplicates", [])
+                )
+        return kept
+
+def encode_signature(signature: np.ndarray) -> str:
+    return base64.b64encode(signature.astype("<u4").tobytes()).decode("ascii")
+
+def decode_signature(data: str) -> np.ndarray:
+    return np.frombuffer(base64.b64decode(data), dtype="<u4").astype(np.uint32)
+
+dedup_service = NearDuplicateDetector()
@@ -0,0 +1,63 @@
+import logging
+from typing import List, Optional
+from fastapi import BackgroundTasks
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+from .media_processor import MediaProcessor
+from .opensearch_service import opensearch_service
+from ..crud import async_crud_media
+
+logger = logging.getLogger(__name__)
+
+class DeletionService:
+    """Removes media from the database, the vector index and the filesystem together"""
+
+    async def delete_media(
+        self,
+        db: AsyncSession,
+        media_ids: List[int],
+        background_tasks: Optional[BackgroundTasks] = None
+    ) -> List[int]:
+        """
+        Delete media rows (with their transcriptions, segments and chunks) and
+        their indexed vectors. The DB deletes are only committed once the index
+        delete succeeds, so a failure leaves both stores untouched. File removal
+        is deferred to a background task when one is provided.
+
+        Returns the ids that existed and were deleted.
+        """
+        unique_ids = list(dict.fromkeys(media_ids))
+        removed = await async_crud_media.remove_many(db, ids=unique_ids, commit=False)
+        if not removed:
+            await db.rollback()
+            return []
+
+        deleted_ids = [media_id for media_id, _, _ in removed]
+        try:
+            await run_in_threadpool(opensearch_service.delete_by_media_ids, deleted_ids)
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            raise e
+
+        file_paths = []
+        for _, file_path, audio_path in removed:
+            file_paths.extend(path for path in (file_path, audio_path) if path)
+
+        if background_tasks is not None:
+            background_tasks.add_task(self.delete_files, file_paths)
+        else:
+            await run_in_threadpool(self.delete_files, file_paths)
+
+        return deleted_ids
+
+    @staticmethod
+    def delete_files(file_paths: List[str]) -> None:
+        """Delete files one by one, logging failures instead of aborting the batch"""
+        for file_path in dict.fromkeys(file_paths):
+            try:
+                MediaProcessor.delete_files(file_path)
+            except Exception as e:
+                logger.warning("Could not delete %s: %s", file_path, e)
+
+deletion_service = DeletionService()
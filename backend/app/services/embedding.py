@@ -1,35 +1,296 @@
 from sentence_transformers import SentenceTransformer
-from typing import List, Union
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Union
+import json
+import logging
+import multiprocessing
+import os
+import re
+import shutil
+import threading
+import zlib
 import numpy as np
+from .. import encode_pool
 from ..core.config import settings
+from ..core.metrics import track_stage, EMBEDDING_BATCH_SIZE
+from .scheduler import threads_per_job
+
+logger = logging.getLogger(__name__)
+
+class HashingEncoder:
+    """
+    Deterministic bag-of-words embeddings via feature hashing. Texts sharing
+    words get similar vectors, which is enough for benchmarks and local runs
+    without downloading a model.
+    """
+    TOKEN_PATTERN = re.compile(r"[a-z0-9']+")
+
+    def __init__(self, dimension: int = settings.EMBEDDING_DIMENSION):
+        self.dimension = dimension
+
+    def _encode_one(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        for token in self.TOKEN_PATTERN.findall(text.lower()):
+            digest = zlib.crc32(token.encode("utf-8"))
+            vector[digest % self.dimension] += 1.0 if digest & 0x80000000 else -1.0
+        return vector
+
+    def encode(self, text: Union[str, List[str]], normalize_embeddings: bool = True, **kwargs) -> np.ndarray:
+        texts = [text] if isinstance(text, str) else text
+        embeddings = np.stack([self._encode_one(t) for t in texts]) if texts \
+            else np.zeros((0, self.dimension), dtype=np.float32)
+        if normalize_embeddings:
+            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+            embeddings = embeddings / np.where(norms == 0, 1.0, norms)
+        return embeddings[0] if isinstance(text, str) else embeddings
+
+def mean_pool(token_embeddings: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+    """Average token embeddings over the unpadded tokens, like sentence-transformers' mean pooling"""
+    mask = attention_mask[..., None].astype(np.float32)
+    return (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+
+class OnnxEncoder:
+    """
+    A sentence-transformers model run on ONNX Runtime instead of PyTorch.
+
+    The model's transformer is exported to ONNX once and cached under
+    model_dir along with its tokenizer and pooling config; with quantize=True
+    the export is also dynamically quantized (int8 weights, activations
+    quantized at run time), which is smaller and faster on CPU at a small
+    cost in accuracy. Tokenization and pooling happen here, so inference
+    doesn't need torch.
+    """
+    SUPPORTED_MODULES = ("Transformer", "Pooling", "Normalize")
+
+    def __init__(self, model_name: str, quantize: bool = False,
+                 model_dir: str = settings.ONNX_MODEL_DIR, threads: int = settings.EMBEDDING_THREADS):
+        import onnxruntime
+        from transformers import AutoTokenizer
+
+        export_dir = os.path.join(model_dir, model_name.replace("/", "__"))
+        model_path = os.path.join(export_dir, "model.onnx")
+        if not os.path.exists(model_path):
+            self.export(model_name, export_dir)
+        if quantize:
+            quantized_path = os.path.join(export_dir, "model-int8.onnx")
+            if not os.path.exists(quantized_path):
+                self.quantize(model_path, quantized_path)
+            model_path = quantized_path
+
+        with open(os.path.join(export_dir, "pooling.json")) as f:
+            pooling = json.load(f)
+        self.pooling_mode = pooling["mode"]
+        self.max_seq_length = pooling["max_seq_length"]
+        self.dimension = pooling["dimension"]
+        self.tokenizer = AutoTokenizer.from_pretrained(export_dir)
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = onnxruntime.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = [model_input.name for model_input in self.session.get_inputs()]
+
+    @classmethod
+    def export(cls, model_name: str, export_dir: str):
+        """Export a sentence-transformers model's transformer, tokenizer and pooling config"""
+        import torch
+
+        model = SentenceTransformer(model_name, device="cpu")
+        module_names = [type(module).__name__ for module in model]
+        if any(name not in cls.SUPPORTED_MODULES for name in module_names):
+            raise ValueError(f"Can't export '{model_name}' to ONNX: unsupported modules {module_names}")
+        transformer, pooling = model[0], model[1]
+        if pooling.pooling_mode_cls_token:
+            mode = "cls"
+        elif pooling.pooling_mode_mean_tokens:
+            mode = "mean"
+        else:
+            raise ValueError(f"Can't export '{model_name}' to ONNX: unsupported pooling")
+
+        # Exported into a temporary directory and renamed, so concurrent
+        # workers never load a half-written model
+        tmp_dir = f"{export_dir}.tmp-{os.getpid()}"
+        os.makedirs(tmp_dir, exist_ok=True)
+        try:
+            transformer.tokenizer.save_pretrained(tmp_dir)
+            with open(os.path.join(tmp_dir, "pooling.json"), "w") as f:
+                json.dump({
+                    "mode": mode,
+                    "max_seq_length": model.max_seq_length,
+                    "dimension": model.get_sentence_embedding_dimension()
+                }, f)
+
+            sample = transformer.tokenizer(["An example sentence"], return_tensors="pt")
+            input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+            auto_model = transformer.auto_model.eval()
+            auto_model.config.return_dict = False  # Plain tuple outputs; the first is the token embeddings
+            with torch.no_grad():
+                torch.onnx.export(
+                    auto_model,
+                    tuple(sample[name] for name in input_names),
+                    os.path.join(tmp_dir, "model.onnx"),
+                    input_names=input_names,
+                    output_names=["token_embeddings"],
+                    dynamic_axes={name: {0: "batch", 1: "sequence"} for name in input_names + ["token_embeddings"]},
+                    opset_version=14
+                )
+            os.makedirs(os.path.dirname(export_dir) or ".", exist_ok=True)
+            try:
+                os.rename(tmp_dir, export_dir)
+            except OSError:
+                pass  # Another worker finished its export first
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    @staticmethod
+    def quantize(model_path: str, quantized_path: str):
+        """Dynamically quantize an exported model's weights to int8"""
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+
+        tmp_path = f"{quantized_path}.tmp-{os.getpid()}"
+        quantize_dynamic(model_path, tmp_path, weight_type=QuantType.QInt8)
+        os.replace(tmp_path, quantized_path)
+
+    def encode(self, text: Union[str, List[str]], normalize_embeddings: bool = True,
+               batch_size: int = 32, **kwargs) -> np.ndarray:
+        texts = [text] if isinstance(text, str) else list(text)
+        batches = []
+        for i in range(0, len(texts), batch_size):
+            tokens = self.tokenizer(texts[i:i + batch_size], padding=True, truncation=True,
+                                    max_length=self.max_seq_length, return_tensors="np")
+            token_embeddings, = self.session.run(
+                ["token_embeddings"],
+                {name: tokens[name].astype(np.int64) for name in self.input_names}
+            )
+            if self.pooling_mode == "cls":
+                batches.append(token_embeddings[:, 0])
+            else:
+                batches.append(mean_pool(token_embeddings, tokens["attention_mask"]))
+        embeddings = np.concatenate(batches).astype(np.float32) if batches \
+            else np.zeros((0, self.dimension), dtype=np.float32)
+        if normalize_embeddings:
+            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+            embeddings = embeddings / np.where(norms == 0, 1.0, norms)
+        return embeddings[0] if isinstance(text, str) else embeddings
+
+EMBEDDING_BACKENDS = ("torch", "onnx", "onnx-int8")
+
+def parse_cpu_list(cpus: str) -> List[int]:
+    """CPU ids from a list like "0-3,8,10-11" """
+    result = []
+    for part in filter(None, (part.strip() for part in cpus.split(","))):
+        first, _, last = part.partition("-")
+        result.extend(range(int(first), int(last or first) + 1))
+    return result
 
 class EmbeddingService:
-    def __init__(self, model_name: str = 'all-MiniLM-L6-v2'):
-        self.model = SentenceTransformer(model_name)
+    def __init__(self, model_name: str = settings.EMBEDDING_MODEL,
+                 backend: str = settings.EMBEDDING_BACKEND,
+                 processes: int = settings.EMBEDDING_PROCESSES):
+        if backend not in EMBEDDING_BACKENDS:
+            raise ValueError(f"Unknown embedding backend '{backend}'. Choose from: {', '.join(EMBEDDING_BACKENDS)}")
+        self.model_name = model_name
+        self.backend = backend
+        self.processes = processes
+        self.model = self._load_model(settings.EMBEDDING_THREADS)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+    
+    def _load_model(self, threads: int):
+        if self.model_name == "hashing":
+            return HashingEncoder(settings.EMBEDDING_DIMENSION)
+        if self.backend == "torch":
+            return SentenceTransformer(self.model_name)
+        return OnnxEncoder(self.model_name, quantize=self.backend == "onnx-int8", threads=threads)
+    
+    @property
+    def dimension(self) -> int:
+        if isinstance(self.model, SentenceTransformer):
+            return self.model.get_sentence_embedding_dimension()
+        return self.model.dimension
     
     def generate_embedding(self, text: Union[str, List[str]]) -> np.ndarray:
         """
         Generate embeddings for a single text or list of texts
         """
+        EMBEDDING_BATCH_SIZE.observe(1 if isinstance(text, str) else len(text))
         try:
-            embeddings = self.model.encode(text, normalize_embeddings=True)
+            with track_stage("embedding_encode"):
+                embeddings = self.model.encode(text, normalize_embeddings=True,
+                                               batch_size=1 if isinstance(text, str) else max(1, len(text)))
             #print(text, embeddings)
             return embeddings
         except Exception as e:
             raise Exception(f"Error generating embedding: {str(e)}")
     
-    def generate_embeddings_batch(self, texts: List[str], batch_size: int = 32) -> List[np.ndarray]:
+    def generate_embeddings_batch(self, texts: List[str],
+                                  batch_size: int = settings.EMBEDDING_BATCH_SIZE) -> np.ndarray:
         """
-        Generate embeddings for a list of texts in batches
+        Generate embeddings for a list of texts as a (len(texts), dimension)
+        float32 matrix whose rows are in input order. Texts are batched by
+        length so short chunks aren't padded up to long ones; large inputs
+        are split across the encode pool when EMBEDDING_PROCESSES is set.
         """
         try:
-            embeddings = []
-            for i in range(0, len(texts), batch_size):
-                batch = texts[i:i + batch_size]
-                batch_embeddings = self.generate_embedding(batch)
-                embeddings.extend(batch_embeddings)
+            embeddings = np.empty((len(texts), self.dimension), dtype=np.float32)
+            order = np.argsort([len(text) for text in texts], kind="stable").astype(np.int64)
+            pool = self._get_pool() if len(texts) >= settings.EMBEDDING_POOL_MIN_TEXTS else None
+            if pool is None:
+                self._encode_into(embeddings, order, texts, batch_size)
+                return embeddings
+            
+            # Several batches per task keep the inter-process overhead small
+            # while still balancing the load between workers
+            part_size = batch_size * 8
+            parts = [order[i:i + part_size] for i in range(0, len(order), part_size)]
+            futures = [pool.submit(encode_pool.encode, [texts[row] for row in rows], batch_size) for rows in parts]
+            for rows, future in zip(parts, futures):
+                embeddings[rows] = future.result()
             return embeddings
         except Exception as e:
             raise Exception(f"Error generating batch embeddings: {str(e)}")
+    
+    def _encode_into(self, embeddings: np.ndarray, rows: np.ndarray, texts: List[str], batch_size: int):
+        """Encode texts[rows] batch by batch, in the order of rows, into embeddings[rows]"""
+        for i in range(0, len(rows), batch_size):
+            batch_rows = rows[i:i + batch_size]
+            embeddings[batch_rows] = self.generate_embedding([texts[row] for row in batch_rows])
+    
+    def _get_pool(self) -> Optional[ProcessPoolExecutor]:
+        """
+        The encode pool, started on first use; None when disabled. Each
+        spawned worker loads its own model (see app.encode_pool), so it
+        takes a while to warm up and costs a model's memory per worker:
+        meant for batch jobs, not the API server.
+        """
+        if self.processes <= 0:
+            return None
+        with self._pool_lock:
+            if self._pool is None:
+                context = multiprocessing.get_context("spawn")
+                cpus = parse_cpu_list(settings.EMBEDDING_CPU_AFFINITY)
+                cpu_sets = None
+                if cpus:
+                    # Each worker gets its own contiguous block of the CPU list
+                    cpu_sets = context.SimpleQueue()
+                    for block in np.array_split(cpus, self.processes):
+                        cpu_sets.put([int(cpu) for cpu in block] or cpus)
+                threads = settings.EMBEDDING_THREADS or \
+                    threads_per_job(min(len(cpus), os.cpu_count() or 1) if cpus else 0, self.processes)
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.processes,
+                    mp_context=context,
+                    initializer=encode_pool.init_worker,
+                    initargs=(self.model_name, self.backend, threads, cpu_sets)
+                )
+            return self._pool
+    
+    def close(self):
+        """Shut the encode pool down"""
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
 
-embedding_service = EmbeddingService() 
\ No newline at end of file
+embedding_service = EmbeddingService()
@@ -0,0 +1,175 @@
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from ..core.config import settings
+
+@dataclass
+class Fingerprint:
+    hashes: np.ndarray   # int64 landmark hashes
+    offsets: np.ndarray  # int32 anchor frame of each hash
+    duration: float      # Seconds of audio fingerprinted
+
+@dataclass
+class FingerprintMatch:
+    media_id: int
+    offset: float        # Where the fingerprinted audio starts in the matched recording (seconds)
+    matched: int         # Hashes aligned at that offset
+    ratio: float         # matched / hashes looked up
+
+class AudioFingerprinter:
+    """
+    Landmark audio fingerprints. Peaks of the log spectrogram (local maxima
+    over a time/frequency neighbourhood) are paired with the next few peaks
+    after them, and each pair is hashed as (f1, f2, dt). Peaks survive
+    re-encoding, bitrate and container changes, so two copies of a
+    recording share many hashes, all at one time offset, which is the trim
+    between them.
+    """
+    SAMPLE_RATE = 8000  # Peaks are taken below 4 kHz, where speech energy is
+
+    def __init__(self, n_fft: int = 512, hop: int = 256, neighborhood: tuple = (10, 15),
+                 min_db: float = 10.0, fan_out: int = 4, max_dt: int = 63):
+        self.n_fft = n_fft
+        self.hop = hop
+        self.neighborhood = neighborhood  # (frames, bins) either side of a peak
+        self.min_db = min_db              # Peaks must stand this far above the median level
+        self.fan_out = fan_out
+        self.max_dt = max_dt
+
+    @property
+    def frame_seconds(self) -> float:
+        return self.hop / self.SAMPLE_RATE
+
+    def spectrogram(self, samples: np.ndarray) -> np.ndarray:
+        """Log-magnitude spectrogram in dB, shape (frames, bins)"""
+        if len(samples) < self.n_fft:
+            return np.zeros((0, self.n_fft // 2 + 1), dtype=np.float32)
+        frames = sliding_window_view(samples.astype(np.float32), self.n_fft)[::self.hop]
+        magnitude = np.abs(np.fft.rfft(frames * np.hanning(self.n_fft).astype(np.float32), axis=1))
+        return 20 * np.log10(magnitude + 1e-6)
+
+    @staticmethod
+    def _max_filter(values: np.ndarray, size: int, axis: int) -> np.ndarray:
+        padded = np.pad(values, [(size, size) if a == axis else (0, 0) for a in range(values.ndim)],
+                        mode="constant", constant_values=-np.inf)
+        return sliding_window_view(padded, 2 * size + 1, axis=axis).max(axis=-1)
+
+    def peaks(self, spectrogram: np.ndarray) -> np.ndarray:
+        """(frame, bin) of each spectral peak, ordered by frame then bin"""
+        if spectrogram.size == 0:
+            return np.zeros((0, 2), dtype=np.int64)
+        # Separable maximum filter: neighbourhood maximum over time, then frequency
+        local_max = self._max_filter(self._max_filter(spectrogram, self.neighborhood[0], 0),
+                                     self.neighborhood[1], 1)
+        is_peak = (spectrogram == local_max) & (spectrogram > np.median(spectrogram) + self.min_db)
+        return np.argwhere(is_peak)
+
+    def fingerprint(self, samples: np.ndarray) -> Fingerprint:
+        """Landmark hashes of mono samples at SAMPLE_RATE"""
+        peaks = self.peaks(self.spectrogram(samples))
+        times, bins = peaks[:, 0], peaks[:, 1]
+        hashes, offsets = [], []
+        # Pair every anchor with the next fan_out peaks, one shift at a time
+        for shift in range(1, self.fan_out + 1):
+            dt = times[shift:] - times[:-shift]
+            valid = (dt > 0) & (dt <= self.max_dt)
+            anchors = np.flatnonzero(valid)
+            hashes.append((bins[anchors] << 15) | (bins[anchors + shift] << 6) | dt[anchors])
+            offsets.append(times[anchors])
+        return Fingerprint(
+            hashes=np.concatenate(hashes).astype(np.int64) if hashes else np.zeros(0, dtype=np.int64),
+            offsets=np.concatenate(offsets).astype(np.int32) if offsets else np.zeros(0, dtype=np.int32),
+            duration=len(samples) / self.SAMPLE_RATE
+        )
+
+    def probe(self, fingerprint: Fingerprint, seconds: float, start: float = 0.0) -> Fingerprint:
+        """The part of a fingerprint anchored in `seconds` of audio from `start` (offsets stay absolute)"""
+        mask = (fingerprint.offsets >= start / self.frame_seconds) & \
+            (fingerprint.offsets < (start + seconds) / self.frame_seconds)
+        return Fingerprint(fingerprint.hashes[mask], fingerprint.offsets[mask],
+                           max(0.0, min(fingerprint.duration - start, seconds)))
+
+    def probes(self, fingerprint: Fingerprint, seconds: float) -> List[Fingerprint]:
+        """Probes of the first, middle and last `seconds` of audio (just one for short audio)"""
+        latest = max(0.0, fingerprint.duration - seconds)
+        return [self.probe(fingerprint, seconds, start) for start in sorted({0.0, latest / 2, latest})]
+
+    def best_match(self, query: Fingerprint, hashes: np.ndarray, media_ids: np.ndarray,
+                   offsets: np.ndarray, min_matches: int = settings.FINGERPRINT_MIN_MATCHES,
+                   min_ratio: float = settings.FINGERPRINT_MIN_MATCH_RATIO) -> Optional[FingerprintMatch]:
+        """
+        The stored recording sharing the most hashes with the query at a
+        single time offset, from the index rows (hash, media_id, offset)
+        whose hash occurs in the query; None below the thresholds.
+        """
+        if len(query.hashes) == 0 or len(hashes) == 0:
+            return None
+        # Pair every index row with every query occurrence of its hash
+        order = np.argsort(query.hashes, kind="stable")
+        sorted_hashes, sorted_offsets = query.hashes[order], query.offsets[order]
+        left = np.searchsorted(sorted_hashes, hashes, side="left")
+        counts = np.searchsorted(sorted_hashes, hashes, side="right") - left
+        rows = np.repeat(np.arange(len(hashes)), counts)
+        within = np.arange(len(rows)) - np.repeat(np.cumsum(counts) - counts, counts)
+        deltas = offsets[rows].astype(np.int64) - sorted_offsets[left[rows] + within]
+
+        # Histogram of (media, offset); a neighbouring offset counts too, as a
+        # trim that isn't a whole number of frames splits peaks between two
+        pairs, pair_counts = np.unique(np.stack([media_ids[rows].astype(np.int64), deltas], axis=1),
+                                       axis=0, return_counts=True)
+        if len(pairs) == 0:
+            return None
+        lookup = {(int(media), int(delta)): int(count) for (media, delta), count in zip(pairs, pair_counts)}
+        (media_id, delta), matched = max(
+            (((media, delta), count + lookup.get((media, delta - 1), 0) + lookup.get((media, delta + 1), 0))
+             for (media, delta), count in lookup.items()),
+            key=lambda item: item[1]
+        )
+        ratio = matched / len(query.hashes)
+        if matched < min_matches or ratio < min_ratio:
+            return None
+        return FingerprintMatch(media_id=media_id, offset=delta * self.frame_seconds,
+                                matched=matched, ratio=ratio)
+
+    def match_throughout(self, probes: List[Fingerprint], hashes: np.ndarray, media_ids: np.ndarray,
+                         offsets: np.ndarray) -> Optional[FingerprintMatch]:
+        """
+        The stored recording the whole fingerprinted audio is a copy of: the
+        best match of all probes together, provided every probe on its own
+        matches that recording at the same offset. Recordings that only
+        share a part (the same intro, a jingle) are not copies. Probes
+        without hashes (silence) can't disagree and are skipped.
+        """
+        if not probes:
+            return None
+        combined = Fingerprint(np.concatenate([probe.hashes for probe in probes]),
+                               np.concatenate([probe.offsets for probe in probes]),
+                               sum(probe.duration for probe in probes))
+        match = self.best_match(combined, hashes, media_ids, offsets)
+        if match is None:
+            return None
+        candidate = media_ids == match.media_id
+        for probe in probes:
+            if len(probe.hashes) == 0:
+                continue
+            part = self.best_match(probe, hashes[candidate], media_ids[candidate], offsets[candidate])
+            # One frame either way, as best_match merges neighbouring offsets
+            if part is None or abs(part.offset - match.offset) > 1.5 * self.frame_seconds:
+                return None
+        return match
+
+def align_segments(segments: List[Tuple[str, float, float]], offset: float,
+                   duration: float) -> List[Tuple[str, float, float]]:
+    """
+    Segments of a recording moved onto the timeline of a copy that starts
+    `offset` seconds into it and lasts `duration`: segments centred outside
+    the copy are dropped and the rest are clipped to it.
+    """
+    aligned = []
+    for text, start, end in segments:
+        if 0.0 <= (start + end) / 2 - offset < duration:
+            aligned.append((text, max(0.0, start - offset), min(duration, end - offset)))
+    return aligned
+
+fingerprinter = AudioFingerprinter()
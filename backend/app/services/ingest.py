@@ -0,0 +1,292 @@
+from typing import List, Optional
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+import numpy as np
+from .media_processor import MediaProcessor
+from .transcription import TranscriptionService, DecodingOptions, window_bounds
+from .checkpoints import TranscriptionCheckpoint
+from .chunking import ChunkingService
+from .embedding import embedding_service
+from .opensearch_service import opensearch_service
+from .vad import vad_service
+from .dedup import dedup_service
+from .fingerprint import Fingerprint, fingerprinter, align_segments
+from .scheduler import transcription_scheduler, embedding_scheduler
+from ..crud import async_crud_media
+from ..schemas.media import MediaCreate
+from ..core.config import settings
+from ..core.metrics import DEDUP_CHUNKS, FINGERPRINT_LOOKUPS
+
+class IngestError(Exception):
+    """Processing failed after the media row was created; finished windows stay searchable"""
+    def __init__(self, error: Exception, media_id: int):
+        super().__init__(error.detail if isinstance(error, HTTPException) else str(error))
+        self.error = error
+        self.media_id = media_id
+
+class IngestService:
+    """
+    The processing pipeline behind uploads and bulk ingest: audio extraction,
+    copy detection, VAD, windowed transcription, chunking, embedding, storage
+    and indexing. Blocking stages run in the threadpool so they don't stall
+    the event loop, and transcription and embedding wait for a scheduler
+    slot so concurrent ingests don't oversubscribe the CPU.
+    """
+    def __init__(self):
+        self.transcription_service = TranscriptionService()
+        self.chunking_service = ChunkingService()
+
+    async def ingest(self, db: AsyncSession, file_path: str, filename: str, *,
+                     model_size: Optional[str] = None,
+                     decoding_options: Optional[DecodingOptions] = None,
+                     collection_id: str = settings.DEFAULT_COLLECTION,
+                     priority: str = "interactive",
+                     tenant: str = "default") -> int:
+        """
+        Process a saved media file and return its media id. Long media is
+        processed in windows that are searchable as soon as they finish;
+        ingesting the same file again after a failure resumes from the last
+        finished window. A re-encoded or trimmed copy of a processed
+        recording reuses its transcription. Failures after the media row
+        exists raise IngestError with its id.
+        """
+        media_id = None
+        try:
+            audio_path = await run_in_threadpool(MediaProcessor.extract_audio, file_path)
+
+            # A re-encoded or trimmed copy of a processed recording reuses its
+            # transcription instead of going through Whisper again
+            fingerprint = None
+            if settings.FINGERPRINT_ENABLED:
+                fingerprint = await run_in_threadpool(MediaProcessor.fingerprint_audio, audio_path)
+                segments = await self._transcription_of_copy(db, fingerprint)
+                FINGERPRINT_LOOKUPS.labels(result="new" if segments is None else "copy").inc()
+                if segments is not None:
+                    db_media = await async_crud_media.create_with_transcription(
+                        db=db,
+                        media=MediaCreate(filename=filename, file_path=file_path, audio_path=audio_path,
+                                          collection_id=collection_id),
+                        segments=[],
+                        chunks=[]
+                    )
+                    media_id = db_media.id
+                    await self._store_window(
+                        db, media_id, segments, 0,
+                        start_time=0.0,
+                        end_time=float("inf"),
+                        collection_id=collection_id,
+                        priority=priority,
+                        tenant=tenant
+                    )
+                    await self._release_audio(db, media_id)
+                    return media_id
+
+            # Only speech regions are transcribed; timestamps are mapped back to
+            # the original timeline
+            speech_path, timeline = await run_in_threadpool(vad_service.extract_speech, audio_path)
+            if speech_path == audio_path:
+                # Windowed transcription seeks in raw frames; stored FLAC/Opus is decoded for it
+                speech_path = await run_in_threadpool(MediaProcessor.decode_wav, audio_path)
+
+            checkpoint = await run_in_threadpool(
+                TranscriptionCheckpoint.open,
+                file_path,
+                backend=self.transcription_service.backend,
+                model_size=model_size or self.transcription_service.default_model_size,
+                options=decoding_options or DecodingOptions.from_settings(),
+                window_seconds=settings.TRANSCRIPTION_WINDOW_SECONDS,
+                vad=settings.VAD_ENABLED,
+                collection_id=collection_id
+            )
+
+            # Resume into the media a previous attempt created, if it still exists
+            db_media = None
+            if checkpoint.media_id is not None:
+                db_media = await async_crud_media.get(db, checkpoint.media_id)
+            if db_media is None:
+                db_media = await async_crud_media.create_with_transcription(
+                    db=db,
+                    media=MediaCreate(filename=filename, file_path=file_path, audio_path=audio_path,
+                                      collection_id=collection_id),
+                    segments=[],
+                    chunks=[]
+                )
+            media_id = db_media.id
+            await run_in_threadpool(checkpoint.attach_media, media_id)
+
+            # Transcribe, store and index window by window so long media becomes
+            # searchable as it goes and a restart resumes at the first unfinished window
+            windows = window_bounds(timeline.speech_seconds, settings.TRANSCRIPTION_WINDOW_SECONDS) \
+                if speech_path is not None else []
+            segment_offset = 0
+            try:
+                for index, (start, end) in enumerate(windows):
+                    segments = checkpoint.segments(index)
+                    if segments is None:
+                        # Shorter windows (and clips) are scheduled first
+                        segments = await transcription_scheduler.run(
+                            self.transcription_service.transcribe_window,
+                            speech_path,
+                            start,
+                            end,
+                            model_size=model_size,
+                            options=decoding_options,
+                            priority=priority,
+                            tenant=tenant,
+                            cost=end - start
+                        )
+                        segments = timeline.map_segments(segments)
+                        await run_in_threadpool(checkpoint.record_window, index, segments)
+
+                    if not checkpoint.is_indexed(index):
+                        last = index == len(windows) - 1
+                        await self._store_window(
+                            db, media_id, segments, segment_offset,
+                            start_time=timeline.to_original(start),
+                            end_time=float("inf") if last else timeline.to_original(end, end=True),
+                            collection_id=collection_id,
+                            priority=priority,
+                            tenant=tenant
+                        )
+                        await run_in_threadpool(checkpoint.mark_indexed, index)
+                    segment_offset += len(segments)
+            finally:
+                if speech_path is not None and speech_path != audio_path:
+                    MediaProcessor.delete_files(speech_path)
+
+            if fingerprint is not None:
+                # Only fully processed media go into the fingerprint index, so a
+                # match always has a complete transcription to reuse
+                await async_crud_media.replace_fingerprint(
+                    db,
+                    media_id=media_id,
+                    hashes=fingerprint.hashes.tolist(),
+                    frames=fingerprint.offsets.tolist()
+                )
+            await run_in_threadpool(checkpoint.discard)
+            await self._release_audio(db, media_id)
+            return media_id
+        except Exception as e:
+            if media_id is None:
+                raise
+            raise IngestError(e, media_id) from e
+
+    async def _release_audio(self, db: AsyncSession, media_id: int):
+        """Drop the extracted audio once the media is indexed, unless it is kept"""
+        if settings.AUDIO_KEEP_AFTER_INGEST:
+            return
+        db_media = await async_crud_media.get(db, media_id)
+        audio_path = db_media.audio_path
+        await async_crud_media.update(db, db_obj=db_media, obj_in={"audio_path": None})
+        if audio_path and audio_path != db_media.file_path:
+            await run_in_threadpool(MediaProcessor.delete_files, audio_path)
+
+    async def _transcription_of_copy(self, db: AsyncSession, fingerprint: Fingerprint) -> Optional[List[tuple]]:
+        """
+        Segments of the processed recording this audio is a copy of, moved onto
+        the copy's timeline, or None when there is no such recording
+        """
+        probes = fingerprinter.probes(fingerprint, settings.FINGERPRINT_PROBE_SECONDS)
+        rows = await async_crud_media.find_fingerprint_hashes(
+            db, np.unique(np.concatenate([probe.hashes for probe in probes])).tolist()
+        )
+        if not rows:
+            return None
+        hashes, media_ids, frames = (np.array(column) for column in zip(*rows))
+        match = fingerprinter.match_throughout(probes, hashes, media_ids, frames)
+        if match is None:
+            return None
+
+        # The copy must lie within the original, give or take a little padding
+        segments = await async_crud_media.get_segments(db, match.media_id)
+        extent = max(
+            await async_crud_media.fingerprint_extent(db, match.media_id) * fingerprinter.frame_seconds,
+            max((end for _, _, end in segments), default=0.0)
+        )
+        tolerance = settings.FINGERPRINT_TRIM_TOLERANCE_SECONDS
+        if match.offset < -tolerance or match.offset + fingerprint.duration > extent + tolerance:
+            return None
+        return align_segments(segments, match.offset, fingerprint.duration)
+
+    async def _store_window(self, db: AsyncSession, media_id: int, segments: List[tuple], segment_offset: int,
+                            start_time: float, end_time: float, collection_id: str,
+                            priority: str, tenant: str):
+        """Chunk, embed, store and index one transcription window"""
+        chunks = await run_in_threadpool(self.chunking_service.create_chunks, segments)
+        chunk_texts = [chunk.text for chunk in chunks]
+        chunk_ids = [chunk.segment_ids[0] + segment_offset for chunk in chunks]
+
+        # Near-duplicates of indexed chunks (or of earlier chunks in this window)
+        # reuse that chunk's vector instead of being embedded and indexed again
+        duplicate_of: List[Optional[dict]] = [None] * len(chunks)
+        signatures = [None] * len(chunks)
+        if settings.DEDUP_ENABLED:
+            signatures = [dedup_service.signature(text) for text in chunk_texts]
+            duplicate_of = await run_in_threadpool(
+                opensearch_service.find_duplicates,
+                signatures,
+                collection_id,
+                # A resumed window must not match the documents its last attempt wrote
+                frozenset(f"{media_id}_{chunk_id}" for chunk_id in chunk_ids)
+            )
+            for i, earlier in enumerate(dedup_service.within(signatures)):
+                if duplicate_of[i] is None and earlier is not None:
+                    duplicate_of[i] = duplicate_of[earlier] or \
+                        {"id": f"{media_id}_{chunk_ids[earlier]}", "media_id": str(media_id)}
+        unique = [i for i, original in enumerate(duplicate_of) if original is None]
+        DEDUP_CHUNKS.labels(kind="unique").inc(len(unique))
+        DEDUP_CHUNKS.labels(kind="duplicate").inc(len(chunks) - len(unique))
+
+        # Generate embeddings for chunks
+        chunk_embeddings = await embedding_scheduler.run(
+            embedding_service.generate_embeddings_batch,
+            [chunk_texts[i] for i in unique],
+            priority=priority,
+            tenant=tenant,
+            cost=len(unique)
+        )
+
+        # Save to database, replacing anything an interrupted attempt wrote
+        await async_crud_media.replace_window(
+            db,
+            media_id=media_id,
+            start_time=start_time,
+            end_time=end_time,
+            segments=segments,
+            chunks=[{
+                "text": chunk.text,
+                "start_time": chunk.start_time,
+                "end_time": chunk.end_time
+            } for chunk in chunks]
+        )
+
+        # Index chunks in OpenSearch; ids count segments across windows, so
+        # re-indexing a window overwrites its earlier documents. Originals go
+        # first so duplicates never point at a missing chunk.
+        for i, embedding in zip(unique, chunk_embeddings):
+            await run_in_threadpool(
+                opensearch_service.index_chunk,
+                chunk_id=chunk_ids[i],
+                media_id=media_id,
+                text=chunks[i].text,
+                start_time=chunks[i].start_time,
+                end_time=chunks[i].end_time,
+                vector=embedding,
+                collection_id=collection_id,
+                signature=signatures[i]
+            )
+        for i, original in enumerate(duplicate_of):
+            if original is not None:
+                await run_in_threadpool(
+                    opensearch_service.index_duplicate,
+                    chunk_id=chunk_ids[i],
+                    media_id=media_id,
+                    text=chunks[i].text,
+                    start_time=chunks[i].start_time,
+                    end_time=chunks[i].end_time,
+                    duplicate_of=original,
+                    collection_id=collection_id
+                )
+
+ingest_service = IngestService()
@@ -0,0 +1,134 @@
+import re
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..core.config import settings
+from ..core.metrics import timed
+
+LEXICAL_SOURCES = ("chunks", "segments")
+
+# Markers highlight() and snippet() put around matched terms; turned into offsets
+_MATCH_START, _MATCH_END = "\x01", "\x02"
+
+_TOKEN = re.compile(r'"([^"]*)"?|(\w+\*?)')
+_WORD = re.compile(r"\w+")
+
+def fts_query(query: str) -> str:
+    """
+    FTS5 MATCH expression for a free-text query: "quoted phrases" match as
+    phrases, other words as terms (word* as a prefix), any of them may match
+    and BM25 ranks documents matching more of them higher. Everything is
+    quoted, so FTS5 operators and punctuation in user input are just words.
+    """
+    parts = []
+    for phrase, word in _TOKEN.findall(query):
+        if word:
+            parts.append(f'"{word.rstrip("*")}"' + ("*" if word.endswith("*") else ""))
+        elif _WORD.search(phrase):
+            parts.append('"' + " ".join(_WORD.findall(phrase)) + '"')
+    return " OR ".join(parts)
+
+def match_offsets(marked: str) -> Tuple[str, List[List[int]]]:
+    """Text without the match markers, and [start, end) character offsets of the matches in it"""
+    plain: List[str] = []
+    offsets: List[List[int]] = []
+    length = 0
+    for piece in re.split(f"([{_MATCH_START}{_MATCH_END}])", marked):
+        if piece == _MATCH_START:
+            offsets.append([length, length])
+        elif piece == _MATCH_END:
+            offsets[-1][1] = length
+        else:
+            plain.append(piece)
+            length += len(piece)
+    return "".join(plain), offsets
+
+_SOURCE_QUERIES = {
+    "chunks": """
+        SELECT chunks.id, chunks.media_id, chunks.start_time, chunks.end_time, media.collection_id,
+               highlight(chunks_fts, 0, :start, :end) AS marked,
+               snippet(chunks_fts, 0, :start, :end, '…', :tokens) AS snippet,
+               bm25(chunks_fts) AS rank
+        FROM chunks_fts
+        JOIN chunks ON chunks.id = chunks_fts.rowid
+        JOIN media ON media.id = chunks.media_id
+        WHERE chunks_fts MATCH :query {collection_filter}
+        ORDER BY rank
+        LIMIT :k
+    """,
+    "segments": """
+        SELECT transcription_segments.id, transcriptions.media_id, transcription_segments.start_time,
+               transcription_segments.end_time, media.collection_id,
+               highlight(transcription_segments_fts, 0, :start, :end) AS marked,
+               snippet(transcription_segments_fts, 0, :start, :end, '…', :tokens) AS snippet,
+               bm25(transcription_segments_fts) AS rank
+        FROM transcription_segments_fts
+        JOIN transcription_segments ON transcription_segments.id = transcription_segments_fts.rowid
+        JOIN transcriptions ON transcriptions.id = transcription_segments.transcription_id
+        JOIN media ON media.id = transcriptions.media_id
+        WHERE transcription_segments_fts MATCH :query {collection_filter}
+        ORDER BY rank
+        LIMIT :k
+    """,
+}
+
+class LexicalSearchService:
+    """
+    BM25 keyword and phrase search over transcripts with SQLite's FTS5
+    indexes (see app.models.fts), at chunk or segment granularity. It runs
+    inside the database, so it needs neither OpenSearch nor the embedding
+    model and keeps answering when the cluster is slow or down. Scores are
+    BM25 (higher is better) and not comparable to semantic similarities.
+    """
+    def __init__(self, snippet_tokens: int = settings.LEXICAL_SNIPPET_TOKENS):
+        self.snippet_tokens = snippet_tokens
+
+    @staticmethod
+    def available(db: AsyncSession) -> bool:
+        return db.get_bind().dialect.name == "sqlite"
+
+    @timed("lexical_search")
+    async def search(self, db: AsyncSession, query: str, k: int = 5, collection_id: Optional[str] = None,
+                     source: str = "chunks") -> List[Dict[str, Any]]:
+        """
+        Best k chunks (or transcript segments) for a query, each with a
+        snippet and the character offsets of the matched terms in its text
+        ("highlights") and in the snippet ("snippet_highlights")
+        """
+        return [result async for result in self.stream(db, query, k, collection_id, source)]
+
+    async def stream(self, db: AsyncSession, query: str, k: int = 5, collection_id: Optional[str] = None,
+                     source: str = "chunks") -> AsyncIterator[Dict[str, Any]]:
+        """The results of search, best first, each as soon as its row is read"""
+        if source not in LEXICAL_SOURCES:
+            raise ValueError(f"Unknown lexical source '{source}'. Choose from: {', '.join(LEXICAL_SOURCES)}")
+        if not self.available(db):
+            raise RuntimeError("Lexical search needs an SQLite database (FTS5)")
+        match = fts_query(query)
+        if not match:
+            return
+        statement = _SOURCE_QUERIES[source].format(
+            collection_filter="AND media.collection_id = :collection_id" if collection_id is not None else ""
+        )
+        rows = await db.stream(text(statement), {
+            "query": match, "k": k, "collection_id": collection_id,
+            "start": _MATCH_START, "end": _MATCH_END, "tokens": self.snippet_tokens,
+        })
+
+        async for row_id, media_id, start_time, end_time, row_collection, marked, marked_snippet, rank in rows:
+            row_text, highlights = match_offsets(marked or "")
+            snippet, snippet_highlights = match_offsets(marked_snippet or "")
+            yield {
+                "id": f"{media_id}_{row_id}" if source == "chunks" else f"segment_{row_id}",
+                "text": row_text,
+                "media_id": str(media_id),
+                "collection_id": row_collection,
+                "start_time": start_time,
+                "end_time": end_time,
+                "score": -rank,  # FTS5's bm25() is lower for better matches
+                "highlights": highlights,
+                "snippet": snippet,
+                "snippet_highlights": snippet_highlights,
+            }
+
+lexical_search_service = LexicalSearchService()
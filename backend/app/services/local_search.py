@@ -0,0 +1,323 @@
+import copy
+import itertools
+import json
+import threading
+from typing import Any, Dict, List, Optional
+import numpy as np
+from opensearchpy.exceptions import ConflictError
+from opensearchpy.serializer import JSONSerializer
+from .opensearch_service import IndexConfig
+from .vector_store import LocalVectorStore
+
+class _LocalIndex:
+    def __init__(self, body: Dict[str, Any]):
+        self.body = copy.deepcopy(body)
+        self.body.setdefault("settings", {}).setdefault("index", {})
+        self.config = IndexConfig.from_index(self.body)
+        self.docs: Dict[str, Dict[str, Any]] = {}
+        self.seq_nos: Dict[str, int] = {}
+        self.next_seq_no = itertools.count()
+        self.vectors = LocalVectorStore(dimension=self.config.dimension, quantization=self.config.quantization)
+
+class _LocalIndices:
+    def __init__(self, lock: threading.RLock):
+        self._lock = lock
+        self.indices: Dict[str, _LocalIndex] = {}
+        self.aliases: Dict[str, List[str]] = {}
+
+    def resolve(self, name) -> List[str]:
+        with self._lock:
+            names = name if isinstance(name, list) else [name]
+            resolved = []
+            for index_name in names:
+                if index_name in self.aliases:
+                    resolved.extend(self.aliases[index_name])
+                elif index_name in self.indices:
+                    resolved.append(index_name)
+                else:
+                    raise KeyError(f"no such index [{index_name}]")
+            return resolved
+
+    def exists(self, index) -> bool:
+        with self._lock:
+            return index in self.indices or index in self.aliases
+
+    def exists_alias(self, name) -> bool:
+        with self._lock:
+            return name in self.aliases
+
+    def get_alias(self, name) -> Dict[str, Any]:
+        with self._lock:
+            return {index: {"aliases": {name: {}}} for index in self.aliases.get(name, [])}
+
+    def get(self, index) -> Dict[str, Any]:
+        with self._lock:
+            return {name: copy.deepcopy(self.indices[name].body) for name in self.resolve(index)}
+
+    def get_mapping(self, index) -> Dict[str, Any]:
+        return {name: {"mappings": info["mappings"]} for name, info in self.get(index).items()}
+
+    def create(self, index, body=None):
+        with self._lock:
+            if self.exists(index):
+                raise ValueError(f"index [{index}] already exists")
+            self.indices[index] = _LocalIndex(body or {})
+            return {"acknowledged": True, "index": index}
+
+    def delete(self, index):
+        with self._lock:
+            for name in self.resolve(index):
+                del self.indices[name]
+                for alias, targets in list(self.aliases.items()):
+                    if name in targets:
+                        targets.remove(name)
+                    if not targets:
+                        del self.aliases[alias]
+            return {"acknowledged": True}
+
+    def put_alias(self, index, name):
+        with self._lock:
+            self.aliases.setdefault(name, []).append(index)
+            return {"acknowledged": True}
+
+    def update_aliases(self, body):
+        with self._lock:
+            for action in body["actions"]:
+                (kind, params), = action.items()
+                if kind == "add":
+                    self.put_alias(params["index"], params["alias"])
+                elif kind == "remove":
+                    self.aliases[params["alias"]].remove(params["index"])
+                    if not self.aliases[params["alias"]]:
+                        del self.aliases[params["alias"]]
+                elif kind == "remove_index":
+                    self.delete(params["index"])
+            return {"acknowledged": True}
+
+    def put_settings(self, index, body):
+        return {"acknowledged": True}
+
+    def refresh(self, index=None):
+        return {"_shards": {"failed": 0}}
+
+class _LocalCluster:
+    def health(self) -> Dict[str, Any]:
+        return {"status": "green", "number_of_nodes": 1}
+
+class _LocalTransport:
+    # helpers.bulk serializes actions with the client's serializer
+    serializer = JSONSerializer()
+
+_SHARDS = {"total": 1, "successful": 1, "skipped": 0, "failed": 0}
+
+class LocalOpenSearchClient:
+    """
+    In-process stand-in for the subset of the opensearch-py client that
+    OpenSearchService uses: exact kNN over a LocalVectorStore, knn_score
+    script scoring, term/terms/ids/exists and bool filters (also as
+    post_filter), aliases, get/mget, and the scroll and bulk calls behind
+    helpers.scan and helpers.bulk, with sequence numbers for optimistic
+    concurrency control (if_seq_no and create). Routing is accepted and
+    ignored, as there is one shard. Calls come from the API's threadpool,
+    so one lock (reentrant, as bulk indexes and searches resolve aliases)
+    serializes everything that touches the indices. For benchmarks and
+    development without a cluster.
+    """
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.indices = _LocalIndices(self._lock)
+        self.cluster = _LocalCluster()
+        self.transport = _LocalTransport()
+        self._scrolls: Dict[str, List[Dict[str, Any]]] = {}
+        self._scroll_ids = itertools.count()
+
+    def _write_index(self, index: str) -> str:
+        return self.indices.resolve(index)[-1]
+
+    @staticmethod
+    def _check_version(target: _LocalIndex, doc_id: str, if_seq_no=None, op_type: str = "index"):
+        if op_type == "create" and doc_id in target.docs:
+            raise ConflictError(409, "version_conflict_engine_exception", {"reason": "document already exists"})
+        if if_seq_no is not None and target.seq_nos.get(doc_id) != int(if_seq_no):
+            raise ConflictError(409, "version_conflict_engine_exception", {"reason": "sequence number mismatch"})
+
+    def index(self, index, body, id=None, refresh=False, if_seq_no=None, op_type="index",
+              **kwargs) -> Dict[str, Any]:
+        with self._lock:
+            name = self._write_index(index)
+            target = self.indices.indices[name]
+            doc_id = str(id if id is not None else len(target.docs))
+            self._check_version(target, doc_id, if_seq_no, op_type)
+            result = "updated" if doc_id in target.docs else "created"
+            if result == "updated":
+                target.vectors.remove([doc_id])
+            if "my_vector" in body:
+                vector = np.asarray(body["my_vector"], dtype=np.float32)
+                target.vectors.add([doc_id], vector / np.linalg.norm(vector))
+            target.docs[doc_id] = copy.deepcopy(body)
+            target.seq_nos[doc_id] = next(target.next_seq_no)
+            return {"_index": name, "_id": doc_id, "result": result, "_seq_no": target.seq_nos[doc_id],
+                    "_primary_term": 1}
+
+    @staticmethod
+    def _values(source: Dict[str, Any], field: str) -> set:
+        value = source.get(field)
+        return {str(item) for item in value} if isinstance(value, list) else {str(value)}
+
+    @staticmethod
+    def _matches(source: Dict[str, Any], query: Optional[Dict[str, Any]], doc_id: Optional[str] = None) -> bool:
+        if not query or "match_all" in query:
+            return True
+        if "ids" in query:
+            return doc_id in {str(value) for value in query["ids"]["values"]}
+        if "exists" in query:
+            return source.get(query["exists"]["field"]) is not None
+        if "term" in query:
+            (field, value), = query["term"].items()
+            return str(value) in LocalOpenSearchClient._values(source, field)
+        if "terms" in query:
+            (field, values), = query["terms"].items()
+            return not LocalOpenSearchClient._values(source, field).isdisjoint(str(value) for value in values)
+        if "bool" in query:
+            clauses = query["bool"].get("filter", []) + query["bool"].get("must", [])
+            return all(LocalOpenSearchClient._matches(source, clause, doc_id) for clause in clauses) and \
+                not any(LocalOpenSearchClient._matches(source, clause, doc_id)
+                        for clause in query["bool"].get("must_not", []))
+        raise NotImplementedError(f"Unsupported query: {list(query)}")
+
+    @staticmethod
+    def _project(source: Dict[str, Any], fields) -> Dict[str, Any]:
+        if fields is None or fields is True:
+            return copy.deepcopy(source)
+        if fields is False:
+            return {}
+        return {field: source[field] for field in fields if field in source}
+
+    def search(self, index, body, scroll=None, size=None, seq_no_primary_term=False, **kwargs) -> Dict[str, Any]:
+        with self._lock:
+            query = body.get("query", {})
+            size = size if size is not None else body.get("size", 10)
+            hits = []
+            for name in self.indices.resolve(index):
+                target = self.indices.indices[name]
+                if "knn" in query:
+                    (field, params), = query["knn"].items()
+                    vector = np.asarray(params["vector"], dtype=np.float32)
+                    filters = params.get("filter")
+                    results = target.vectors.search(vector, k=len(target.docs) if filters else params["k"])
+                    for result in results:
+                        source = target.docs[result["id"]]
+                        if self._matches(source, filters, result["id"]):
+                            hits.append((target.config.to_score(result["score"]), name, result["id"]))
+                elif "script_score" in query:
+                    # Exact scoring; only the order matters, so 1 + cosine for any space type
+                    vector = np.asarray(query["script_score"]["script"]["params"]["query_value"], dtype=np.float32)
+                    vector = vector / np.linalg.norm(vector)
+                    for doc_id, source in target.docs.items():
+                        if self._matches(source, query["script_score"]["query"], doc_id):
+                            stored = np.asarray(source["my_vector"], dtype=np.float32)
+                            hits.append((1 + float(stored @ vector) / float(np.linalg.norm(stored)), name, doc_id))
+                else:
+                    hits.extend(
+                        (1.0, name, doc_id) for doc_id, source in target.docs.items()
+                        if self._matches(source, query, doc_id)
+                    )
+            post_filter = body.get("post_filter")
+            if post_filter:
+                hits = [hit for hit in hits
+                        if self._matches(self.indices.indices[hit[1]].docs[hit[2]], post_filter, hit[2])]
+            hits.sort(key=lambda hit: hit[0], reverse=True)
+            documents = [
+                {
+                    "_index": name,
+                    "_id": doc_id,
+                    "_score": score,
+                    "_source": self._project(self.indices.indices[name].docs[doc_id], body.get("_source"))
+                }
+                for score, name, doc_id in (hits if scroll else hits[:size])
+            ]
+            if seq_no_primary_term or body.get("seq_no_primary_term"):
+                for document in documents:
+                    document["_seq_no"] = self.indices.indices[document["_index"]].seq_nos[document["_id"]]
+                    document["_primary_term"] = 1
+            response = {"_shards": dict(_SHARDS), "hits": {"total": {"value": len(hits)}, "hits": documents[:size]}}
+            if scroll:
+                # The rest of the hits are snapshotted now and handed out page by page
+                scroll_id = str(next(self._scroll_ids))
+                self._scrolls[scroll_id] = [documents[i:i + size] for i in range(size, len(documents), size)]
+                response["_scroll_id"] = scroll_id
+            return response
+
+    def scroll(self, body, **kwargs) -> Dict[str, Any]:
+        with self._lock:
+            scroll_id = body["scroll_id"]
+            pages = self._scrolls.get(scroll_id)
+            if pages is None:
+                raise KeyError(f"No search context found for id [{scroll_id}]")
+            page = pages.pop(0) if pages else []
+            return {"_scroll_id": scroll_id, "_shards": dict(_SHARDS), "hits": {"hits": page}}
+
+    def clear_scroll(self, body, **kwargs) -> Dict[str, Any]:
+        with self._lock:
+            for scroll_id in body["scroll_id"]:
+                self._scrolls.pop(scroll_id, None)
+            return {"succeeded": True}
+
+    def bulk(self, body, refresh=False, **kwargs) -> Dict[str, Any]:
+        with self._lock:
+            lines = iter(line for line in body.splitlines() if line.strip())
+            items = []
+            for line in lines:
+                (op_type, meta), = json.loads(line).items()
+                try:
+                    if op_type == "delete":
+                        name = self._write_index(meta["_index"])
+                        target = self.indices.indices[name]
+                        self._check_version(target, meta["_id"], meta.get("if_seq_no"))
+                        found = meta["_id"] in target.docs
+                        if found:
+                            del target.docs[meta["_id"]]
+                            del target.seq_nos[meta["_id"]]
+                            target.vectors.remove([meta["_id"]])
+                        item = {"_index": name, "_id": meta["_id"], "result": "deleted" if found else "not_found",
+                                "status": 200 if found else 404}
+                    else:
+                        source = json.loads(next(lines))
+                        if op_type == "update":
+                            raise NotImplementedError("Bulk updates are not supported")
+                        response = self.index(meta["_index"], source, id=meta.get("_id"),
+                                              if_seq_no=meta.get("if_seq_no"), op_type=op_type)
+                        item = {**response, "status": 201 if response["result"] == "created" else 200}
+                except ConflictError as e:
+                    item = {"_index": meta["_index"], "_id": meta.get("_id"), "status": 409,
+                            "error": {"type": e.error, **e.info}}
+                items.append({op_type: item})
+            return {"errors": any(not 200 <= next(iter(item.values()))["status"] < 300 for item in items),
+                    "items": items}
+
+    def delete_by_query(self, index, body, **kwargs) -> Dict[str, Any]:
+        with self._lock:
+            deleted = 0
+            for name in self.indices.resolve(index):
+                target = self.indices.indices[name]
+                doc_ids = [doc_id for doc_id, source in target.docs.items()
+                           if self._matches(source, body.get("query"), doc_id)]
+                for doc_id in doc_ids:
+                    del target.docs[doc_id]
+                    del target.seq_nos[doc_id]
+                deleted += target.vectors.remove(doc_ids)
+            return {"deleted": deleted}
+
+    def mget(self, index, body, **kwargs) -> Dict[str, Any]:
+        with self._lock:
+            name = self._write_index(index)
+            target = self.indices.indices[name]
+            doc_ids = body["ids"] if "ids" in body else [doc["_id"] for doc in body["docs"]]
+            return {
+                "docs": [
+                    {"_index": name, "_id": doc_id, "found": False} if doc_id not in target.docs else
+                    {"_index": name, "_id": doc_id, "found": True, "_seq_no": target.seq_nos[doc_id],
+                     "_primary_term": 1, "_source": copy.deepcopy(target.docs[doc_id])}
+                    for doc_id in doc_ids
+                ]
+            }
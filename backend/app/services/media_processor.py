@@ -1,7 +1,14 @@
 import os
+import subprocess
+import wave
+from typing import Iterator
+import numpy as np
 from fastapi import UploadFile, HTTPException
 from pydub import AudioSegment
+from pydub.utils import mediainfo
+from .fingerprint import Fingerprint, fingerprinter
 from ..core.config import settings
+from ..core.metrics import timed
 
 class MediaProcessor:
     ALLOWED_EXTENSIONS = {'.mp4', '.mp3', '.wav', '.avi', '.mkv'}
@@ -30,34 +37,126 @@ class MediaProcessor:
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Error saving file: {str(e)}")
 
+    # Storage format -> (file extension, pydub export arguments)
+    AUDIO_FORMATS = {
+        "wav": (".wav", {"format": "wav"}),
+        "flac": (".flac", {"format": "flac"}),
+        "opus": (".opus", {"format": "ogg", "codec": "libopus"}),
+    }
+
+    @staticmethod
+    def audio_storage_path(file_path: str, storage_format: str = settings.AUDIO_STORAGE_FORMAT) -> str:
+        """Where the extracted audio of an upload is kept"""
+        filename = os.path.splitext(os.path.basename(file_path))[0]
+        return os.path.join(settings.UPLOAD_FOLDER, filename + MediaProcessor.AUDIO_FORMATS[storage_format][0])
+
     @staticmethod
+    def export_audio(audio: AudioSegment, audio_path: str, storage_format: str = settings.AUDIO_STORAGE_FORMAT) -> str:
+        """
+        Write mono audio in the storage format. FLAC and Opus are resampled
+        to AUDIO_SAMPLE_RATE (what Whisper decodes to anyway); WAV keeps the
+        source rate.
+        """
+        audio = audio.set_channels(1)
+        _, export_args = MediaProcessor.AUDIO_FORMATS[storage_format]
+        if storage_format != "wav":
+            audio = audio.set_frame_rate(settings.AUDIO_SAMPLE_RATE)
+        if storage_format == "opus":
+            export_args = {**export_args, "bitrate": settings.AUDIO_OPUS_BITRATE}
+        audio.export(audio_path, **export_args)
+        return audio_path
+
+    @staticmethod
+    @timed("extract_audio")
     def extract_audio(file_path: str) -> str:
         try:
-            # Generate output path
-            filename = os.path.splitext(os.path.basename(file_path))[0]
-            audio_path = os.path.join(settings.UPLOAD_FOLDER, f"{filename}.wav")
-            
-            # Extract audio based on input format
-            if file_path.endswith('.mp4') or file_path.endswith('.avi') or file_path.endswith('.mkv'):
-                video = AudioSegment.from_file(file_path)
-                audio = video.set_channels(1)  # Convert to mono
-                audio.export(audio_path, format="wav")
-            elif file_path.endswith('.mp3'):
-                audio = AudioSegment.from_mp3(file_path)
-                audio = audio.set_channels(1)  # Convert to mono
-                audio.export(audio_path, format="wav")
-            elif file_path.endswith('.wav'):
-                audio = AudioSegment.from_wav(file_path)
-                if audio.channels > 1:
-                    audio = audio.set_channels(1)  # Convert to mono if needed
-                    audio.export(audio_path, format="wav")
-                else:
-                    return file_path  
-                    
-            return audio_path
+            audio_path = MediaProcessor.audio_storage_path(file_path)
+            audio = AudioSegment.from_file(file_path)
+            if settings.AUDIO_STORAGE_FORMAT == "wav" and file_path.endswith('.wav') and audio.channels == 1:
+                return file_path  # Already a mono WAV
+            return MediaProcessor.export_audio(audio, audio_path)
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Error extracting audio: {str(e)}")
 
+    @staticmethod
+    def decode_wav(audio_path: str) -> str:
+        """
+        A PCM WAV of stored audio for the stages that seek in raw frames
+        (windowed transcription). WAV audio is returned as is; compressed
+        audio is decoded to a temporary "<name>.decoded.wav" the caller deletes.
+        """
+        if audio_path.endswith(".wav"):
+            return audio_path
+        wav_path = f"{os.path.splitext(audio_path)[0]}.decoded.wav"
+        AudioSegment.from_file(audio_path).set_channels(1).export(wav_path, format="wav")
+        return wav_path
+
+    @staticmethod
+    def audio_duration(audio_path: str) -> float:
+        """Duration in seconds, read from the WAV header or container metadata without decoding"""
+        try:
+            with wave.open(audio_path, "rb") as wav:
+                return wav.getnframes() / float(wav.getframerate())
+        except (wave.Error, EOFError):
+            duration = mediainfo(audio_path).get("duration")
+            if duration:
+                return float(duration)
+            return AudioSegment.from_file(audio_path).duration_seconds
+
+    @staticmethod
+    def load_samples(audio_path: str, sample_rate: int) -> np.ndarray:
+        """Mono float32 samples in [-1, 1] at sample_rate"""
+        audio = AudioSegment.from_file(audio_path).set_channels(1).set_frame_rate(sample_rate).set_sample_width(2)
+        return np.frombuffer(audio.raw_data, dtype=np.int16).astype(np.float32) / 32768.0
+
+    @staticmethod
+    def stream_samples(audio_path: str, sample_rate: int, block_seconds: float = 30.0) -> Iterator[np.ndarray]:
+        """
+        Mono float32 samples in [-1, 1] at sample_rate, a block at a time, so
+        long recordings are never held in memory whole. A 16-bit mono WAV at
+        that rate is read directly; anything else is decoded by an ffmpeg pipe.
+        """
+        block_frames = max(1, int(block_seconds * sample_rate))
+        try:
+            with wave.open(audio_path, "rb") as wav:
+                direct = (wav.getnchannels(), wav.getsampwidth(), wav.getframerate()) == (1, 2, sample_rate)
+        except (wave.Error, EOFError):
+            direct = False  # Not a PCM WAV
+        if direct:
+            with wave.open(audio_path, "rb") as wav:
+                while True:
+                    data = wav.readframes(block_frames)
+                    if not data:
+                        return
+                    yield np.frombuffer(data, dtype=np.int16).astype(np.float32) / 32768.0
+
+        process = subprocess.Popen(
+            [AudioSegment.converter, "-v", "error", "-nostdin", "-i", audio_path,
+             "-f", "s16le", "-ac", "1", "-ar", str(sample_rate), "-"],
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        )
+        try:
+            while True:
+                data = process.stdout.read(block_frames * 2)
+                if not data:
+                    break
+                yield np.frombuffer(data[:len(data) // 2 * 2], dtype=np.int16).astype(np.float32) / 32768.0
+            if process.wait() != 0:
+                raise RuntimeError(f"ffmpeg could not decode {audio_path}: {process.stderr.read().decode().strip()}")
+        finally:
+            if process.poll() is None:
+                process.kill()
+            process.wait()
+            process.stdout.close()
+            process.stderr.close()
+
+    @staticmethod
+    @timed("fingerprint")
+    def fingerprint_audio(audio_path: str) -> Fingerprint:
+        """Landmark fingerprint of extracted audio, to recognise re-encoded copies"""
+        samples = MediaProcessor.load_samples(audio_path, fingerprinter.SAMPLE_RATE)
+        return fingerprinter.fingerprint(samples)
+
     @staticmethod
     def delete_files(*file_paths: str) -> None:
         """Delete physical files from the filesystem."""
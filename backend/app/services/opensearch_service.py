@@ -1,12 +1,225 @@
-from opensearchpy import OpenSearch, RequestsHttpConnection
-from typing import List, Dict, Any
+from opensearchpy import OpenSearch, RequestsHttpConnection, helpers
+from opensearchpy.exceptions import RequestError
+from dataclasses import dataclass, fields
+from typing import List, Dict, Any, Optional
+import time
 import numpy as np
+from .quantization import to_byte_vector, encode_base64, decode_base64
+from .dedup import dedup_service, encode_signature, decode_signature
 from ..core.config import settings
+from ..core.metrics import timed
+
+# Quantized modes store a base64 float32 copy for rescoring the top-k candidates
+RESCORE_FIELD = "vector_fp"
+
+# Chunks with a vector carry their MinHash signature and LSH band keys;
+# near-duplicates are stored without a vector and point at that chunk
+MINHASH_FIELD = "minhash"
+BANDS_FIELD = "minhash_bands"
+DUPLICATE_OF_FIELD = "duplicate_of"
+
+DEFAULT_COLLECTION = settings.DEFAULT_COLLECTION
+# Supported kNN index parameters
+KNN_ENGINES = ("nmslib", "faiss", "lucene")
+SPACE_TYPES = ("l2", "innerproduct", "cosinesimil")
+QUANTIZATION_MODES = ("float32", "float16", "int8")
+
+# Collection ids become index names and routing keys
+COLLECTION_ID_PATTERN = r"^[a-z0-9][a-z0-9_-]{0,63}$"
+
+@dataclass
+class IndexConfig:
+    """kNN index parameters, built from settings or read back from a live index"""
+    dimension: int
+    engine: str
+    space_type: str
+    m: int
+    ef_construction: int
+    ef_search: int
+    quantization: str
+    shards: int = 1
+    byte_scale: float = 127.0  # int8 only: byte code = component * byte_scale
+
+    @classmethod
+    def from_settings(cls, **overrides) -> "IndexConfig":
+        values = {
+            "dimension": settings.EMBEDDING_DIMENSION,
+            "engine": settings.OPENSEARCH_KNN_ENGINE,
+            "space_type": settings.OPENSEARCH_SPACE_TYPE,
+            "m": settings.OPENSEARCH_HNSW_M,
+            "ef_construction": settings.OPENSEARCH_HNSW_EF_CONSTRUCTION,
+            "ef_search": settings.OPENSEARCH_HNSW_EF_SEARCH,
+            "quantization": settings.VECTOR_QUANTIZATION,
+            "shards": settings.OPENSEARCH_NUMBER_OF_SHARDS,
+            "byte_scale": settings.VECTOR_BYTE_SCALE,
+        }
+        names = {field.name for field in fields(cls)}
+        values.update({key: value for key, value in overrides.items() if key in names and value is not None})
+        return cls(**values)
+
+    @classmethod
+    def from_index(cls, index_info: Dict[str, Any]) -> "IndexConfig":
+        """Recover the parameters of an existing index from its mapping and settings"""
+        vector = index_info["mappings"]["properties"]["my_vector"]
+        method = vector.get("method", {})
+        parameters = method.get("parameters", {})
+        if vector.get("data_type") == "byte":
+            quantization = "int8"
+        elif parameters.get("encoder", {}).get("name") == "sq":
+            quantization = "float16"
+        else:
+            quantization = "float32"
+        # ef_search comes back as a dotted key or as a nested "knn.algo_param" object
+        index_settings = index_info.get("settings", {}).get("index", {})
+        ef_search = index_settings.get("knn.algo_param.ef_search") or \
+            index_settings.get("knn.algo_param", {}).get("ef_search") or \
+            settings.OPENSEARCH_HNSW_EF_SEARCH
+        return cls(
+            dimension=int(vector["dimension"]),
+            engine=method.get("engine", settings.OPENSEARCH_KNN_ENGINE),
+            space_type=method.get("space_type", "l2"),
+            m=int(parameters.get("m", settings.OPENSEARCH_HNSW_M)),
+            ef_construction=int(parameters.get("ef_construction", settings.OPENSEARCH_HNSW_EF_CONSTRUCTION)),
+            ef_search=int(ef_search),
+            quantization=quantization,
+            shards=int(index_settings.get("number_of_shards", 1)),
+            # Byte indices from before the scale was calibrated used 127
+            byte_scale=float(index_info["mappings"].get("_meta", {}).get("byte_scale", 127.0))
+        )
+
+    @property
+    def effective_engine(self) -> str:
+        # Compact encodings are only available on specific engines
+        if self.quantization == "float16":
+            return "faiss"
+        if self.quantization == "int8":
+            return "lucene"
+        return self.engine
+
+    def vector_mapping(self) -> Dict[str, Any]:
+        """knn_vector mapping for these parameters"""
+        parameters = {
+            "ef_construction": self.ef_construction,
+            "m": self.m
+        }
+        mapping = {
+            "type": "knn_vector",
+            "dimension": self.dimension,
+            "method": {
+                "name": "hnsw",
+                "space_type": self.space_type,
+                "engine": self.effective_engine,
+                "parameters": parameters
+            }
+        }
+        if self.quantization == "float16":
+            # faiss scalar quantizer halves the graph's vector storage
+            parameters["encoder"] = {"name": "sq", "parameters": {"type": "fp16"}}
+        elif self.quantization == "int8":
+            # Lucene byte vectors: one byte per dimension
+            mapping["data_type"] = "byte"
+        elif self.quantization != "float32":
+            raise ValueError(
+                f"Vector quantization '{self.quantization}' is not supported by OpenSearch; "
+                "use float32, float16 or int8"
+            )
+        return mapping
+
+    def index_body(self) -> Dict[str, Any]:
+        """Settings and mappings for creating an index with these parameters"""
+        properties = {
+            "chunk_id": {"type": "keyword"},
+            "media_id": {"type": "keyword"},
+            "collection_id": {"type": "keyword"},
+            "text": {"type": "text"},
+            "start_time": {"type": "float"},
+            "end_time": {"type": "float"},
+            "my_vector": self.vector_mapping(),
+            MINHASH_FIELD: {"type": "binary"},
+            BANDS_FIELD: {"type": "keyword"},
+            DUPLICATE_OF_FIELD: {"type": "keyword"},
+            "canonical_media_id": {"type": "keyword"}
+        }
+        if self.quantization != "float32":
+            properties[RESCORE_FIELD] = {"type": "binary"}
+        mappings: Dict[str, Any] = {"properties": properties}
+        if self.quantization == "int8":
+            # Queries must be encoded with the scale the documents were
+            mappings["_meta"] = {"byte_scale": self.byte_scale}
+        return {
+            "settings": {
+                "index": {
+                    "knn": True,
+                    "knn.algo_param.ef_search": self.ef_search,
+                    "number_of_shards": self.shards
+                }
+            },
+            "mappings": mappings
+        }
+
+    def to_similarity(self, score: float) -> float:
+        """Convert an OpenSearch kNN _score back to cosine similarity for unit vectors"""
+        score = float(score)
+        if self.space_type == "l2":
+            # score = 1 / (1 + d^2) and d^2 = 2 - 2cos
+            return 1 - (1 / score - 1) / 2
+        if self.space_type == "cosinesimil":
+            if self.effective_engine == "lucene":
+                return 2 * score - 1  # score = (1 + cos) / 2
+            return 2 - 1 / score  # score = 1 / (2 - cos)
+        if self.space_type == "innerproduct":
+            return score - 1 if score >= 1 else 1 - 1 / score
+        raise ValueError(f"Unsupported space type '{self.space_type}'")
+
+    def to_score(self, similarity: float) -> float:
+        """Inverse of to_similarity: the _score OpenSearch reports for a cosine similarity"""
+        similarity = float(similarity)
+        if self.space_type == "l2":
+            return 1 / (1 + (2 - 2 * similarity))
+        if self.space_type == "cosinesimil":
+            if self.effective_engine == "lucene":
+                return (1 + similarity) / 2
+            return 1 / (2 - similarity)
+        if self.space_type == "innerproduct":
+            return similarity + 1 if similarity >= 0 else 1 / (1 - similarity)
+        raise ValueError(f"Unsupported space type '{self.space_type}'")
+
+def full_precision_vector(source: Dict[str, Any]) -> np.ndarray:
+    """Best available float32 embedding for a stored document"""
+    if RESCORE_FIELD in source:
+        return decode_base64(source[RESCORE_FIELD])
+    vector = np.asarray(source["my_vector"], dtype=np.float32)
+    return vector / np.linalg.norm(vector)  # Also undoes the byte-vector scale
 
 class OpenSearchService:
+    """
+    Chunk vectors live in a shared index, OPENSEARCH_INDEX, where collections
+    other than the default are placed with custom routing so a collection
+    search touches a single shard. Collections listed in DEDICATED_COLLECTIONS
+    get an index of their own instead, so a large tenant's graph never slows
+    kNN for the others. Each index name is an alias over versioned indices.
+    """
     def __init__(self):
+        if settings.OPENSEARCH_BACKEND == "local":
+            # In-process stand-in for benchmarks and development without a cluster
+            from .local_search import LocalOpenSearchClient
+            self.client = LocalOpenSearchClient()
+        else:
+            self.client = self._create_client()
+        
+        # OPENSEARCH_INDEX is an alias over versioned indices so we can reindex online
+        self.index_name = settings.OPENSEARCH_INDEX
+        self.dedicated_collections = set(settings.DEDICATED_COLLECTIONS)
+        self.rescore_oversample = settings.VECTOR_RESCORE_OVERSAMPLE
+        self._index_configs: Dict[str, IndexConfig] = {}
+        self._config_loaded_at: Dict[str, float] = {}
+        self._config_indices: Dict[str, Optional[str]] = {}  # Index each cached config was read from
+        self._ensure_index()
+    
+    @staticmethod
+    def _create_client() -> OpenSearch:
         # Initialize OpenSearch client with basic auth
-        self.client = OpenSearch(
+        return OpenSearch(
             hosts=[{
                 'host': settings.OPENSEARCH_HOST,
                 'port': settings.OPENSEARCH_PORT
@@ -17,123 +230,530 @@ class OpenSearchService:
             connection_class=RequestsHttpConnection,
             timeout=30
         )
+    
+    def collection_alias(self, collection_id: Optional[str] = None) -> str:
+        """Alias holding a collection's chunks: its own for dedicated collections, else the shared one"""
+        if collection_id in self.dedicated_collections:
+            return f"{self.index_name}-collection-{collection_id}"
+        return self.index_name
+    
+    def collection_routing(self, collection_id: Optional[str]) -> Optional[str]:
+        """Routing key within the shared index; the default collection keeps id-based routing"""
+        if collection_id is None or collection_id == DEFAULT_COLLECTION or \
+                collection_id in self.dedicated_collections:
+            return None
+        return collection_id
+    
+    def search_aliases(self) -> List[str]:
+        """Every alias that holds chunks: the shared one plus existing dedicated ones"""
+        aliases = [self.index_name]
+        for collection_id in sorted(self.dedicated_collections):
+            alias = self.collection_alias(collection_id)
+            if self.get_alias_indices(alias):
+                aliases.append(alias)
+        return aliases
+    
+    @property
+    def index_config(self) -> IndexConfig:
+        """Config of the index currently behind the shared alias, re-read periodically"""
+        return self.config_for(self.index_name)
+    
+    def config_for(self, alias: str) -> IndexConfig:
+        if time.monotonic() - self._config_loaded_at.get(alias, 0.0) > settings.OPENSEARCH_CONFIG_REFRESH_SECONDS:
+            self.refresh_index_config(alias)
+        return self._index_configs[alias]
+    
+    @property
+    def quantization(self) -> str:
+        return self.index_config.quantization
+    
+    @property
+    def rescores(self) -> bool:
+        return self.quantization != "float32"
+    
+    def refresh_index_config(self, alias: Optional[str] = None):
+        """Read the parameters of the index behind an alias (settings if there is none)"""
+        alias = alias or self.index_name
+        indices = self.get_alias_indices(alias)
+        if indices:
+            index_info = self.client.indices.get(index=indices[-1])[indices[-1]]
+            self._index_configs[alias] = IndexConfig.from_index(index_info)
+        else:
+            self._index_configs[alias] = IndexConfig.from_settings()
+        self._config_indices[alias] = indices[-1] if indices else None
+        self._config_loaded_at[alias] = time.monotonic()
+    
+    def _config_moved(self, alias: str, index: Optional[str] = None) -> bool:
+        """
+        Whether the alias has moved off the index its cached config was read
+        from (a reindex, possibly by another process), given the index a
+        request reached; if so the config is read again right away.
+        """
+        if index is None:
+            indices = self.get_alias_indices(alias)
+            index = indices[-1] if indices else None
+        if index == self._config_indices.get(alias):
+            return False
+        self.refresh_index_config(alias)
+        return True
+    
+    def _encode_vector(self, vector: np.ndarray, config: Optional[IndexConfig] = None) -> List:
+        """Vector as sent to the knn field for the index's quantization mode"""
+        config = config or self.index_config
+        if config.quantization == "int8":
+            return to_byte_vector(vector, config.byte_scale)
+        return vector.tolist()
+    
+    def get_alias_indices(self, alias: Optional[str] = None) -> List[str]:
+        """Concrete indices behind the alias (or the legacy index of the same name)"""
+        alias = alias or self.index_name
+        if self.client.indices.exists_alias(name=alias):
+            return sorted(self.client.indices.get_alias(name=alias).keys())
+        if self.client.indices.exists(alias):
+            return [alias]
+        return []
+    
+    def create_versioned_index(self, config: Optional[IndexConfig] = None, alias: Optional[str] = None) -> str:
+        """Create a new timestamped index (not yet behind the alias) and return its name"""
+        config = config or IndexConfig.from_settings()
+        new_index = f"{alias or self.index_name}-{time.strftime('%Y%m%d%H%M%S')}"
+        self.client.indices.create(index=new_index, body=config.index_body())
+        return new_index
+    
+    def swap_alias(self, new_index: str, delete_old: bool = False, alias: Optional[str] = None):
+        """Atomically point the alias at new_index, detaching the previous indices"""
+        alias = alias or self.index_name
+        old_indices = [index for index in self.get_alias_indices(alias) if index != new_index]
+        actions = []
+        for old_index in old_indices:
+            if old_index == alias:
+                # A legacy concrete index holds the alias name; it must go in the same call
+                actions.append({"remove_index": {"index": old_index}})
+            else:
+                actions.append({"remove": {"index": old_index, "alias": alias}})
+        actions.append({"add": {"index": new_index, "alias": alias, "is_write_index": True}})
+        self.client.indices.update_aliases(body={"actions": actions})
         
-        self.index_name = settings.OPENSEARCH_INDEX
-        self._ensure_index()
+        if delete_old:
+            for old_index in old_indices:
+                if old_index != alias:
+                    self.client.indices.delete(index=old_index)
+        self.refresh_index_config(alias)
     
-    def _ensure_index(self):
-        """Ensure the index exists with proper mapping"""
-        if not self.client.indices.exists(self.index_name):
-            mapping = {
-                "settings": {
-                    "index": {
-                        "knn": True,
-                        "knn.algo_param.ef_search": 100
-                    }
-                },
-                "mappings": {
-                    "properties": {
-                        "chunk_id": {"type": "keyword"},
-                        "media_id": {"type": "keyword"},
-                        "text": {"type": "text"},
-                        "start_time": {"type": "float"},
-                        "end_time": {"type": "float"},
-                        "my_vector": {
-                            "type": "knn_vector",
-                            "dimension": 384,  # all-MiniLM-L6-v2 dimension
-                            "method": {
-                                "name": "hnsw",
-                                "space_type": "l2",
-                                "engine": "nmslib",
-                                "parameters": {
-                                    "ef_construction": 128,
-                                    "m": 24
-                                }
-                            }
-                        }
-                    }
-                }
-            }
-            
-            self.client.indices.create(
-                index=self.index_name,
-                body=mapping
-            )
+    def _ensure_index(self, alias: Optional[str] = None):
+        """Ensure a versioned index exists behind the alias"""
+        alias = alias or self.index_name
+        if not self.get_alias_indices(alias):
+            new_index = self.create_versioned_index(alias=alias)
+            self.client.indices.put_alias(index=new_index, name=alias)
+        self.refresh_index_config(alias)
+    
+    def _write_alias(self, collection_id: str) -> str:
+        alias = self.collection_alias(collection_id)
+        if alias not in self._index_configs:
+            self._ensure_index(alias)  # First chunk of a dedicated collection
+        return alias
     
+    @timed("opensearch_index")
     def index_chunk(self, chunk_id: int, media_id: int, text: str, 
-                    start_time: float, end_time: float, vector: np.ndarray) -> Dict:
-        """Index a single chunk with its embedding"""
+                    start_time: float, end_time: float, vector: np.ndarray,
+                    collection_id: str = DEFAULT_COLLECTION,
+                    signature: Optional[np.ndarray] = None) -> Dict:
+        """Index a single chunk with its embedding (and MinHash signature, for deduplication)"""
         # Normalize the vector before indexing
         vector = vector / np.linalg.norm(vector)
         
+        alias = self._write_alias(collection_id)
+        
+        def write():
+            my_doc = self.build_document(chunk_id, media_id, text, start_time, end_time, vector,
+                                         config=self.config_for(alias), collection_id=collection_id,
+                                         signature=signature)
+            return self.client.index(
+                index=alias,
+                body=my_doc,
+                id=my_doc['id'],
+                routing=self.collection_routing(collection_id),
+                refresh=True
+            )
+        
+        try:
+            response = write()
+        except RequestError:
+            # The vector may be encoded for an index the alias has since left
+            if not self._config_moved(alias):
+                raise
+            return write()
+        if self._config_moved(alias, response['_index']):
+            # Written with the encoding of the index the alias has left; write it again
+            response = write()
+        return response
+    
+    @timed("opensearch_index")
+    def index_duplicate(self, chunk_id: int, media_id: int, text: str, start_time: float,
+                        end_time: float, duplicate_of: Dict[str, str],
+                        collection_id: str = DEFAULT_COLLECTION) -> Dict:
+        """
+        Index a near-duplicate chunk without a vector, pointing at the chunk
+        ({"id", "media_id"}) whose vector stands in for it
+        """
+        my_doc = self.build_duplicate_document(chunk_id, media_id, text, start_time, end_time,
+                                               duplicate_of, collection_id=collection_id)
+        return self.client.index(
+            index=self._write_alias(collection_id),
+            body=my_doc,
+            id=my_doc['id'],
+            routing=self.collection_routing(collection_id),
+            refresh=True
+        )
+    
+    def find_duplicates(self, signatures: List[Optional[np.ndarray]],
+                        collection_id: str = DEFAULT_COLLECTION,
+                        exclude_ids: frozenset = frozenset()) -> List[Optional[Dict[str, str]]]:
+        """
+        For each signature, the indexed chunk of the collection ({"id",
+        "media_id"}) it near-duplicates, or None. One query for all of them.
+        """
+        matches: List[Optional[Dict[str, str]]] = [None] * len(signatures)
+        band_keys = sorted({key for signature in signatures if signature is not None
+                            for key in dedup_service.band_keys(signature)})
+        alias = self.collection_alias(collection_id)
+        if not band_keys or not self.get_alias_indices(alias):
+            return matches
+        
+        response = self.client.search(
+            index=alias,
+            body={
+                "size": settings.DEDUP_MAX_CANDIDATES,
+                "query": {
+                    "bool": {
+                        "filter": [
+                            {"terms": {BANDS_FIELD: band_keys}},
+                            {"term": {"collection_id": collection_id}}
+                        ]
+                    }
+                },
+                "_source": ["media_id", MINHASH_FIELD]
+            },
+            routing=self.collection_routing(collection_id)
+        )
+        candidates = [
+            (hit["_id"], hit["_source"]["media_id"], decode_signature(hit["_source"][MINHASH_FIELD]))
+            for hit in response["hits"]["hits"] if hit["_id"] not in exclude_ids
+        ]
+        for i, signature in enumerate(signatures):
+            if signature is None:
+                continue
+            best, best_similarity = None, dedup_service.threshold
+            for doc_id, media_id, other in candidates:
+                similarity = dedup_service.similarity(signature, other)
+                if similarity >= best_similarity:
+                    best, best_similarity = {"id": doc_id, "media_id": media_id}, similarity
+            matches[i] = best
+        return matches
+    
+    def build_document(self, chunk_id: int, media_id: int, text: str, start_time: float,
+                       end_time: float, vector: np.ndarray,
+                       config: Optional[IndexConfig] = None,
+                       collection_id: str = DEFAULT_COLLECTION,
+                       signature: Optional[np.ndarray] = None) -> Dict:
+        """Index document for a chunk, with the vector encoded for the index config"""
+        config = config or self.index_config
         my_doc = {
             'id': f"{media_id}_{chunk_id}",
             'text': text,
-            'my_vector': vector.tolist(),
+            'my_vector': self._encode_vector(vector, config),
             'chunk_id': str(chunk_id),
             'media_id': str(media_id),
+            'collection_id': collection_id,
             'start_time': start_time,
             'end_time': end_time
         }
-        
-        response = self.client.index(
-            index=self.index_name,
-            body=my_doc,
-            id=my_doc['id'],
-            refresh=True
-        )
-        return response
+        if config.quantization != "float32":
+            my_doc[RESCORE_FIELD] = encode_base64(vector)
+        if signature is not None:
+            my_doc[MINHASH_FIELD] = encode_signature(signature)
+            my_doc[BANDS_FIELD] = dedup_service.band_keys(signature)
+        return my_doc
+    
+    def build_duplicate_document(self, chunk_id: int, media_id: int, text: str, start_time: float,
+                                 end_time: float, duplicate_of: Dict[str, str],
+                                 collection_id: str = DEFAULT_COLLECTION) -> Dict:
+        """Index document for a near-duplicate chunk, which has no vector of its own"""
+        return {
+            'id': f"{media_id}_{chunk_id}",
+            'text': text,
+            'chunk_id': str(chunk_id),
+            'media_id': str(media_id),
+            'collection_id': collection_id,
+            'start_time': start_time,
+            'end_time': end_time,
+            DUPLICATE_OF_FIELD: duplicate_of["id"],
+            'canonical_media_id': str(duplicate_of["media_id"])
+        }
     
-    def search_similar(self, query_vector, query_text, k=5, min_score=0.6):
-        """Search for similar chunks using cosine similarity"""
+    @timed("opensearch_search")
+    def search_similar(self, query_vector, query_text, k=5, min_score=0.0,
+                       collection_id: Optional[str] = None):
+        """
+        Search for similar chunks using cosine similarity, within one
+        collection or (when collection_id is None) across all of them.
+        Hits scoring below min_score (0-1, like the scores) are dropped.
+        """
         # Normalize query vector
         query_vector = query_vector / np.linalg.norm(query_vector)
         
-        # Use kNN query instead of script_score
-        query = {
-            "size": k,
-            "query": {
-                "knn": {
-                    "my_vector": {
-                        "vector": query_vector.tolist(),
-                        "k": k
-                    }
-                }
-            },
-            "_source": ["text", "media_id", "start_time", "end_time"]
-        }
-        
-        response = self.client.search(
-            index=self.index_name,
-            body=query
-        )
+        if collection_id is None:
+            # Each alias may have its own config after a reindex; scores are
+            # cosine similarities either way, so the results merge directly
+            aliases = self.search_aliases()
+            results = [result for alias in aliases for result in self._search_alias(alias, query_vector, k)]
+            results = sorted(results, key=lambda result: result['score'], reverse=True)[:k]
+            routing = None
+        else:
+            aliases = [self.collection_alias(collection_id)]
+            results = self._search_alias(aliases[0], query_vector, k, collection_id)
+            routing = self.collection_routing(collection_id) if aliases[0] == self.index_name else None
+        results = [result for result in results if result['score'] >= min_score]
+        if settings.DEDUP_ENABLED:
+            results = dedup_service.collapse(self._attach_duplicates(results, aliases, routing))
+        return results
+    
+    def _search_alias(self, alias: str, query_vector: np.ndarray, k: int,
+                      collection_id: Optional[str] = None) -> List[Dict]:
+        """Best k chunks behind one alias (of one collection, if given) for a normalized query vector"""
+        config = self.config_for(alias)
+        hits, exact = self._knn_search(alias, query_vector, k, config, collection_id)
+        if any(hit['_index'] != self._config_indices.get(alias) for hit in hits):
+            # The alias moved (a reindex by another process): read its config and search again
+            self.refresh_index_config(alias)
+            config = self.config_for(alias)
+            hits, exact = self._knn_search(alias, query_vector, k, config, collection_id)
         
-        hits = response['hits']['hits']
+        if exact or config.quantization != "float32":
+            return self._rescore(hits, query_vector, k, config)
         return [
             {
+                'id': hit['_id'],
                 'text': hit['_source']['text'],
                 'media_id': hit['_source']['media_id'],
                 'start_time': hit['_source']['start_time'],
                 'end_time': hit['_source']['end_time'],
-                'score': (float(hit['_score']) + 1) / 2  # Convert to 0-1 range
+                'score': (config.to_similarity(hit['_score']) + 1) / 2  # Convert to 0-1 range
             }
             for hit in hits
         ]
     
-    def delete_by_media_id(self, media_id: int):
-        """Delete all chunks for a specific media"""
+    def _knn_search(self, alias: str, query_vector: np.ndarray, k: int, config: IndexConfig,
+                    collection_id: Optional[str] = None):
+        """
+        Candidate hits for a normalized query vector encoded for config, and
+        whether they came from the exact fallback (their scores are then not
+        kNN scores, and they carry vectors to rescore with)
+        """
+        rescores = config.quantization != "float32"
+        
+        # Quantized indexes over-fetch candidates and rescore them at full precision
+        candidates = k * self.rescore_oversample if rescores else k
+        source_fields = ["text", "media_id", "start_time", "end_time"]
+        if rescores:
+            source_fields.append(RESCORE_FIELD)
+        
+        # Use kNN query instead of script_score
+        knn = {
+            "vector": self._encode_vector(query_vector, config),
+            "k": candidates
+        }
         query = {
+            "size": candidates,
             "query": {
-                "term": {
-                    "media_id": str(media_id)
+                "knn": {
+                    "my_vector": knn
                 }
-            }
+            },
+            "_source": source_fields
         }
+        routing = None
+        collection_filter = None
+        if collection_id is not None and alias == self.index_name:
+            # Shared index: only this collection's shard, and only its documents
+            routing = self.collection_routing(collection_id)
+            collection_filter = {"term": {"collection_id": collection_id}}
+            if config.effective_engine in ("lucene", "faiss"):
+                knn["filter"] = collection_filter  # Filtered during graph search
+                collection_filter = None
+            else:
+                query["post_filter"] = collection_filter
         
-        self.client.delete_by_query(
-            index=self.index_name,
-            body=query,
-            refresh=True
+        hits = self.client.search(index=alias, body=query, routing=routing)['hits']['hits']
+        if collection_filter is None or len(hits) >= candidates:
+            return hits, False
+        
+        # nmslib can't filter during graph search, so the post filter leaves
+        # fewer than k of the collection's chunks when other collections crowd
+        # the nearest neighbours. That happens when the collection is a small
+        # part of its shard, where exact scoring over just its chunks is cheap.
+        exact = {
+            "size": candidates,
+            "query": {
+                "script_score": {
+                    # Near-duplicates have no vector to score
+                    "query": {"bool": {"filter": [collection_filter, {"exists": {"field": "my_vector"}}]}},
+                    "script": {
+                        "source": "knn_score",
+                        "lang": "knn",
+                        "params": {
+                            "field": "my_vector",
+                            "query_value": knn["vector"],
+                            "space_type": config.space_type
+                        }
+                    }
+                }
+            },
+            "_source": source_fields if rescores else source_fields + ["my_vector"]
+        }
+        return self.client.search(index=alias, body=exact, routing=routing)['hits']['hits'], True
+    
+    def _attach_duplicates(self, results: List[Dict], indices: List[str],
+                           routing: Optional[str] = None) -> List[Dict]:
+        """List the near-duplicates stored against each hit under the hit's 'duplicates'"""
+        if not results:
+            return results
+        response = self.client.search(
+            index=indices,
+            body={
+                "size": settings.DEDUP_MAX_CANDIDATES,
+                "query": {"terms": {DUPLICATE_OF_FIELD: [result['id'] for result in results]}},
+                "_source": ["media_id", "start_time", "end_time", DUPLICATE_OF_FIELD]
+            },
+            routing=routing
         )
+        duplicates: Dict[str, List[Dict]] = {}
+        for hit in response['hits']['hits']:
+            source = hit['_source']
+            duplicates.setdefault(source[DUPLICATE_OF_FIELD], []).append({
+                'media_id': source['media_id'],
+                'start_time': source['start_time'],
+                'end_time': source['end_time']
+            })
+        for result in results:
+            result['duplicates'] = duplicates.get(result['id'], [])
+        return results
+    
+    def _rescore(self, hits: List[Dict], query_vector: np.ndarray, k: int,
+                 config: Optional[IndexConfig] = None) -> List[Dict]:
+        """Re-rank candidate hits by exact cosine similarity to the query"""
+        config = config or self.index_config
+        results = []
+        for hit in hits:
+            source = hit['_source']
+            if RESCORE_FIELD in source or 'my_vector' in source:
+                similarity = float(full_precision_vector(source) @ query_vector)
+                score = (similarity + 1) / 2
+            else:
+                score = (config.to_similarity(hit['_score']) + 1) / 2
+            results.append({
+                'id': hit['_id'],
+                'text': source['text'],
+                'media_id': source['media_id'],
+                'start_time': source['start_time'],
+                'end_time': source['end_time'],
+                'score': score
+            })
+        results.sort(key=lambda result: result['score'], reverse=True)
+        return results[:k]
+    
+    def delete_by_media_id(self, media_id: int, refresh: bool = False):
+        """Delete all chunks for a specific media"""
+        self.delete_by_media_ids([media_id], refresh=refresh)
+    
+    @timed("opensearch_delete")
+    def delete_by_media_ids(self, media_ids: List[int], refresh: bool = False,
+                            batch_size: int = 1000):
+        """
+        Delete all chunks for many media with one delete_by_query per batch.
+        Refresh is off by default; deleted docs disappear at the next scheduled refresh.
+        """
+        indices = self.search_aliases()
+        deleting = [str(media_id) for media_id in media_ids]
+        for i in range(0, len(media_ids), batch_size):
+            batch = media_ids[i:i + batch_size]
+            if settings.DEDUP_ENABLED:
+                self._promote_duplicates(indices, deleting[i:i + batch_size], deleting)
+            query = {
+                "query": {
+                    "terms": {
+                        "media_id": [str(media_id) for media_id in batch]
+                    }
+                }
+            }
+            
+            self.client.delete_by_query(
+                index=indices,
+                body=query,
+                refresh=refresh,
+                conflicts="proceed"
+            )
+    
+    def _promote_duplicates(self, indices: List[str], media_ids: List[str], deleting: List[str],
+                            batch_size: int = 1000):
+        """
+        Before media's chunks are deleted, hand their vectors to the
+        near-duplicates other media stored against them: the first duplicate
+        of each chunk becomes a full chunk and the rest point at it.
+        """
+        # Scrolled, as popular chunks can have any number of duplicates
+        hits = helpers.scan(
+            self.client,
+            index=indices,
+            query={
+                "query": {
+                    "bool": {
+                        "filter": [{"terms": {"canonical_media_id": media_ids}}],
+                        "must_not": [{"terms": {"media_id": deleting}}]
+                    }
+                }
+            },
+            size=batch_size
+        )
+        by_original: Dict[str, List[Dict]] = {}
+        for hit in hits:
+            by_original.setdefault(hit['_source'][DUPLICATE_OF_FIELD], []).append(hit)
+        if not by_original:
+            return
+        helpers.bulk(self.client, self._promotions(indices, by_original, batch_size), refresh=False)
+    
+    def _promotions(self, indices: List[str], by_original: Dict[str, List[Dict]], batch_size: int):
+        """Bulk actions rewriting each original's duplicates, fetching the originals a batch at a time"""
+        original_ids = sorted(by_original)
+        for i in range(0, len(original_ids), batch_size):
+            batch = original_ids[i:i + batch_size]
+            originals = self.client.search(
+                index=indices,
+                body={"size": len(batch), "query": {"ids": {"values": batch}}}
+            )
+            for original in originals['hits']['hits']:
+                source = original['_source']
+                first, *rest = by_original[original['_id']]
+                duplicate = first['_source']
+                collection_id = duplicate.get('collection_id', DEFAULT_COLLECTION)
+                routing = self.collection_routing(collection_id)
+                promoted = self.build_document(
+                    duplicate['chunk_id'], duplicate['media_id'], duplicate['text'],
+                    duplicate['start_time'], duplicate['end_time'], full_precision_vector(source),
+                    config=self.config_for(self.collection_alias(collection_id)),
+                    collection_id=collection_id,
+                    signature=decode_signature(source[MINHASH_FIELD]) if MINHASH_FIELD in source else None
+                )
+                actions = [(first, promoted)] + [
+                    (hit, {**hit['_source'], DUPLICATE_OF_FIELD: first['_id'],
+                           'canonical_media_id': duplicate['media_id']})
+                    for hit in rest
+                ]
+                for hit, doc in actions:
+                    action = {"_index": hit['_index'], "_id": hit['_id'], "_source": doc}
+                    if routing is not None:
+                        action["_routing"] = routing
+                    yield action
 
-opensearch_service = OpenSearchService() 
\ No newline at end of file
+opensearch_service = OpenSearchService()
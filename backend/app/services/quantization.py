@@ -0,0 +1,219 @@
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Type
+import base64
+import numpy as np
+
+@dataclass
+class EncodedVectors:
+    codes: np.ndarray
+    scales: Optional[np.ndarray] = None
+
+    @property
+    def nbytes(self) -> int:
+        return self.codes.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def take(self, mask: np.ndarray) -> "EncodedVectors":
+        """Select rows by boolean mask or index array"""
+        return EncodedVectors(
+            codes=self.codes[mask],
+            scales=self.scales[mask] if self.scales is not None else None
+        )
+
+    @staticmethod
+    def concat(blocks: List["EncodedVectors"]) -> "EncodedVectors":
+        scales = [block.scales for block in blocks]
+        return EncodedVectors(
+            codes=np.concatenate([block.codes for block in blocks]),
+            scales=np.concatenate(scales) if scales[0] is not None else None
+        )
+
+class VectorCodec:
+    """
+    Compact representation for embedding matrices. Scores are approximate
+    inner products between the stored vectors and a float32 query.
+    """
+    name = "float32"
+
+    def __init__(self, dimension: int):
+        self.dimension = dimension
+
+    @property
+    def is_trained(self) -> bool:
+        return True
+
+    @property
+    def min_training_points(self) -> int:
+        """Vectors needed before fit gives useful codes"""
+        return 0
+
+    def fit(self, vectors: np.ndarray) -> "VectorCodec":
+        return self
+
+    def encode(self, vectors: np.ndarray) -> EncodedVectors:
+        return EncodedVectors(codes=np.ascontiguousarray(vectors, dtype=np.float32))
+
+    def decode(self, encoded: EncodedVectors) -> np.ndarray:
+        return encoded.codes.astype(np.float32, copy=False)
+
+    def score(self, encoded: EncodedVectors, query: np.ndarray) -> np.ndarray:
+        return encoded.codes @ query.astype(np.float32)
+
+class Float16Codec(VectorCodec):
+    name = "float16"
+
+    def encode(self, vectors: np.ndarray) -> EncodedVectors:
+        return EncodedVectors(codes=np.asarray(vectors, dtype=np.float16))
+
+    def score(self, encoded: EncodedVectors, query: np.ndarray) -> np.ndarray:
+        return encoded.codes.astype(np.float32) @ query.astype(np.float32)
+
+class Int8Codec(VectorCodec):
+    """Symmetric scalar quantization to int8 with one float32 scale per vector"""
+    name = "int8"
+
+    def encode(self, vectors: np.ndarray) -> EncodedVectors:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+        return EncodedVectors(codes=codes, scales=scales.astype(np.float32))
+
+    def decode(self, encoded: EncodedVectors) -> np.ndarray:
+        return encoded.codes.astype(np.float32) * encoded.scales[:, None]
+
+    def score(self, encoded: EncodedVectors, query: np.ndarray) -> np.ndarray:
+        return (encoded.codes.astype(np.float32) @ query.astype(np.float32)) * encoded.scales
+
+class ProductQuantizer(VectorCodec):
+    """
+    Product quantization: the vector is split into `subvectors` slices and each
+    slice is replaced by the id of its nearest k-means centroid (one byte each).
+    Scoring uses per-query lookup tables (asymmetric distance computation).
+    Fitting needs at least as many vectors as centroids, or most of each
+    codebook would be copies.
+    """
+    name = "pq"
+
+    def __init__(self, dimension: int, subvectors: int = 48, centroids: int = 256,
+                 iterations: int = 20, max_training_points: int = 10000, seed: int = 0):
+        super().__init__(dimension)
+        if dimension % subvectors != 0:
+            raise ValueError(f"Dimension {dimension} is not divisible by {subvectors} subvectors")
+        if centroids > 256:
+            raise ValueError("Product quantization codes are stored as uint8; use at most 256 centroids")
+        self.subvectors = subvectors
+        self.centroids = centroids
+        self.iterations = iterations
+        self.max_training_points = max_training_points
+        self.seed = seed
+        self.sub_dimension = dimension // subvectors
+        self.codebooks: Optional[np.ndarray] = None  # (subvectors, centroids, sub_dimension)
+
+    @property
+    def is_trained(self) -> bool:
+        return self.codebooks is not None
+
+    @property
+    def min_training_points(self) -> int:
+        return self.centroids
+
+    def _split(self, vectors: np.ndarray) -> np.ndarray:
+        """(n, dimension) -> (subvectors, n, sub_dimension)"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        return vectors.reshape(len(vectors), self.subvectors, self.sub_dimension).transpose(1, 0, 2)
+
+    @staticmethod
+    def _nearest(points: np.ndarray, centers: np.ndarray) -> np.ndarray:
+        distances = (
+            (points ** 2).sum(axis=1)[:, None]
+            - 2 * points @ centers.T
+            + (centers ** 2).sum(axis=1)[None, :]
+        )
+        return distances.argmin(axis=1)
+
+    def fit(self, vectors: np.ndarray) -> "ProductQuantizer":
+        rng = np.random.default_rng(self.seed)
+        if len(vectors) > self.max_training_points:
+            vectors = vectors[rng.choice(len(vectors), self.max_training_points, replace=False)]
+        slices = self._split(vectors)
+        n_points = slices.shape[1]
+        n_centroids = min(self.centroids, n_points)
+        codebooks = np.zeros((self.subvectors, self.centroids, self.sub_dimension), dtype=np.float32)
+
+        for m in range(self.subvectors):
+            points = slices[m]
+            centers = points[rng.choice(n_points, n_centroids, replace=False)].copy()
+            for _ in range(self.iterations):
+                assignment = self._nearest(points, centers)
+                sums = np.zeros_like(centers)
+                np.add.at(sums, assignment, points)
+                counts = np.bincount(assignment, minlength=n_centroids)
+                filled = counts > 0
+                centers[filled] = sums[filled] / counts[filled, None]
+            codebooks[m, :n_centroids] = centers
+            # Unused slots repeat the first centroid so every code decodes to something sensible
+            codebooks[m, n_centroids:] = centers[0]
+
+        self.codebooks = codebooks
+        return self
+
+    def encode(self, vectors: np.ndarray) -> EncodedVectors:
+        if not self.is_trained:
+            raise ValueError("ProductQuantizer must be fit before encoding")
+        slices = self._split(vectors)
+        codes = np.empty((slices.shape[1], self.subvectors), dtype=np.uint8)
+        for m in range(self.subvectors):
+            codes[:, m] = self._nearest(slices[m], self.codebooks[m])
+        return EncodedVectors(codes=codes)
+
+    def decode(self, encoded: EncodedVectors) -> np.ndarray:
+        parts = [self.codebooks[m][encoded.codes[:, m]] for m in range(self.subvectors)]
+        return np.concatenate(parts, axis=1)
+
+    def score(self, encoded: EncodedVectors, query: np.ndarray) -> np.ndarray:
+        query_slices = np.asarray(query, dtype=np.float32).reshape(self.subvectors, self.sub_dimension)
+        # (subvectors, centroids) table of partial inner products
+        table = np.einsum("mkd,md->mk", self.codebooks, query_slices)
+        return table[np.arange(self.subvectors), encoded.codes].sum(axis=1)
+
+CODECS: Dict[str, Type[VectorCodec]] = {
+    VectorCodec.name: VectorCodec,
+    Float16Codec.name: Float16Codec,
+    Int8Codec.name: Int8Codec,
+    ProductQuantizer.name: ProductQuantizer,
+}
+
+def get_codec(name: str, dimension: int, **kwargs) -> VectorCodec:
+    """Instantiate a codec by its quantization mode name"""
+    if name not in CODECS:
+        raise ValueError(f"Unknown vector quantization '{name}'. Available: {sorted(CODECS)}")
+    return CODECS[name](dimension, **kwargs)
+
+def calibrate_byte_scale(vectors: np.ndarray) -> float:
+    """
+    Scale for to_byte_vector: 127 over the largest absolute component of
+    sample vectors, so their codes use the whole int8 range. A unit vector's
+    components never exceed 1, so 127 is the fallback when there is no sample.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    largest = float(np.abs(vectors).max()) if vectors.size else 0.0
+    return 127.0 / largest if largest > 0 else 127.0
+
+def to_byte_vector(vector: np.ndarray, scale: float = 127.0) -> List[int]:
+    """
+    Map a unit-normalized vector onto OpenSearch byte vectors ([-128, 127]).
+    Lucene byte vectors have no room for a per-vector scale (unlike
+    Int8Codec), so one global scale per index keeps inner products
+    comparable across documents; larger components are clipped.
+    """
+    return np.clip(np.rint(np.asarray(vector) * scale), -128, 127).astype(np.int8).tolist()
+
+def encode_base64(vector: np.ndarray, dtype=np.float32) -> str:
+    """Pack a vector as base64 bytes (much smaller than a JSON float list)"""
+    return base64.b64encode(np.asarray(vector, dtype=dtype).tobytes()).decode("ascii")
+
+def decode_base64(data: str, dtype=np.float32) -> np.ndarray:
+    return np.frombuffer(base64.b64decode(data), dtype=dtype)
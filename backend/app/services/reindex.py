@@ -0,0 +1,258 @@
+import argparse
+import itertools
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from opensearchpy import helpers
+from .opensearch_service import (
+    OpenSearchService, IndexConfig, DEFAULT_COLLECTION, MINHASH_FIELD, DUPLICATE_OF_FIELD, RESCORE_FIELD,
+    KNN_ENGINES, SPACE_TYPES, QUANTIZATION_MODES, full_precision_vector, opensearch_service
+)
+from .dedup import decode_signature
+from .quantization import calibrate_byte_scale
+from ..core.config import settings
+
+# Document id -> (routing, _seq_no, _primary_term) of the version last copied
+Versions = Dict[str, Tuple[Optional[str], int, int]]
+
+# Stored vectors sampled to calibrate the scale of a new byte (int8) index
+BYTE_SCALE_SAMPLE = 10000
+
+class ReindexService:
+    """
+    Builds a new versioned index from the chunks and embeddings stored in the
+    live index, then atomically moves the alias onto it. Searches keep hitting
+    the old index until the swap, so parameters can be tuned without downtime.
+
+    Writes keep going to the old index while it is copied. Catch-up passes
+    re-copy every document whose sequence number changed since it was copied
+    and delete the ones that are gone; the last pass runs after the swap, for
+    writes that landed in between. Copies are conditional on the new index
+    still holding what was copied (if_seq_no, or create for new ids), so they
+    never overwrite a write that reached the new index after the swap.
+    """
+    def __init__(self, search_service: OpenSearchService = opensearch_service):
+        self.search_service = search_service
+        self.client = search_service.client
+        self._lock = threading.Lock()
+        self.status: Dict[str, Any] = {"state": "idle"}
+
+    @property
+    def running(self) -> bool:
+        return self.status["state"] == "running"
+
+    def run(self, delete_old: bool = False, batch_size: int = settings.REINDEX_BATCH_SIZE,
+            collection_id: Optional[str] = None, **overrides) -> Dict[str, Any]:
+        """
+        Reindex into a new index built with settings plus any parameter
+        overrides. collection_id picks a dedicated collection's index;
+        the shared index is rebuilt otherwise.
+        """
+        if not self._lock.acquire(blocking=False):
+            raise RuntimeError("A reindex is already running")
+        try:
+            config = IndexConfig.from_settings(**overrides)
+            alias = self.search_service.collection_alias(collection_id)
+            old_indices = self.search_service.get_alias_indices(alias)
+            if not old_indices:
+                raise RuntimeError(f"No index behind alias '{alias}'")
+            source_index = old_indices[-1]
+            if config.quantization == "int8" and overrides.get("byte_scale") is None:
+                config.byte_scale = self._byte_scale(source_index, batch_size)
+
+            new_index = self.search_service.create_versioned_index(config, alias=alias)
+            self.status = {
+                "state": "running",
+                "alias": alias,
+                "source_index": source_index,
+                "new_index": new_index,
+                "config": vars(config),
+                "copied": 0,
+                "started_at": time.time(),
+            }
+
+            copied: Versions = {}
+            written: Dict[str, Tuple[int, int]] = {}  # Id -> (_seq_no, _primary_term) in the new index
+
+            # Bulk loading is much faster without refreshes; restored before the swap
+            self.client.indices.put_settings(index=new_index, body={"index": {"refresh_interval": "-1"}})
+            self.status["copied"] = self._copy(source_index, new_index, config, batch_size, copied, written)
+            self.status["caught_up"] = self._catch_up(source_index, new_index, config, batch_size, copied, written)
+            self.client.indices.put_settings(index=new_index, body={"index": {"refresh_interval": None}})
+            self.client.indices.refresh(index=new_index)
+
+            self.search_service.swap_alias(new_index, alias=alias)
+            if source_index != alias:
+                # A legacy concrete index under the alias name is removed by the swap itself
+                self.status["caught_up"] += self._catch_up(source_index, new_index, config, batch_size,
+                                                           copied, written)
+                self.client.indices.refresh(index=new_index)
+            if delete_old:
+                for old_index in old_indices:
+                    if old_index != alias:
+                        self.client.indices.delete(index=old_index)
+            self.status.update(state="completed", finished_at=time.time())
+            return self.status
+        except Exception as e:
+            self.status.update(state="failed", error=str(e), finished_at=time.time())
+            raise
+        finally:
+            self._lock.release()
+
+    def _byte_scale(self, source_index: str, batch_size: int) -> float:
+        """Byte-vector scale that spreads a sample of the stored vectors over the whole int8 range"""
+        hits = helpers.scan(
+            self.client,
+            index=source_index,
+            query={"query": {"exists": {"field": "my_vector"}}, "_source": ["my_vector", RESCORE_FIELD]},
+            size=batch_size
+        )
+        vectors = [full_precision_vector(hit["_source"]) for hit in itertools.islice(hits, BYTE_SCALE_SAMPLE)]
+        return calibrate_byte_scale(np.array(vectors))
+
+    def _to_action(self, hit: Dict, new_index: str, config: IndexConfig) -> Dict:
+        source = hit["_source"]
+        # Documents indexed before collections existed belong to the default one
+        collection_id = source.get("collection_id", DEFAULT_COLLECTION)
+        if DUPLICATE_OF_FIELD in source:
+            # Near-duplicates have no vector and copy over unchanged
+            doc = {**source, "collection_id": collection_id}
+        else:
+            doc = self.search_service.build_document(
+                chunk_id=source["chunk_id"],
+                media_id=source["media_id"],
+                text=source["text"],
+                start_time=source["start_time"],
+                end_time=source["end_time"],
+                vector=full_precision_vector(source),
+                config=config,
+                collection_id=collection_id,
+                signature=decode_signature(source[MINHASH_FIELD]) if MINHASH_FIELD in source else None
+            )
+        action = {"_index": new_index, "_id": hit["_id"], "_source": doc}
+        routing = self.search_service.collection_routing(collection_id)
+        if routing is not None:
+            action["_routing"] = routing
+        return action
+
+    def _write(self, hits: Iterable[Dict], new_index: str, config: IndexConfig, batch_size: int,
+               copied: Versions, written: Dict[str, Tuple[int, int]]) -> int:
+        """
+        Copy hits (with _seq_no and _primary_term) into the new index and
+        record both versions. Ids already written must still be as written and
+        new ones must not exist yet; a conflict means a newer write reached
+        the new index, which wins.
+        """
+        pending = deque()
+
+        def actions():
+            for hit in hits:
+                action = self._to_action(hit, new_index, config)
+                if hit["_id"] in written:
+                    action["_if_seq_no"], action["_if_primary_term"] = written[hit["_id"]]
+                else:
+                    action["_op_type"] = "create"
+                pending.append((hit["_id"], (hit.get("_routing"), hit["_seq_no"], hit["_primary_term"])))
+                yield action
+
+        applied = 0
+        # Results come back in the order of the actions
+        for ok, item in helpers.streaming_bulk(self.client, actions(), chunk_size=batch_size,
+                                               refresh=False, ignore_status=(409,)):
+            doc_id, version = pending.popleft()
+            copied[doc_id] = version
+            if ok:
+                result = next(iter(item.values()))
+                written[doc_id] = (result["_seq_no"], result["_primary_term"])
+                applied += 1
+        return applied
+
+    def _copy(self, source_index: str, new_index: str, config: IndexConfig, batch_size: int,
+              copied: Versions, written: Dict[str, Tuple[int, int]]) -> int:
+        hits = helpers.scan(
+            self.client,
+            index=source_index,
+            query={"query": {"match_all": {}}},
+            size=batch_size,
+            seq_no_primary_term=True
+        )
+        return self._write(hits, new_index, config, batch_size, copied, written)
+
+    def _versions(self, index: str, batch_size: int) -> Versions:
+        hits = helpers.scan(
+            self.client,
+            index=index,
+            query={"query": {"match_all": {}}, "_source": False},
+            size=batch_size,
+            seq_no_primary_term=True
+        )
+        return {hit["_id"]: (hit.get("_routing"), hit["_seq_no"], hit["_primary_term"]) for hit in hits}
+
+    def _catch_up(self, source_index: str, new_index: str, config: IndexConfig, batch_size: int,
+                  copied: Versions, written: Dict[str, Tuple[int, int]]) -> int:
+        """Apply writes and deletes that hit the old index since its documents were copied"""
+        self.client.indices.refresh(index=source_index)
+        current = self._versions(source_index, batch_size)
+        changed: List[str] = sorted(doc_id for doc_id, version in current.items() if copied.get(doc_id) != version)
+        deleted: List[str] = sorted(copied.keys() - current.keys())
+
+        applied = 0
+        for i in range(0, len(changed), batch_size):
+            # Each id is fetched with its own routing, or mget would look on the wrong shard
+            docs = [{"_id": doc_id, "routing": current[doc_id][0]} if current[doc_id][0] else {"_id": doc_id}
+                    for doc_id in changed[i:i + batch_size]]
+            response = self.client.mget(index=source_index, body={"docs": docs})
+            applied += self._write((doc for doc in response["docs"] if doc.get("found")),
+                                   new_index, config, batch_size, copied, written)
+            deleted.extend(doc["_id"] for doc in response["docs"] if not doc.get("found") and doc["_id"] in copied)
+
+        if deleted:
+            actions = []
+            for doc_id in deleted:
+                action = {"_op_type": "delete", "_index": new_index, "_id": doc_id}
+                routing = copied.pop(doc_id)[0]
+                if routing:
+                    action["_routing"] = routing
+                if doc_id in written:
+                    action["_if_seq_no"], action["_if_primary_term"] = written.pop(doc_id)
+                actions.append(action)
+            # Already gone, or written again since: either way there is nothing to delete
+            for _ in helpers.streaming_bulk(self.client, actions, chunk_size=batch_size, refresh=False,
+                                            ignore_status=(404, 409)):
+                pass
+        return applied + len(deleted)
+
+reindex_service = ReindexService()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the chunk index with new kNN parameters and swap the alias")
+    parser.add_argument("--engine", choices=KNN_ENGINES)
+    parser.add_argument("--space-type", choices=SPACE_TYPES)
+    parser.add_argument("--m", type=int)
+    parser.add_argument("--ef-construction", type=int)
+    parser.add_argument("--ef-search", type=int)
+    parser.add_argument("--quantization", choices=QUANTIZATION_MODES)
+    parser.add_argument("--batch-size", type=int, default=settings.REINDEX_BATCH_SIZE)
+    parser.add_argument("--collection", help="Rebuild this dedicated collection's index instead of the shared one")
+    parser.add_argument("--delete-old", action="store_true", help="Delete the previous index after the swap")
+    args = parser.parse_args()
+
+    alias = opensearch_service.collection_alias(args.collection)
+    print(f"Reindexing alias '{alias}'...")
+    result = reindex_service.run(
+        delete_old=args.delete_old,
+        batch_size=args.batch_size,
+        collection_id=args.collection,
+        engine=args.engine,
+        space_type=args.space_type,
+        m=args.m,
+        ef_construction=args.ef_construction,
+        ef_search=args.ef_search,
+        quantization=args.quantization
+    )
+    elapsed = result["finished_at"] - result["started_at"]
+    print(f"Copied {result['copied']} documents ({result['caught_up']} caught up) "
+          f"from {result['source_index']} into {result['new_index']} in {elapsed:.1f}s")
+    print(f"Alias '{alias}' now points at {result['new_index']}")
@@ -0,0 +1,122 @@
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+import math
+import threading
+import time
+from ..core.config import settings
+from ..core.metrics import track_stage
+
+def sigmoid(logit: float) -> float:
+    """Squash a cross-encoder logit into (0, 1) without overflowing"""
+    if logit >= 0:
+        return 1 / (1 + math.exp(-logit))
+    return math.exp(logit) / (1 + math.exp(logit))
+
+class RerankerService:
+    """
+    Re-scores kNN candidates with a cross-encoder, which reads query and chunk
+    together and ranks far better than bi-encoder similarity.
+
+    Scoring runs in batches within a latency budget: the measured time per
+    pair (a moving average, so it rises when the machine is busy) decides how
+    many uncached candidates fit, and candidates beyond that keep their
+    vector-score order below the re-ranked ones. Scores are cached per
+    (query, chunk text).
+
+    The model's logits are unbounded and often negative, so they pass
+    through a sigmoid; candidates beyond the budget are scaled below half
+    the lowest re-ranked score. Every result then has one 0-1 scale, which
+    grouping can compare and add up.
+    """
+    def __init__(self, model_name: str = settings.RERANK_MODEL,
+                 budget_ms: float = settings.RERANK_BUDGET_MS,
+                 batch_size: int = settings.RERANK_BATCH_SIZE,
+                 cache_size: int = settings.RERANK_CACHE_SIZE):
+        self.model_name = model_name
+        self.budget_seconds = budget_ms / 1000
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+        self.seconds_per_pair: Optional[float] = None
+        self._model = None
+        self._cache: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        # Loaded on first use so the API starts quickly when re-ranking is unused
+        with self._lock:
+            if self._model is None:
+                from sentence_transformers import CrossEncoder
+                self._model = CrossEncoder(self.model_name)
+            return self._model
+
+    def _cached(self, query: str, text: str) -> Optional[float]:
+        with self._lock:
+            score = self._cache.get((query, text))
+            if score is not None:
+                self._cache.move_to_end((query, text))
+            return score
+
+    def _store(self, query: str, text: str, score: float):
+        with self._lock:
+            self._cache[(query, text)] = score
+            self._cache.move_to_end((query, text))
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def affordable_pairs(self) -> int:
+        """Uncached pairs that fit in the latency budget at the current speed"""
+        if self.seconds_per_pair is None:
+            return self.batch_size  # No measurement yet: score one batch
+        return int(self.budget_seconds / self.seconds_per_pair)
+
+    def _score(self, query: str, texts: List[str]) -> List[float]:
+        start = time.perf_counter()
+        with track_stage("rerank"):
+            scores = self.model.predict([(query, text) for text in texts], batch_size=self.batch_size)
+        per_pair = (time.perf_counter() - start) / len(texts)
+        with self._lock:
+            self.seconds_per_pair = per_pair if self.seconds_per_pair is None \
+                else 0.8 * self.seconds_per_pair + 0.2 * per_pair
+        return [sigmoid(float(score)) for score in scores]
+
+    def rerank(self, query: str, results: List[Dict], k: int) -> List[Dict]:
+        """
+        Re-rank vector search results (best first). At least the first k are
+        re-scored; re-ranked results come first and carry the cross-encoder
+        score (0-1) in "score" and the original similarity in "vector_score".
+        The rest follow in their original order with their similarity scaled
+        below every re-ranked score.
+        """
+        # The top k are always re-scored, however slow the model is
+        budget = max(self.affordable_pairs(), k)
+        scored: Dict[int, float] = {}
+        to_score: List[int] = []
+        for i, result in enumerate(results):
+            cached = self._cached(query, result["text"])
+            if cached is not None:
+                scored[i] = cached
+            elif len(to_score) < budget:
+                to_score.append(i)
+            # Over budget: the rest keep their vector-score order
+
+        if to_score:
+            scores = self._score(query, [results[i]["text"] for i in to_score])
+            for i, score in zip(to_score, scores):
+                scored[i] = score
+                self._store(query, results[i]["text"], score)
+
+        reranked = sorted(
+            ({**results[i], "vector_score": results[i]["score"], "score": score} for i, score in scored.items()),
+            key=lambda result: result["score"],
+            reverse=True
+        )
+        # Similarities are at most 1: the rest stay below half the lowest re-ranked score
+        floor = reranked[-1]["score"] / 2 if reranked else 1.0
+        rest = [
+            {**result, "vector_score": result["score"], "score": floor * result["score"]}
+            for i, result in enumerate(results) if i not in scored
+        ]
+        return reranked + rest
+
+reranker_service = RerankerService()
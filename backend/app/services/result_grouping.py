@@ -0,0 +1,56 @@
+from typing import Dict, List
+from collections import defaultdict
+
+RANK_MODES = ("best", "sum")
+
+def merge_spans(hits: List[Dict], merge_gap: float) -> List[Dict]:
+    """
+    Merge one media's hits whose time ranges overlap or are within merge_gap
+    seconds into spans. A span keeps its best hit's score and text.
+    """
+    spans: List[Dict] = []
+    for hit in sorted(hits, key=lambda hit: hit["start_time"]):
+        if spans and hit["start_time"] <= spans[-1]["end_time"] + merge_gap:
+            span = spans[-1]
+            span["end_time"] = max(span["end_time"], hit["end_time"])
+            span["hit_count"] += 1
+            if hit["score"] > span["score"]:
+                span["score"] = hit["score"]
+                span["text"] = hit["text"]
+        else:
+            spans.append({
+                "start_time": hit["start_time"],
+                "end_time": hit["end_time"],
+                "score": hit["score"],
+                "text": hit["text"],
+                "hit_count": 1,
+            })
+    return spans
+
+def group_results(results: List[Dict], rank_by: str = "best", max_hits_per_media: int = 3,
+                  merge_gap: float = 1.0, min_score: float = 0.0) -> List[Dict]:
+    """
+    Group chunk hits by media, ranked by the best chunk score or the sum of
+    chunk scores, with adjacent hits merged into spans and at most
+    max_hits_per_media spans (best first) per media.
+    """
+    if rank_by not in RANK_MODES:
+        raise ValueError(f"Unknown rank mode '{rank_by}'. Choose from: {', '.join(RANK_MODES)}")
+
+    by_media: Dict[str, List[Dict]] = defaultdict(list)
+    for result in results:
+        if result["score"] >= min_score:
+            by_media[result["media_id"]].append(result)
+
+    groups = []
+    for media_id, hits in by_media.items():
+        scores = [hit["score"] for hit in hits]
+        spans = sorted(merge_spans(hits, merge_gap), key=lambda span: span["score"], reverse=True)
+        groups.append({
+            "media_id": media_id,
+            "score": max(scores) if rank_by == "best" else sum(scores),
+            "hit_count": len(hits),
+            "spans": spans[:max_hits_per_media],
+        })
+    groups.sort(key=lambda group: group["score"], reverse=True)
+    return groups
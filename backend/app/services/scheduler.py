@@ -0,0 +1,119 @@
+import asyncio
+import heapq
+import itertools
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from fastapi.concurrency import run_in_threadpool
+from ..core.config import settings
+from ..core.metrics import SCHEDULER_QUEUE_WAIT, SCHEDULER_QUEUE_DEPTH, SCHEDULER_RUNNING
+
+# Lower runs first
+PRIORITY_CLASSES = {"interactive": 0, "batch": 1}
+
+class JobScheduler:
+    """
+    Runs blocking jobs in the threadpool with at most `slots` at a time.
+
+    When a slot frees up, the next job comes from the highest priority class
+    with work waiting. Within a class, tenants are served fairly: each tenant
+    accumulates virtual time equal to the cost of its dispatched jobs and the
+    tenant furthest behind goes next, so one tenant's backlog cannot starve
+    the others. A tenant's own jobs run shortest first.
+    """
+    MAX_TRACKED_TENANTS = 1024
+
+    def __init__(self, name: str, slots: int):
+        self.name = name
+        self.slots = max(1, slots)
+        self.running = 0
+        self.waiting = 0
+        # (priority class, tenant) -> heap of (cost, seq, future)
+        self._queues: Dict[Tuple[int, str], List[Tuple[float, int, asyncio.Future]]] = {}
+        self._seq = itertools.count()
+        self._virtual_time = 0.0
+        self._tenant_finish: Dict[str, float] = {}
+
+    async def run(self, func: Callable, *args, priority: str = "interactive",
+                  tenant: str = "default", cost: float = 1.0, **kwargs) -> Any:
+        """Wait for a slot, then run func(*args, **kwargs) in the threadpool"""
+        if priority not in PRIORITY_CLASSES:
+            raise ValueError(f"Unknown priority '{priority}'. Choose from: {', '.join(PRIORITY_CLASSES)}")
+        enqueued_at = time.perf_counter()
+        await self._acquire(PRIORITY_CLASSES[priority], tenant, max(float(cost), 0.0))
+        SCHEDULER_QUEUE_WAIT.labels(queue=self.name, priority=priority).observe(time.perf_counter() - enqueued_at)
+        try:
+            return await run_in_threadpool(func, *args, **kwargs)
+        finally:
+            self._release()
+
+    async def _acquire(self, priority: int, tenant: str, cost: float):
+        if self.running < self.slots and not self.waiting:
+            self._grant(tenant, cost)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queues.setdefault((priority, tenant), []), (cost, next(self._seq), future))
+        self.waiting += 1
+        self._update_gauges()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.cancelled():
+                self.waiting -= 1  # Left in its heap; skipped when reached
+            else:
+                self._release()  # Slot was granted just before the cancellation
+            self._update_gauges()
+            raise
+
+    def _grant(self, tenant: str, cost: float):
+        start = max(self._virtual_time, self._tenant_finish.get(tenant, 0.0))
+        self._virtual_time = start
+        self._tenant_finish[tenant] = start + cost
+        self.running += 1
+        if len(self._tenant_finish) > self.MAX_TRACKED_TENANTS:
+            # Tenants at or behind virtual time would restart from it anyway
+            self._tenant_finish = {
+                name: tag for name, tag in self._tenant_finish.items() if tag > self._virtual_time
+            }
+        self._update_gauges()
+
+    def _next_queue(self) -> Optional[Tuple[int, str]]:
+        """Queue key of the next job: best priority, then least-served tenant, then FIFO"""
+        best, best_rank = None, None
+        for key, heap in list(self._queues.items()):
+            while heap and heap[0][2].done():
+                heapq.heappop(heap)
+            if not heap:
+                del self._queues[key]
+                continue
+            priority, tenant = key
+            rank = (priority, max(self._virtual_time, self._tenant_finish.get(tenant, 0.0)),
+                    min(seq for _, seq, future in heap if not future.done()))
+            if best_rank is None or rank < best_rank:
+                best, best_rank = key, rank
+        return best
+
+    def _release(self):
+        self.running -= 1
+        while self.waiting and self.running < self.slots:
+            key = self._next_queue()
+            if key is None:
+                break
+            cost, _, future = heapq.heappop(self._queues[key])
+            self.waiting -= 1
+            self._grant(key[1], cost)
+            future.set_result(None)
+        self._update_gauges()
+
+    def _update_gauges(self):
+        SCHEDULER_QUEUE_DEPTH.labels(queue=self.name).set(self.waiting)
+        SCHEDULER_RUNNING.labels(queue=self.name).set(self.running)
+
+def threads_per_job(core_budget: int, slots: int) -> int:
+    """CPU threads each job may use so concurrent jobs stay within the core budget"""
+    cores = core_budget or os.cpu_count() or 1
+    return max(1, cores // max(1, slots))
+
+transcription_scheduler = JobScheduler("transcription", settings.TRANSCRIPTION_CONCURRENCY)
+embedding_scheduler = JobScheduler("embedding", settings.EMBEDDING_CONCURRENCY)
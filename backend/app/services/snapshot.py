@@ -0,0 +1,386 @@
+import json
+import os
+import shutil
+import time
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+import numpy as np
+from opensearchpy import helpers
+from sqlalchemy import func, insert, select, text
+from .opensearch_service import (
+    OpenSearchService, MINHASH_FIELD, DUPLICATE_OF_FIELD, full_precision_vector, opensearch_service
+)
+from .dedup import decode_signature
+from ..crud.media import DELETE_BATCH_SIZE
+from ..db.session import SessionLocal
+from ..models.media import Media, Transcription, TranscriptionSegment, Chunk, AudioFingerprint
+from ..core.config import settings
+
+SNAPSHOT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+VECTORS_FILE = "vectors.npy"
+TABLE_FILES = ("media", "segments", "chunks", "fingerprints", "documents")
+
+def pack_strings(name: str, values: Sequence[Optional[str]]) -> Dict[str, np.ndarray]:
+    """
+    A string column as arrays: the UTF-8 bytes of all values back to back,
+    the offset where each starts (plus the end) and which ones are null
+    """
+    encoded = [(value or "").encode("utf-8") for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    return {
+        f"{name}.data": np.frombuffer(b"".join(encoded), dtype=np.uint8),
+        f"{name}.offsets": offsets,
+        f"{name}.null": np.array([value is None for value in values], dtype=bool),
+    }
+
+def unpack_strings(arrays, name: str) -> List[Optional[str]]:
+    data = arrays[f"{name}.data"].tobytes()
+    offsets = arrays[f"{name}.offsets"].tolist()
+    return [
+        None if null else data[start:end].decode("utf-8")
+        for start, end, null in zip(offsets, offsets[1:], arrays[f"{name}.null"].tolist())
+    ]
+
+def _batches(rows: List[Dict[str, Any]], size: int) -> Iterable[List[Dict[str, Any]]]:
+    for i in range(0, len(rows), size):
+        yield rows[i:i + size]
+
+class SnapshotService:
+    """
+    Exports media, transcripts, chunks, audio fingerprints and the chunk
+    index to a directory of column arrays, and imports one into another
+    environment without transcribing or embedding anything again.
+
+    Each table is a compressed .npz of columns (strings as UTF-8 bytes plus
+    offsets); the embeddings are one float32 matrix in vectors.npy, which
+    import memory-maps rather than reads. manifest.json is written last, so
+    an interrupted export is never imported. Uploaded files aren't included:
+    media keep their paths, and UPLOAD_FOLDER is copied separately when
+    streaming or clips are needed on the new node.
+    """
+    def __init__(self, search_service: OpenSearchService = opensearch_service, session_factory=SessionLocal):
+        self.search_service = search_service
+        self.client = search_service.client
+        self.session_factory = session_factory
+
+    def export(self, directory: str, collection_id: Optional[str] = None,
+               batch_size: int = settings.SNAPSHOT_BATCH_SIZE) -> Dict[str, Any]:
+        """Write a snapshot of all media (or one collection's) into directory"""
+        start = time.perf_counter()
+        os.makedirs(directory, exist_ok=True)
+        manifest_path = os.path.join(directory, MANIFEST_FILE)
+        if os.path.exists(manifest_path):
+            os.remove(manifest_path)  # Invalid until this export finishes
+
+        with self.session_factory() as db:
+            scope = select(Media.id).where(Media.collection_id == collection_id) \
+                if collection_id is not None else None
+
+            def scoped(query, column):
+                return query.where(column.in_(scope)) if scope is not None else query
+
+            media = db.execute(scoped(
+                select(Media.id, Media.filename, Media.file_path, Media.audio_path, Media.collection_id,
+                       Media.created_at, Transcription.id.isnot(None))
+                .outerjoin(Transcription, Transcription.media_id == Media.id)
+                .order_by(Media.id), Media.id
+            )).all()
+            segments = db.execute(scoped(
+                select(Transcription.media_id, TranscriptionSegment.text,
+                       TranscriptionSegment.start_time, TranscriptionSegment.end_time)
+                .join(TranscriptionSegment, TranscriptionSegment.transcription_id == Transcription.id)
+                .order_by(Transcription.media_id, TranscriptionSegment.id), Transcription.media_id
+            )).all()
+            chunks = db.execute(scoped(
+                select(Chunk.id, Chunk.media_id, Chunk.text, Chunk.start_time, Chunk.end_time)
+                .order_by(Chunk.id), Chunk.media_id
+            )).all()
+            fingerprints = db.execute(scoped(
+                select(AudioFingerprint.media_id, AudioFingerprint.hash, AudioFingerprint.frame)
+                .order_by(AudioFingerprint.id), AudioFingerprint.media_id
+            )).all()
+
+        ids, filenames, file_paths, audio_paths, collections, created_at, transcribed = zip(*media) if media \
+            else ((),) * 7
+        np.savez_compressed(
+            os.path.join(directory, "media.npz"),
+            id=np.array(ids, dtype=np.int64),
+            created_at=np.array(created_at, dtype=np.float64),
+            transcribed=np.array(transcribed, dtype=bool),
+            **pack_strings("filename", filenames),
+            **pack_strings("file_path", file_paths),
+            **pack_strings("audio_path", audio_paths),
+            **pack_strings("collection_id", collections),
+        )
+        np.savez_compressed(
+            os.path.join(directory, "segments.npz"),
+            media_id=np.array([row[0] for row in segments], dtype=np.int64),
+            start_time=np.array([row[2] for row in segments], dtype=np.float64),
+            end_time=np.array([row[3] for row in segments], dtype=np.float64),
+            **pack_strings("text", [row[1] for row in segments]),
+        )
+        np.savez_compressed(
+            os.path.join(directory, "chunks.npz"),
+            id=np.array([row[0] for row in chunks], dtype=np.int64),
+            media_id=np.array([row[1] for row in chunks], dtype=np.int64),
+            start_time=np.array([row[3] for row in chunks], dtype=np.float64),
+            end_time=np.array([row[4] for row in chunks], dtype=np.float64),
+            **pack_strings("text", [row[2] for row in chunks]),
+        )
+        np.savez_compressed(
+            os.path.join(directory, "fingerprints.npz"),
+            media_id=np.array([row[0] for row in fingerprints], dtype=np.int64),
+            hash=np.array([row[1] for row in fingerprints], dtype=np.int64),
+            frame=np.array([row[2] for row in fingerprints], dtype=np.int64),
+        )
+        documents = self._export_documents(directory, set(ids), batch_size)
+
+        counts = {
+            "media": len(media), "segments": len(segments), "chunks": len(chunks),
+            "fingerprints": len(fingerprints), **documents,
+        }
+        manifest = {
+            "version": SNAPSHOT_VERSION,
+            "created_at": time.time(),
+            "collection_id": collection_id,
+            "embedding_model": settings.EMBEDDING_MODEL,
+            "embedding_dimension": settings.EMBEDDING_DIMENSION,
+            "counts": counts,
+        }
+        with open(manifest_path, "w") as f:
+            json.dump(manifest, f, indent=2)
+        return {**manifest, "directory": directory, "seconds": round(time.perf_counter() - start, 3)}
+
+    def _export_documents(self, directory: str, media_ids: set, batch_size: int) -> Dict[str, int]:
+        """
+        Index documents of the exported media as columns of their own fields,
+        with their full-precision vectors streamed into vectors.npy. Document
+        chunk ids count segments (see IngestService._store_window), not rows
+        of the chunks table, so documents are copied rather than rebuilt
+        from chunk rows.
+        """
+        doc_media_ids: List[int] = []
+        doc_chunk_ids: List[int] = []
+        texts: List[str] = []
+        start_times: List[float] = []
+        end_times: List[float] = []
+        vector_rows: List[int] = []
+        duplicate_of: List[Optional[str]] = []
+        canonical_media_ids: List[Optional[str]] = []
+        signatures: List[Optional[np.ndarray]] = []
+        raw_path = os.path.join(directory, VECTORS_FILE + ".raw")
+        with open(raw_path, "wb") as raw:
+            for alias in self.search_service.search_aliases():
+                for hit in helpers.scan(self.client, index=alias, query={"query": {"match_all": {}}},
+                                        size=batch_size):
+                    source = hit["_source"]
+                    media_id = int(source["media_id"])
+                    if media_id not in media_ids:
+                        continue  # Its media was deleted, or is outside the collection
+                    doc_media_ids.append(media_id)
+                    doc_chunk_ids.append(int(source["chunk_id"]))
+                    texts.append(source["text"])
+                    start_times.append(source["start_time"])
+                    end_times.append(source["end_time"])
+                    signatures.append(decode_signature(source[MINHASH_FIELD]) if MINHASH_FIELD in source else None)
+                    duplicate_of.append(source.get(DUPLICATE_OF_FIELD))
+                    canonical_media_ids.append(source.get("canonical_media_id"))
+                    if DUPLICATE_OF_FIELD in source:
+                        vector_rows.append(-1)  # Near-duplicates share another chunk's vector
+                    else:
+                        vector_rows.append(raw.tell() // (4 * settings.EMBEDDING_DIMENSION))
+                        raw.write(full_precision_vector(source).astype("<f4").tobytes())
+            vector_count = raw.tell() // (4 * settings.EMBEDDING_DIMENSION)
+
+        # The header needs the row count, known only now
+        with open(os.path.join(directory, VECTORS_FILE), "wb") as f, open(raw_path, "rb") as raw:
+            np.lib.format.write_array_header_1_0(f, {
+                "descr": "<f4", "fortran_order": False, "shape": (vector_count, settings.EMBEDDING_DIMENSION)
+            })
+            shutil.copyfileobj(raw, f, length=1 << 20)
+        os.remove(raw_path)
+
+        width = max((len(signature) for signature in signatures if signature is not None), default=0)
+        minhash = np.zeros((len(signatures), width), dtype=np.uint32)
+        for row, signature in enumerate(signatures):
+            if signature is not None:
+                minhash[row] = signature
+        np.savez_compressed(
+            os.path.join(directory, "documents.npz"),
+            media_id=np.array(doc_media_ids, dtype=np.int64),
+            chunk_id=np.array(doc_chunk_ids, dtype=np.int64),
+            start_time=np.array(start_times, dtype=np.float64),
+            end_time=np.array(end_times, dtype=np.float64),
+            vector_row=np.array(vector_rows, dtype=np.int64),
+            minhash=minhash,
+            has_minhash=np.array([signature is not None for signature in signatures], dtype=bool),
+            **pack_strings("text", texts),
+            **pack_strings("duplicate_of", duplicate_of),
+            **pack_strings("canonical_media_id", canonical_media_ids),
+        )
+        return {"documents": len(doc_chunk_ids), "vectors": vector_count}
+
+    @staticmethod
+    def read_manifest(directory: str) -> Dict[str, Any]:
+        manifest_path = os.path.join(directory, MANIFEST_FILE)
+        if not os.path.isfile(manifest_path):
+            raise ValueError(f"No snapshot in {directory} (missing {MANIFEST_FILE}; was the export interrupted?)")
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        if manifest.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported snapshot version {manifest.get('version')}")
+        if (manifest["embedding_model"], manifest["embedding_dimension"]) != \
+                (settings.EMBEDDING_MODEL, settings.EMBEDDING_DIMENSION):
+            raise ValueError(
+                f"Snapshot embeddings are from {manifest['embedding_model']} "
+                f"({manifest['embedding_dimension']} dimensions), but this node uses "
+                f"{settings.EMBEDDING_MODEL} ({settings.EMBEDDING_DIMENSION})"
+            )
+        return manifest
+
+    def import_snapshot(self, directory: str, batch_size: int = settings.SNAPSHOT_BATCH_SIZE) -> Dict[str, Any]:
+        """
+        Load a snapshot into the database and the chunk index. Media and
+        chunks keep their ids, so documents, duplicate pointers and
+        checkpoints stay valid; importing into a database that already has
+        any of them is refused. Either everything is loaded or nothing is.
+        """
+        start = time.perf_counter()
+        manifest = self.read_manifest(directory)
+        tables = {name: np.load(os.path.join(directory, f"{name}.npz")) for name in TABLE_FILES}
+        vectors = np.load(os.path.join(directory, VECTORS_FILE), mmap_mode="r")
+        media, chunks = tables["media"], tables["chunks"]
+        media_ids = media["id"].tolist()
+        collections = dict(zip(media_ids, unpack_strings(media, "collection_id")))
+
+        with self.session_factory() as db:
+            for model, ids in ((Media, media_ids), (Chunk, chunks["id"].tolist())):
+                clashes = sum(
+                    db.execute(select(func.count()).where(model.id.in_(ids[i:i + DELETE_BATCH_SIZE]))).scalar()
+                    for i in range(0, len(ids), DELETE_BATCH_SIZE)
+                )
+                if clashes:
+                    raise ValueError(f"{clashes} {model.__tablename__} ids in the snapshot already exist")
+
+            indexed = False
+            try:
+                self._load_tables(db, tables, batch_size)
+                indexed = True
+                self._load_documents(tables["documents"], collections, vectors, batch_size)
+                db.commit()
+            except Exception:
+                db.rollback()
+                if indexed:
+                    self.search_service.delete_by_media_ids(media_ids, refresh=True)
+                raise
+        return {**manifest, "directory": directory, "seconds": round(time.perf_counter() - start, 3)}
+
+    def _load_tables(self, db, tables: Dict[str, Any], batch_size: int):
+        media, segments, chunks, fingerprints = (tables[name] for name in TABLE_FILES[:4])
+        rows = [
+            {"id": media_id, "filename": filename, "file_path": file_path, "audio_path": audio_path,
+             "collection_id": collection_id, "created_at": created_at}
+            for media_id, filename, file_path, audio_path, collection_id, created_at in zip(
+                media["id"].tolist(), unpack_strings(media, "filename"), unpack_strings(media, "file_path"),
+                unpack_strings(media, "audio_path"), unpack_strings(media, "collection_id"),
+                media["created_at"].tolist()
+            )
+        ]
+        for batch in _batches(rows, batch_size):
+            db.execute(insert(Media), batch)
+
+        transcribed = media["id"][media["transcribed"]].tolist()
+        for batch in _batches([{"media_id": media_id} for media_id in transcribed], batch_size):
+            db.execute(insert(Transcription), batch)
+        transcription_ids = {}
+        for i in range(0, len(transcribed), DELETE_BATCH_SIZE):
+            transcription_ids.update(db.execute(
+                select(Transcription.media_id, Transcription.id)
+                .where(Transcription.media_id.in_(transcribed[i:i + DELETE_BATCH_SIZE]))
+            ).all())
+
+        rows = [
+            {"transcription_id": transcription_ids[media_id], "text": text_, "start_time": start_time,
+             "end_time": end_time}
+            for media_id, text_, start_time, end_time in zip(
+                segments["media_id"].tolist(), unpack_strings(segments, "text"),
+                segments["start_time"].tolist(), segments["end_time"].tolist()
+            )
+        ]
+        for batch in _batches(rows, batch_size):
+            db.execute(insert(TranscriptionSegment), batch)
+
+        rows = [
+            {"id": chunk_id, "media_id": media_id, "text": text_, "start_time": start_time, "end_time": end_time}
+            for chunk_id, media_id, text_, start_time, end_time in zip(
+                chunks["id"].tolist(), chunks["media_id"].tolist(), unpack_strings(chunks, "text"),
+                chunks["start_time"].tolist(), chunks["end_time"].tolist()
+            )
+        ]
+        for batch in _batches(rows, batch_size):
+            db.execute(insert(Chunk), batch)
+
+        rows = [
+            {"media_id": media_id, "hash": hash_, "frame": frame}
+            for media_id, hash_, frame in zip(
+                fingerprints["media_id"].tolist(), fingerprints["hash"].tolist(), fingerprints["frame"].tolist()
+            )
+        ]
+        for batch in _batches(rows, batch_size * 10):
+            db.execute(insert(AudioFingerprint), batch)
+
+        if db.bind.dialect.name == "postgresql":
+            # Ids were set explicitly; move the sequences past them
+            for table in ("media", "chunks"):
+                db.execute(text(
+                    f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                    f"GREATEST((SELECT MAX(id) FROM {table}), 1))"
+                ))
+
+    def _document_actions(self, documents, collections: Dict[int, str], vectors: np.ndarray
+                          ) -> Iterable[Dict[str, Any]]:
+        texts = unpack_strings(documents, "text")
+        duplicate_of = unpack_strings(documents, "duplicate_of")
+        canonical_media_ids = unpack_strings(documents, "canonical_media_id")
+        minhash, has_minhash = documents["minhash"], documents["has_minhash"]
+        configs = {}
+        for i, (media_id, chunk_id, start_time, end_time, vector_row) in enumerate(zip(
+            documents["media_id"].tolist(), documents["chunk_id"].tolist(), documents["start_time"].tolist(),
+            documents["end_time"].tolist(), documents["vector_row"].tolist()
+        )):
+            collection_id = collections[media_id]
+            fields = dict(
+                chunk_id=chunk_id, media_id=media_id, text=texts[i], start_time=start_time, end_time=end_time,
+                collection_id=collection_id
+            )
+            alias = self.search_service._write_alias(collection_id)
+            if vector_row < 0:
+                doc = self.search_service.build_duplicate_document(
+                    duplicate_of={"id": duplicate_of[i], "media_id": canonical_media_ids[i]}, **fields
+                )
+            else:
+                if alias not in configs:
+                    configs[alias] = self.search_service.config_for(alias)
+                doc = self.search_service.build_document(
+                    vector=np.asarray(vectors[vector_row], dtype=np.float32),
+                    config=configs[alias],
+                    signature=minhash[i] if has_minhash[i] else None,
+                    **fields
+                )
+            action = {"_index": alias, "_id": doc["id"], "_source": doc}
+            routing = self.search_service.collection_routing(collection_id)
+            if routing is not None:
+                action["_routing"] = routing
+            yield action
+
+    def _load_documents(self, documents, collections: Dict[int, str], vectors: np.ndarray, batch_size: int):
+        helpers.bulk(
+            self.client,
+            self._document_actions(documents, collections, vectors),
+            chunk_size=batch_size,
+            refresh=False
+        )
+        self.client.indices.refresh(index=self.search_service.search_aliases())
+
+snapshot_service = SnapshotService()
@@ -0,0 +1,214 @@
+from dataclasses import dataclass
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Mapping, Optional, Tuple
+import mimetypes
+import os
+import struct
+import subprocess
+import anyio
+from fastapi import HTTPException
+from starlette.background import BackgroundTask
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+READ_CHUNK_SIZE = 256 * 1024
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    The (start, end) byte span, end inclusive, requested by a Range header, or
+    None when the whole file should be sent: no header, another unit, or
+    several ranges (which the server may ignore; players ask for one).
+    Unsatisfiable or malformed ranges raise 416.
+    """
+    if not header:
+        return None
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, dash, last = spec.strip().partition("-")
+    try:
+        if not dash or (not first and not last):
+            raise ValueError
+        if not first:
+            # Suffix range: the last N bytes
+            length = int(last)
+            if length <= 0 or size == 0:
+                raise ValueError
+            return max(size - length, 0), size - 1
+        start = int(first)
+        end = int(last) if last else size - 1
+        if start < 0 or start >= size or end < start:
+            raise ValueError
+        return start, min(end, size - 1)
+    except ValueError:
+        raise HTTPException(status_code=416, detail="Requested range not satisfiable",
+                            headers={"Content-Range": f"bytes */{size}"})
+
+def file_etag(stat: os.stat_result) -> str:
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+def _matches_etag(header: str, etag: str) -> bool:
+    tags = [tag.strip() for tag in header.split(",")]
+    # Weak comparison: W/"x" matches "x"
+    return "*" in tags or any(tag.removeprefix("W/") == etag for tag in tags)
+
+def _not_after(header: str, stat: os.stat_result) -> bool:
+    """Whether the file was not modified after the HTTP date in header"""
+    try:
+        return int(stat.st_mtime) <= parsedate_to_datetime(header).timestamp()
+    except (TypeError, ValueError):
+        return False
+
+def is_not_modified(headers: Mapping[str, str], stat: os.stat_result) -> bool:
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is not None:
+        return _matches_etag(if_none_match, file_etag(stat))
+    if_modified_since = headers.get("if-modified-since")
+    return if_modified_since is not None and _not_after(if_modified_since, stat)
+
+def range_applies(headers: Mapping[str, str], stat: os.stat_result) -> bool:
+    """If-Range: a range from an outdated copy gets the whole (new) file instead"""
+    if_range = headers.get("if-range")
+    if if_range is None:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        # Strong comparison only; our ETags are strong
+        return if_range == file_etag(stat)
+    return _not_after(if_range, stat)
+
+@dataclass
+class WavLayout:
+    data_start: int
+    data_size: int
+    byte_rate: int
+    block_align: int
+
+def wav_layout(path: str) -> Optional[WavLayout]:
+    """Where the sample data of a PCM WAV file starts, or None for other files"""
+    with open(path, "rb") as f:
+        header = f.read(12)
+        if len(header) < 12 or header[:4] != b"RIFF" or header[8:12] != b"WAVE":
+            return None
+        byte_rate = block_align = None
+        while True:
+            chunk = f.read(8)
+            if len(chunk) < 8:
+                return None
+            chunk_id, chunk_size = chunk[:4], struct.unpack("<I", chunk[4:])[0]
+            if chunk_id == b"fmt ":
+                fmt = f.read(chunk_size)
+                byte_rate, block_align = struct.unpack("<IH", fmt[8:14])
+                chunk_size = 0
+            elif chunk_id == b"data":
+                if byte_rate is None:
+                    return None
+                return WavLayout(f.tell(), chunk_size, byte_rate, block_align)
+            # Chunks are padded to an even size
+            f.seek(chunk_size + (chunk_size & 1), os.SEEK_CUR)
+
+def packet_offset(path: str, seconds: float) -> Optional[int]:
+    """
+    Byte position of the video keyframe at or before the given time (of the
+    audio packet there, for files without video), read with ffprobe. Seeking
+    puts ffprobe on that packet, so only one packet is read. None when
+    ffprobe is missing or the container doesn't report packet positions.
+    """
+    for stream, keyframes_only in (("V:0", True), ("a:0", False)):  # V skips cover art
+        try:
+            output = subprocess.run([
+                "ffprobe", "-v", "error", "-select_streams", stream,
+                "-read_intervals", f"{seconds:.3f}%+#1",
+                "-show_entries", "packet=pos,flags", "-of", "csv=p=0", path
+            ], check=True, capture_output=True, text=True).stdout
+        except (FileNotFoundError, subprocess.CalledProcessError):
+            return None
+        for line in output.splitlines():
+            pos, _, flags = line.partition(",")
+            if pos.isdigit() and ("K" in flags or not keyframes_only):
+                return int(pos)
+    return None
+
+def byte_offset(path: str, seconds: float, duration: float) -> Tuple[int, bool]:
+    """
+    Byte offset of the given time in a media file, and whether it is exact:
+    the start of the WAV sample frame, or of the keyframe (audio packet)
+    at or before the time in other containers. Without packet positions the
+    offset is interpolated from the duration, which is not exact. Either way
+    a player needs the container's headers (e.g. an MP4's moov) first.
+    """
+    size = os.path.getsize(path)
+    layout = wav_layout(path)
+    if layout is not None:
+        frames = int(seconds * layout.byte_rate) // layout.block_align
+        offset = layout.data_start + min(frames * layout.block_align, layout.data_size)
+        return min(offset, max(size - 1, 0)), True
+    offset = packet_offset(path, seconds)
+    if offset is not None and offset < size:
+        return offset, True
+    if duration <= 0:
+        return 0, False
+    return min(int(size * seconds / duration), max(size - 1, 0)), False
+
+class RangeFileResponse(Response):
+    """
+    Sends a file, or one byte range of it (206), with ETag and Last-Modified
+    validators. The body goes out through the ASGI zero-copy extension
+    (sendfile) when the server offers it, and otherwise in chunks read with
+    pread off the event loop.
+    """
+    def __init__(self, path: str, stat: os.stat_result, byte_range: Optional[Tuple[int, int]] = None,
+                 media_type: Optional[str] = None, background: Optional[BackgroundTask] = None):
+        self.path = path
+        size = stat.st_size
+        self.start, self.end = byte_range if byte_range is not None else (0, size - 1)
+        headers = {
+            "accept-ranges": "bytes",
+            "etag": file_etag(stat),
+            "last-modified": formatdate(stat.st_mtime, usegmt=True),
+            "content-length": str(self.end - self.start + 1),
+        }
+        if byte_range is not None:
+            headers["content-range"] = f"bytes {self.start}-{self.end}/{size}"
+        super().__init__(
+            status_code=206 if byte_range is not None else 200,
+            headers=headers,
+            media_type=media_type or mimetypes.guess_type(path)[0] or "application/octet-stream",
+            background=background
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        count = self.end - self.start + 1
+        if scope["method"].upper() == "HEAD" or count <= 0:
+            await send({"type": "http.response.body", "body": b""})
+        elif "http.response.zerocopy" in scope.get("extensions", {}):
+            with open(self.path, "rb") as f:
+                await send({"type": "http.response.zerocopy", "file": f.fileno(),
+                            "offset": self.start, "count": count})
+        else:
+            fd = os.open(self.path, os.O_RDONLY)
+            try:
+                offset, remaining = self.start, count
+                while remaining > 0:
+                    chunk = await anyio.to_thread.run_sync(os.pread, fd, min(READ_CHUNK_SIZE, remaining), offset)
+                    if not chunk:
+                        break  # Truncated while streaming
+                    offset += len(chunk)
+                    remaining -= len(chunk)
+                    await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+                if remaining > 0:
+                    await send({"type": "http.response.body", "body": b""})
+            finally:
+                os.close(fd)
+        if self.background is not None:
+            await self.background()
+
+def stream_file(path: str, headers: Mapping[str, str], media_type: Optional[str] = None) -> Response:
+    """Response for a conditional / range GET of path"""
+    stat = os.stat(path)
+    if is_not_modified(headers, stat):
+        return Response(status_code=304, headers={
+            "etag": file_etag(stat), "last-modified": formatdate(stat.st_mtime, usegmt=True)
+        })
+    range_header = headers.get("range") if range_applies(headers, stat) else None
+    return RangeFileResponse(path, stat, parse_range(range_header, stat.st_size), media_type=media_type)
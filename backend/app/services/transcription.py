@@ -1,24 +1,161 @@
 import whisper
+from dataclasses import dataclass, replace
 from fastapi import HTTPException
-from typing import List, Tuple
+from typing import Any, Dict, List, Optional, Tuple
+import math
 import os
+import tempfile
+import threading
+import wave
 from ..core.config import settings
+from ..core.metrics import timed
+from .scheduler import threads_per_job
 
-class TranscriptionService:
-    def __init__(self):
-        try:
-            self.model = whisper.load_model("base")
-        except Exception as e:
+# Whisper's default schedule: retry a window at higher temperatures when decoding fails
+FALLBACK_TEMPERATURES = (0.0, 0.2, 0.4, 0.6, 0.8, 1.0)
+
+@dataclass(frozen=True)
+class DecodingOptions:
+    beam_size: int = 0  # 0 = greedy decoding
+    condition_on_previous_text: bool = True
+    temperature_fallback: bool = True
+
+    @classmethod
+    def from_settings(cls, **overrides) -> "DecodingOptions":
+        options = cls(
+            beam_size=settings.WHISPER_BEAM_SIZE,
+            condition_on_previous_text=settings.WHISPER_CONDITION_ON_PREVIOUS_TEXT,
+            temperature_fallback=settings.WHISPER_TEMPERATURE_FALLBACK
+        )
+        return replace(options, **{key: value for key, value in overrides.items() if value is not None})
+
+    @property
+    def temperature(self):
+        return FALLBACK_TEMPERATURES if self.temperature_fallback else 0.0
+
+    def whisper_kwargs(self) -> Dict[str, Any]:
+        """Keyword arguments for openai-whisper's model.transcribe"""
+        kwargs = {
+            "temperature": self.temperature,
+            "condition_on_previous_text": self.condition_on_previous_text,
+            "fp16": settings.WHISPER_DEVICE != "cpu",  # fp16 is unsupported on CPU
+        }
+        if self.beam_size:
+            kwargs["beam_size"] = self.beam_size
+        return kwargs
+
+    def faster_whisper_kwargs(self) -> Dict[str, Any]:
+        """Keyword arguments for faster-whisper's WhisperModel.transcribe"""
+        return {
+            "beam_size": self.beam_size or 1,
+            "temperature": list(self.temperature) if self.temperature_fallback else 0.0,
+            "condition_on_previous_text": self.condition_on_previous_text,
+        }
+
+# Speed/accuracy presets selectable per upload: (model size, decoding options)
+TRANSCRIPTION_TIERS: Dict[str, Tuple[str, DecodingOptions]] = {
+    "fast": ("tiny", DecodingOptions(beam_size=0, condition_on_previous_text=False, temperature_fallback=False)),
+    "balanced": ("base", DecodingOptions(beam_size=0, condition_on_previous_text=True, temperature_fallback=True)),
+    "accurate": ("small", DecodingOptions(beam_size=5, condition_on_previous_text=True, temperature_fallback=True)),
+}
+
+def resolve_tier(tier: Optional[str] = None,
+                 model_size: Optional[str] = None) -> Tuple[Optional[str], Optional[DecodingOptions]]:
+    """
+    Model size and decoding options for an upload. An explicit model size
+    overrides the tier's; None means the service default.
+    """
+    options = None
+    if tier is not None:
+        if tier not in TRANSCRIPTION_TIERS:
             raise HTTPException(
-                status_code=500, 
-                detail=f"Failed to load Whisper model: {str(e)}"
+                status_code=400,
+                detail=f"Unknown transcription tier '{tier}'. Choose from: {', '.join(TRANSCRIPTION_TIERS)}"
+            )
+        tier_model, options = TRANSCRIPTION_TIERS[tier]
+        model_size = model_size or tier_model
+    if model_size is not None and model_size not in settings.WHISPER_MODEL_SIZES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported model size '{model_size}'. Choose from: {', '.join(settings.WHISPER_MODEL_SIZES)}"
+        )
+    return model_size, options
+
+def window_bounds(duration: float, window_seconds: float) -> List[Tuple[float, float]]:
+    """Split [0, duration) into consecutive windows of at most window_seconds"""
+    if duration <= 0:
+        return []
+    count = max(1, math.ceil(duration / window_seconds))
+    return [(i * window_seconds, min((i + 1) * window_seconds, duration)) for i in range(count)]
+
+class TranscriptionService:
+    """
+    Transcribes audio with openai-whisper or, when WHISPER_BACKEND is
+    "faster-whisper", with CTranslate2 (int8 on CPU by default). Models are
+    loaded on first use and kept per size.
+    """
+    BACKENDS = ("openai", "faster-whisper")
+
+    def __init__(self, backend: str = settings.WHISPER_BACKEND,
+                 model_size: str = settings.WHISPER_MODEL):
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown Whisper backend '{backend}'. Choose from: {', '.join(self.BACKENDS)}")
+        self.backend = backend
+        self.default_model_size = model_size
+        self._models: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self.model = self.load_model(model_size)
+
+    def _load(self, model_size: str):
+        # Split the core budget between concurrent transcriptions instead of
+        # letting each one spawn a thread per core
+        cpu_threads = threads_per_job(settings.TRANSCRIPTION_CORE_BUDGET, settings.TRANSCRIPTION_CONCURRENCY)
+        if self.backend == "faster-whisper":
+            from faster_whisper import WhisperModel
+            return WhisperModel(
+                model_size,
+                device=settings.WHISPER_DEVICE,
+                compute_type=settings.WHISPER_COMPUTE_TYPE,
+                cpu_threads=cpu_threads
             )
-    
-    def transcribe_audio(self, audio_path: str) -> List[Tuple[str, float, float]]:
+        if settings.WHISPER_DEVICE == "cpu":
+            import torch
+            torch.set_num_threads(cpu_threads)  # Process-wide, so embedding models share it
+        return whisper.load_model(model_size, device=settings.WHISPER_DEVICE)
+
+    def load_model(self, model_size: str):
+        """Load (or return the cached) model for a size"""
+        with self._lock:
+            if model_size not in self._models:
+                try:
+                    self._models[model_size] = self._load(model_size)
+                except Exception as e:
+                    raise HTTPException(
+                        status_code=500,
+                        detail=f"Failed to load Whisper model: {str(e)}"
+                    )
+            return self._models[model_size]
+
+    @timed("transcribe")
+    def transcribe_audio(self, audio_path: str, model_size: Optional[str] = None,
+                         options: Optional[DecodingOptions] = None) -> List[Tuple[str, float, float]]:
+        if model_size is None or model_size == self.default_model_size:
+            model = self.model
+        else:
+            model = self.load_model(model_size)
+        options = options or DecodingOptions.from_settings()
         try:
+            if self.backend == "faster-whisper":
+                # Segments are generated lazily while decoding runs
+                result_segments, _ = model.transcribe(audio_path, **options.faster_whisper_kwargs())
+                return [
+                    (segment.text.strip(), float(segment.start), float(segment.end))
+                    for segment in result_segments
+                ]
+
             # Transcribe audio
-            result = self.model.transcribe(audio_path)
-            
+            result = model.transcribe(audio_path, **options.whisper_kwargs())
+
             # Extract segments with timestamps
             segments = []
             for segment in result["segments"]:
@@ -27,11 +164,33 @@ class TranscriptionService:
                     segment["start"],
                     segment["end"]
                 ))
-            
+
             return segments
-            
+
         except Exception as e:
             raise HTTPException(
                 status_code=500,
                 detail=f"Transcription failed: {str(e)}"
-            ) 
\ No newline at end of file
+            )
+
+    def transcribe_window(self, audio_path: str, start: float, end: float,
+                          model_size: Optional[str] = None,
+                          options: Optional[DecodingOptions] = None) -> List[Tuple[str, float, float]]:
+        """Transcribe [start, end) of a WAV file; timestamps are relative to the whole file"""
+        with wave.open(audio_path, "rb") as source:
+            rate = source.getframerate()
+            first_frame = int(round(start * rate))
+            source.setpos(min(first_frame, source.getnframes()))
+            frames = source.readframes(int(round(end * rate)) - first_frame)
+            params = source.getparams()
+
+        fd, window_path = tempfile.mkstemp(suffix=".wav", dir=os.path.dirname(audio_path) or None)
+        os.close(fd)
+        try:
+            with wave.open(window_path, "wb") as window:
+                window.setparams(params)
+                window.writeframes(frames)
+            segments = self.transcribe_audio(window_path, model_size=model_size, options=options)
+        finally:
+            os.remove(window_path)
+        return [(text, seg_start + start, seg_end + start) for text, seg_start, seg_end in segments]
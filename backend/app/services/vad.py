@@ -0,0 +1,197 @@
+from dataclasses import dataclass
+from typing import Iterable, Iterator, List, Optional, Tuple
+import os
+import wave
+import numpy as np
+from .media_processor import MediaProcessor
+from ..core.config import settings
+from ..core.metrics import timed, VAD_AUDIO_SECONDS
+
+@dataclass
+class SpeechTimeline:
+    """
+    Maps times in the speech-only audio back to the original recording.
+    regions[i] = (start, end) in the original; offsets[i] = where it starts
+    in the compacted audio.
+    """
+    regions: np.ndarray
+    offsets: np.ndarray
+
+    @classmethod
+    def identity(cls, duration: float) -> "SpeechTimeline":
+        return cls(regions=np.array([[0.0, duration]]), offsets=np.array([0.0]))
+
+    @property
+    def speech_seconds(self) -> float:
+        return float(np.sum(self.regions[:, 1] - self.regions[:, 0]))
+
+    def to_original(self, t: float, end: bool = False) -> float:
+        # An end time on a region boundary belongs to the region before it
+        side = "left" if end else "right"
+        i = max(int(np.searchsorted(self.offsets, t, side=side)) - 1, 0)
+        start, stop = self.regions[i]
+        return float(min(start + (t - self.offsets[i]), stop))
+
+    def map_segments(self, segments: List[Tuple[str, float, float]]) -> List[Tuple[str, float, float]]:
+        return [
+            (text, self.to_original(start), self.to_original(end, end=True))
+            for text, start, end in segments
+        ]
+
+class VoiceActivityDetector:
+    """
+    Energy/zero-crossing VAD over fixed frames. A frame is speech if it is
+    loud relative to the recording (above its noise floor and near its peak
+    level) and either tonal (low zero-crossing rate) or well above threshold,
+    which keeps fricatives but rejects hiss. Short gaps are bridged, short
+    blips dropped and regions padded so word edges are not clipped.
+    """
+    SAMPLE_RATE = 16000
+
+    def __init__(self, frame_ms: int = settings.VAD_FRAME_MS,
+                 energy_margin_db: float = settings.VAD_ENERGY_MARGIN_DB,
+                 min_energy_db: float = settings.VAD_MIN_ENERGY_DB,
+                 max_zcr: float = settings.VAD_MAX_ZCR,
+                 min_speech_ms: int = settings.VAD_MIN_SPEECH_MS,
+                 min_silence_ms: int = settings.VAD_MIN_SILENCE_MS,
+                 padding_ms: int = settings.VAD_PADDING_MS):
+        self.frame_ms = frame_ms
+        self.energy_margin_db = energy_margin_db
+        self.min_energy_db = min_energy_db
+        self.max_zcr = max_zcr
+        self.min_speech_ms = min_speech_ms
+        self.min_silence_ms = min_silence_ms
+        self.padding_ms = padding_ms
+
+    def frame_features(self, samples: np.ndarray, sample_rate: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Per-frame energy (dBFS) and zero-crossing rate"""
+        frame_len = max(1, sample_rate * self.frame_ms // 1000)
+        n_frames = len(samples) // frame_len
+        frames = samples[:n_frames * frame_len].reshape(n_frames, frame_len)
+        energy_db = 10 * np.log10(np.mean(frames ** 2, axis=1) + 1e-10)
+        signs = np.signbit(frames)
+        zcr = np.mean(signs[:, 1:] != signs[:, :-1], axis=1) if frame_len > 1 else np.zeros(n_frames)
+        return energy_db, zcr
+
+    def stream_features(self, blocks: Iterable[np.ndarray], sample_rate: int) -> Tuple[np.ndarray, np.ndarray, int]:
+        """Per-frame energy and zero-crossing rate of audio read in blocks, and its length in samples"""
+        frame_len = max(1, sample_rate * self.frame_ms // 1000)
+        energies, zcrs = [], []
+        carry = np.zeros(0, dtype=np.float32)
+        n_samples = 0
+        for block in blocks:
+            n_samples += len(block)
+            # Frames straddling two blocks are completed from the carried remainder
+            samples = np.concatenate((carry, block))
+            whole = len(samples) // frame_len * frame_len
+            energy_db, zcr = self.frame_features(samples[:whole], sample_rate)
+            energies.append(energy_db)
+            zcrs.append(zcr)
+            carry = samples[whole:]
+        if not energies:
+            return np.zeros(0), np.zeros(0), 0
+        return np.concatenate(energies), np.concatenate(zcrs), n_samples
+
+    def detect(self, samples: np.ndarray, sample_rate: int) -> np.ndarray:
+        """Speech regions as an (n, 2) array of (start, end) seconds"""
+        energy_db, zcr = self.frame_features(samples, sample_rate)
+        return self.detect_frames(energy_db, zcr, len(samples) / sample_rate)
+
+    def detect_frames(self, energy_db: np.ndarray, zcr: np.ndarray, duration: float) -> np.ndarray:
+        """Speech regions, as detect, from the frame features of audio lasting duration seconds"""
+        if len(energy_db) == 0:
+            return np.zeros((0, 2))
+
+        noise_floor = np.percentile(energy_db, 10)
+        peak = np.percentile(energy_db, 99)
+        # Constant-level audio has no floor to speak of; fall back to the peak
+        threshold = max(self.min_energy_db, min(noise_floor + self.energy_margin_db, peak - self.energy_margin_db))
+        is_speech = (energy_db > threshold) & ((zcr < self.max_zcr) | (energy_db > threshold + self.energy_margin_db))
+
+        # Run boundaries in frames: starts[i] <= frame < ends[i]
+        edges = np.diff(np.concatenate(([0], is_speech.astype(np.int8), [0])))
+        starts, ends = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+        if len(starts) == 0:
+            return np.zeros((0, 2))
+
+        # Bridge short silences, then drop short speech
+        keep = (starts[1:] - ends[:-1]) * self.frame_ms >= self.min_silence_ms
+        starts = np.concatenate(([starts[0]], starts[1:][keep]))
+        ends = np.concatenate((ends[:-1][keep], [ends[-1]]))
+        long_enough = (ends - starts) * self.frame_ms >= self.min_speech_ms
+        starts, ends = starts[long_enough], ends[long_enough]
+
+        padding = self.padding_ms / 1000
+        regions = np.stack([
+            np.maximum(starts * self.frame_ms / 1000 - padding, 0.0),
+            np.minimum(ends * self.frame_ms / 1000 + padding, duration)
+        ], axis=1)
+        return self._merge_overlaps(regions)
+
+    @staticmethod
+    def _merge_overlaps(regions: np.ndarray) -> np.ndarray:
+        if len(regions) < 2:
+            return regions
+        # A region starts a new group unless it overlaps everything before it
+        running_end = np.maximum.accumulate(regions[:, 1])
+        new_group = np.concatenate(([True], regions[1:, 0] > running_end[:-1]))
+        group = np.cumsum(new_group) - 1
+        merged_ends = np.zeros(group[-1] + 1)
+        np.maximum.at(merged_ends, group, regions[:, 1])
+        return np.stack([regions[new_group, 0], merged_ends], axis=1)
+
+    @staticmethod
+    def stream_samples(audio_path: str, sample_rate: int = SAMPLE_RATE) -> Iterator[np.ndarray]:
+        """Mono float32 samples in [-1, 1] at sample_rate, in blocks"""
+        return MediaProcessor.stream_samples(audio_path, sample_rate)
+
+    @timed("vad")
+    def extract_speech(self, audio_path: str) -> Tuple[Optional[str], SpeechTimeline]:
+        """
+        Write the speech regions of audio_path to a compacted WAV and return
+        its path with the timeline mapping. Returns audio_path itself when VAD
+        is disabled or little would be skipped, and None when there is no speech.
+        The audio is read twice in blocks (once for the frame features, once
+        to copy the speech out) rather than decoded into memory whole.
+        """
+        if not settings.VAD_ENABLED:
+            return audio_path, SpeechTimeline.identity(MediaProcessor.audio_duration(audio_path))
+
+        energy_db, zcr, n_samples = self.stream_features(self.stream_samples(audio_path), self.SAMPLE_RATE)
+        duration = n_samples / self.SAMPLE_RATE
+        regions = self.detect_frames(energy_db, zcr, duration)
+        timeline = SpeechTimeline(
+            regions=regions,
+            offsets=np.concatenate(([0.0], np.cumsum(regions[:, 1] - regions[:, 0])[:-1])) if len(regions) else np.zeros(0)
+        )
+        VAD_AUDIO_SECONDS.labels(kind="speech").inc(timeline.speech_seconds)
+        VAD_AUDIO_SECONDS.labels(kind="silence").inc(duration - timeline.speech_seconds)
+
+        if len(regions) == 0:
+            return None, timeline
+        if duration - timeline.speech_seconds < settings.VAD_MIN_SKIP_SECONDS:
+            return audio_path, SpeechTimeline.identity(duration)
+
+        bounds = np.round(regions * self.SAMPLE_RATE).astype(int)
+        speech_path = f"{os.path.splitext(audio_path)[0]}.speech.wav"
+        with wave.open(speech_path, "wb") as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(self.SAMPLE_RATE)
+            region = 0
+            position = 0  # Sample index of the block's start
+            for block in self.stream_samples(audio_path):
+                block_end = position + len(block)
+                # Copy the parts of the (sorted) regions that fall in this block
+                while region < len(bounds) and bounds[region][0] < block_end:
+                    start, end = bounds[region]
+                    if end > position:
+                        speech = block[max(start - position, 0):min(end, block_end) - position]
+                        wav.writeframes((np.clip(speech, -1.0, 1.0) * 32767).astype(np.int16).tobytes())
+                    if end > block_end:
+                        break  # Continues in the next block
+                    region += 1
+                position = block_end
+        return speech_path, timeline
+
+vad_service = VoiceActivityDetector()
@@ -0,0 +1,117 @@
+import threading
+from typing import Any, Dict, List, Optional
+import numpy as np
+from .quantization import EncodedVectors, get_codec
+from ..core.config import settings
+
+class LocalVectorStore:
+    """
+    In-process vector index over compact (quantized) embeddings.
+
+    Candidates are scored against the compact codes, then the top
+    `k * rescore_oversample` are re-scored against the full-precision
+    vectors when those are kept. A codec that needs training (pq) is fit
+    once enough vectors were added; until then they are kept and searched
+    at full precision. Adds, removals and searches hold a lock, as they
+    replace the arrays a concurrent search would be reading.
+    """
+    def __init__(
+        self,
+        dimension: int = settings.EMBEDDING_DIMENSION,
+        quantization: str = settings.VECTOR_QUANTIZATION,
+        keep_full_precision: bool = True,
+        rescore_oversample: int = settings.VECTOR_RESCORE_OVERSAMPLE,
+        **codec_options
+    ):
+        self.dimension = dimension
+        self.codec = get_codec(quantization, dimension, **codec_options)
+        # A float32 codec already is full precision; don't hold a second copy
+        self.keep_full_precision = keep_full_precision and self.codec.name != "float32"
+        self.rescore_oversample = rescore_oversample
+        self.ids: List[str] = []
+        self.payloads: List[Dict[str, Any]] = []
+        self.encoded: Optional[EncodedVectors] = None
+        self.full_vectors: Optional[np.ndarray] = None
+        self.untrained: Optional[np.ndarray] = None  # Vectors waiting for the codec to be fit
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def memory_bytes(self) -> int:
+        """Bytes held by the compact codes (and the rescoring copy, if kept)"""
+        with self._lock:
+            total = self.encoded.nbytes if self.encoded is not None else 0
+            for vectors in (self.full_vectors, self.untrained):
+                if vectors is not None:
+                    total += vectors.nbytes
+            return total
+
+    def add(self, ids: List[str], vectors: np.ndarray, payloads: Optional[List[Dict[str, Any]]] = None):
+        """Add vectors; a codec that needs training is fit once min_training_points were added"""
+        with self._lock:
+            vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dimension)
+            if len(ids) != len(vectors):
+                raise ValueError("ids and vectors must have the same length")
+            self.ids.extend(ids)
+            self.payloads.extend(payloads if payloads is not None else [{} for _ in ids])
+            if not self.codec.is_trained:
+                self.untrained = vectors.copy() if self.untrained is None \
+                    else np.concatenate([self.untrained, vectors])
+                if len(self.untrained) < self.codec.min_training_points:
+                    return
+                # Every vector added so far is encoded with the new codebooks
+                vectors, self.untrained = self.untrained, None
+                self.codec.fit(vectors)
+
+            encoded = self.codec.encode(vectors)
+            self.encoded = encoded if self.encoded is None else EncodedVectors.concat([self.encoded, encoded])
+            if self.keep_full_precision:
+                self.full_vectors = vectors.copy() if self.full_vectors is None \
+                    else np.concatenate([self.full_vectors, vectors])
+
+    def remove(self, ids: List[str]) -> int:
+        """Remove vectors by id, returning how many were removed"""
+        with self._lock:
+            to_remove = set(ids)
+            keep = np.array([vector_id not in to_remove for vector_id in self.ids], dtype=bool)
+            removed = int((~keep).sum())
+            if removed:
+                if self.untrained is not None:
+                    self.untrained = self.untrained[keep]
+                else:
+                    self.encoded = self.encoded.take(keep)
+                if self.full_vectors is not None:
+                    self.full_vectors = self.full_vectors[keep]
+                self.ids = [vector_id for vector_id, kept in zip(self.ids, keep) if kept]
+                self.payloads = [payload for payload, kept in zip(self.payloads, keep) if kept]
+            return removed
+
+    def search(self, query_vector: np.ndarray, k: int = 5, rescore: bool = True) -> List[Dict[str, Any]]:
+        """Return the top-k payloads with an 'id' and inner-product 'score'"""
+        with self._lock:
+            if not self.ids:
+                return []
+            query_vector = np.asarray(query_vector, dtype=np.float32)
+            query_vector = query_vector / np.linalg.norm(query_vector)
+
+            if self.untrained is not None:
+                scores = self.untrained @ query_vector
+                rescore = False
+            else:
+                scores = self.codec.score(self.encoded, query_vector)
+                rescore = rescore and self.full_vectors is not None
+            pool = min(len(scores), k * self.rescore_oversample if rescore else k)
+            candidates = np.argpartition(-scores, pool - 1)[:pool]
+
+            if rescore:
+                candidate_scores = self.full_vectors[candidates] @ query_vector
+            else:
+                candidate_scores = scores[candidates]
+
+            order = np.argsort(-candidate_scores)[:k]
+            return [
+                {**self.payloads[candidates[j]], 'id': self.ids[candidates[j]], 'score': float(candidate_scores[j])}
+                for j in order
+            ]
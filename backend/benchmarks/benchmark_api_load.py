@@ -0,0 +1,116 @@
+import asyncio
+import io
+import random
+import sys
+import time
+import argparse
+
+import httpx
+from pydub import AudioSegment
+
+# Base URL of a running API server (uvicorn app.main:app)
+BASE_URL = "http://localhost:8000/api/v1"
+
+SEARCH_QUERIES = [
+    "what is machine learning",
+    "how to cook pasta",
+    "climate change and the arctic",
+    "the renaissance in italy",
+    "quantum mechanics experiments",
+]
+
+def generate_audio(duration_ms: int = 2000) -> bytes:
+    """Generate a short silent WAV clip to upload"""
+    buffer = io.BytesIO()
+    AudioSegment.silent(duration=duration_ms).export(buffer, format="wav")
+    return buffer.getvalue()
+
+def percentile(values: list, pct: float) -> float:
+    """Nearest-rank percentile of a list of latencies"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+async def do_upload(client: httpx.AsyncClient, audio: bytes, request_id: int) -> httpx.Response:
+    files = {"file": (f"load_test_{request_id}.wav", audio, "audio/wav")}
+    return await client.post(f"{BASE_URL}/media/upload", files=files)
+
+async def do_search(client: httpx.AsyncClient, audio: bytes, request_id: int) -> httpx.Response:
+    params = {"query": random.choice(SEARCH_QUERIES), "k": 5, "min_score": 0.0}
+    return await client.post(f"{BASE_URL}/query/search", params=params)
+
+async def do_list(client: httpx.AsyncClient, audio: bytes, request_id: int) -> httpx.Response:
+    return await client.get(f"{BASE_URL}/media/", params={"limit": 10})
+
+OPERATIONS = {"upload": do_upload, "search": do_search, "list": do_list}
+
+async def run_load(total_requests: int, concurrency: int, mix: dict) -> dict:
+    """Fire a weighted mix of requests and collect per-operation latencies"""
+    audio = generate_audio()
+    latencies = {name: [] for name in OPERATIONS}
+    errors = {name: 0 for name in OPERATIONS}
+    uploaded_ids = []
+    semaphore = asyncio.Semaphore(concurrency)
+    names = list(mix.keys())
+    weights = [mix[name] for name in names]
+
+    async with httpx.AsyncClient(timeout=300) as client:
+        async def worker(request_id: int):
+            name = random.choices(names, weights=weights)[0]
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    response = await OPERATIONS[name](client, audio, request_id)
+                    ok = response.status_code < 400
+                except httpx.HTTPError:
+                    response, ok = None, False
+                latencies[name].append(time.perf_counter() - start)
+            if not ok:
+                errors[name] += 1
+            elif name == "upload":
+                uploaded_ids.append(response.json()["id"])
+
+        wall_start = time.perf_counter()
+        await asyncio.gather(*(worker(i) for i in range(total_requests)))
+        wall_time = time.perf_counter() - wall_start
+
+        # Remove the media created by the load test
+        for media_id in uploaded_ids:
+            await client.delete(f"{BASE_URL}/media/{media_id}")
+
+    return {"latencies": latencies, "errors": errors, "wall_time": wall_time}
+
+def print_report(results: dict, total_requests: int, concurrency: int):
+    print(f"\n{total_requests} requests at concurrency {concurrency} "
+          f"in {results['wall_time']:.2f}s ({total_requests / results['wall_time']:.1f} req/s)")
+    print("Operation | Count | Errors |  p50 (ms) |  p95 (ms) |  p99 (ms)")
+    print("-" * 65)
+    all_latencies = []
+    for name, values in results["latencies"].items():
+        all_latencies.extend(values)
+        print(f"{name:9s} | {len(values):5d} | {results['errors'][name]:6d} | "
+              f"{percentile(values, 50) * 1000:9.1f} | {percentile(values, 95) * 1000:9.1f} | "
+              f"{percentile(values, 99) * 1000:9.1f}")
+    print(f"{'all':9s} | {len(all_latencies):5d} | {sum(results['errors'].values()):6d} | "
+          f"{percentile(all_latencies, 50) * 1000:9.1f} | {percentile(all_latencies, 95) * 1000:9.1f} | "
+          f"{percentile(all_latencies, 99) * 1000:9.1f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mixed upload/search/list load test")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--upload-weight", type=float, default=0.1)
+    parser.add_argument("--search-weight", type=float, default=0.6)
+    parser.add_argument("--list-weight", type=float, default=0.3)
+    args = parser.parse_args()
+
+    mix = {"upload": args.upload_weight, "search": args.search_weight, "list": args.list_weight}
+    print(f"Running mixed load test against {BASE_URL}...")
+    try:
+        results = asyncio.run(run_load(args.requests, args.concurrency, mix))
+    except httpx.ConnectError:
+        print(f"Could not connect to {BASE_URL}; start the API server first.")
+        sys.exit(1)
+    print_report(results, args.requests, args.concurrency)
@@ -0,0 +1,208 @@
+"""
+End-to-end ingest and query benchmark that runs the FastAPI app in-process.
+
+OpenSearch is replaced by the in-process LocalOpenSearchClient, embeddings use
+the download-free hashing encoder (or a real model via --embedding-model), the
+database is a temporary SQLite file, and uploads are generated WAV clips. By
+default Whisper is swapped for a synthetic transcriber so search has text to
+match; pass --real-whisper to include transcription cost.
+
+    python benchmarks/benchmark_e2e.py --concurrency 1 4 16 --output results.json
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+BENCHMARK_DIR = tempfile.mkdtemp(prefix="vidseek-bench-")
+
+def configure_environment(args):
+    """Point settings at local stand-ins; must run before the app is imported"""
+    os.environ["OPENSEARCH_BACKEND"] = "local"
+    os.environ["EMBEDDING_MODEL"] = args.embedding_model
+    os.environ["WHISPER_MODEL"] = args.whisper_model
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(BENCHMARK_DIR, 'benchmark.db')}"
+    os.environ["UPLOAD_FOLDER"] = os.path.join(BENCHMARK_DIR, "uploads")
+    os.environ["CHECKPOINT_DIR"] = os.path.join(BENCHMARK_DIR, "checkpoints")
+
+SENTENCES = [
+    "The Renaissance period in Italy marked a dramatic cultural shift in European history.",
+    "Quantum mechanics introduced concepts like wave-particle duality.",
+    "Coral reefs are experiencing unprecedented levels of bleaching due to rising ocean temperatures.",
+    "Traditional fermentation techniques have been used for thousands of years to preserve food.",
+    "The James Webb Space Telescope has revolutionized our view of distant galaxies.",
+    "Large language models can now engage in sophisticated dialogue.",
+    "CRISPR gene editing technology is opening new frontiers in treating genetic diseases.",
+    "Solar and wind power have become increasingly cost-competitive with fossil fuels.",
+    "The Riemann Hypothesis remains one of mathematics' greatest unsolved problems.",
+    "Brain-computer interfaces promise new hope for treating neurological conditions.",
+]
+
+SEARCH_QUERIES = [
+    "renaissance art in italy",
+    "quantum physics duality",
+    "ocean temperature and coral",
+    "food preservation",
+    "space telescope galaxies",
+    "language models dialogue",
+    "gene editing diseases",
+    "renewable energy costs",
+]
+
+class SyntheticWhisper:
+    """Stands in for a Whisper model: one segment per 5s of audio, cycling SENTENCES"""
+    SEGMENT_SECONDS = 5.0
+
+    def transcribe(self, audio_path, **kwargs):
+        from pydub import AudioSegment
+        duration = AudioSegment.from_file(audio_path).duration_seconds
+        offset = sum(map(ord, os.path.basename(audio_path)))
+        segments = []
+        start = 0.0
+        while start < duration:
+            end = min(start + self.SEGMENT_SECONDS, duration)
+            segments.append({
+                "text": SENTENCES[(offset + len(segments)) % len(SENTENCES)],
+                "start": start,
+                "end": end
+            })
+            start = end
+        return {"segments": segments}
+
+def generate_audio(seconds: float) -> bytes:
+    """Mono 16 kHz WAV tone of the given length"""
+    from pydub.generators import Sine
+    audio = Sine(440).to_audio_segment(duration=int(seconds * 1000)).set_channels(1).set_frame_rate(16000)
+    buffer = io.BytesIO()
+    audio.export(buffer, format="wav")
+    return buffer.getvalue()
+
+def summarize(latencies: list, wall_time: float, errors: int) -> dict:
+    values = np.asarray(latencies) * 1000
+    return {
+        "count": len(latencies),
+        "errors": errors,
+        "wall_time_s": wall_time,
+        "throughput_per_s": len(latencies) / wall_time if wall_time else 0.0,
+        "p50_ms": float(np.percentile(values, 50)) if len(values) else 0.0,
+        "p90_ms": float(np.percentile(values, 90)) if len(values) else 0.0,
+        "p99_ms": float(np.percentile(values, 99)) if len(values) else 0.0,
+        "max_ms": float(values.max()) if len(values) else 0.0,
+    }
+
+async def run_phase(concurrency: int, total: int, make_request) -> dict:
+    """Run `total` requests with at most `concurrency` in flight"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    async def one(i: int):
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            response = await make_request(i)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+
+    wall_start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    return summarize(latencies, time.perf_counter() - wall_start, errors)
+
+async def run_benchmark(args) -> dict:
+    import httpx
+    from app.main import app
+    from app.services.ingest import ingest_service
+    from app.core.config import settings
+    from app.db.session import engine
+    from app.models import Base
+
+    Base.metadata.create_all(bind=engine)
+    if not args.real_whisper:
+        ingest_service.transcription_service.model = SyntheticWhisper()
+
+    audio = generate_audio(args.audio_seconds)
+    api = settings.API_V1_STR
+    levels = []
+    upload_counter = 0
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+        for concurrency in args.concurrency:
+            async def upload_request(i: int):
+                nonlocal upload_counter
+                upload_counter += 1
+                files = {"file": (f"bench_{concurrency}_{upload_counter}.wav", audio, "audio/wav")}
+                return await client.post(f"{api}/media/upload", files=files)
+
+            async def search_request(i: int):
+                params = {"query": SEARCH_QUERIES[i % len(SEARCH_QUERIES)], "k": args.k, "min_score": 0.0}
+                return await client.post(f"{api}/query/search", params=params)
+
+            print(f"Concurrency {concurrency}: {args.uploads} uploads, {args.searches} searches...")
+            upload_stats = await run_phase(concurrency, args.uploads, upload_request)
+            search_stats = await run_phase(concurrency, args.searches, search_request)
+            levels.append({"concurrency": concurrency, "upload": upload_stats, "search": search_stats})
+
+    return {"meta": run_metadata(args), "levels": levels}
+
+def run_metadata(args) -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "embedding_model": args.embedding_model,
+        "transcriber": f"whisper-{args.whisper_model}" if args.real_whisper else "synthetic",
+        "audio_seconds": args.audio_seconds,
+        "uploads_per_level": args.uploads,
+        "searches_per_level": args.searches,
+        "k": args.k,
+    }
+
+def print_report(results: dict):
+    print("\nConcurrency | Uploads/s | Upload p50 (ms) | Upload p99 (ms) | Search QPS | Search p50 (ms) | Search p99 (ms) | Errors")
+    print("-" * 115)
+    for level in results["levels"]:
+        up, search = level["upload"], level["search"]
+        print(f"{level['concurrency']:11d} | {up['throughput_per_s']:9.2f} | {up['p50_ms']:15.1f} | "
+              f"{up['p99_ms']:15.1f} | {search['throughput_per_s']:10.1f} | {search['p50_ms']:15.1f} | "
+              f"{search['p99_ms']:15.1f} | {up['errors'] + search['errors']:6d}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="In-process end-to-end ingest/query benchmark")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--uploads", type=int, default=20, help="Uploads per concurrency level")
+    parser.add_argument("--searches", type=int, default=200, help="Searches per concurrency level")
+    parser.add_argument("--audio-seconds", type=float, default=60.0)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--embedding-model", default="hashing", help="'hashing' or a sentence-transformers model")
+    parser.add_argument("--whisper-model", default="tiny")
+    parser.add_argument("--real-whisper", action="store_true", help="Transcribe with Whisper instead of the synthetic transcriber")
+    parser.add_argument("--output", help="Write machine-readable results to this JSON file")
+    args = parser.parse_args()
+
+    configure_environment(args)
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    results = asyncio.run(run_benchmark(args))
+    print_report(results)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.output}")
@@ -0,0 +1,90 @@
+import time
+import sys
+import os
+import json
+import argparse
+import numpy as np
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.embedding import EmbeddingService, EMBEDDING_BACKENDS
+from app.core.config import settings
+
+WORDS = (
+    "the model audio search query transcript lecture meeting video speaker topic result index "
+    "vector embedding language network training data question answer chapter summary minute "
+    "research project design review customer product market revenue quarter growth team"
+).split()
+
+def generate_texts(count: int, min_words: int = 5, max_words: int = 60, seed: int = 0) -> list:
+    """Sentences of varied length, like chunks (long) and queries (short)"""
+    rng = np.random.default_rng(seed)
+    return [" ".join(rng.choice(WORDS, size=rng.integers(min_words, max_words + 1)))
+            for _ in range(count)]
+
+def benchmark_backend(backend: str, model_name: str, texts: list, queries: list, batch_size: int,
+                      processes: int = 0) -> dict:
+    """Load one backend and measure single-query latency and batch throughput"""
+    start = time.perf_counter()
+    service = EmbeddingService(model_name=model_name, backend=backend, processes=processes)
+    load_time = time.perf_counter() - start
+
+    service.generate_embedding(queries[0])  # Warm-up
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        service.generate_embedding(query)
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    embeddings = service.generate_embeddings_batch(texts, batch_size=batch_size)
+    batch_time = time.perf_counter() - start
+    service.close()
+
+    return {
+        "backend": backend,
+        "load_time": load_time,
+        "query_p50_ms": np.percentile(latencies, 50) * 1000,
+        "query_p99_ms": np.percentile(latencies, 99) * 1000,
+        "texts_per_second": len(texts) / batch_time,
+        "embeddings": embeddings,
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare embedding backends: latency, throughput and parity")
+    parser.add_argument("--backends", nargs="+", choices=EMBEDDING_BACKENDS, default=list(EMBEDDING_BACKENDS))
+    parser.add_argument("--model", default=settings.EMBEDDING_MODEL)
+    parser.add_argument("--texts", type=int, default=2000, help="Texts embedded for the throughput run")
+    parser.add_argument("--queries", type=int, default=200, help="Single-query latency samples")
+    parser.add_argument("--batch-size", type=int, default=settings.EMBEDDING_BATCH_SIZE)
+    parser.add_argument("--processes", type=int, default=0,
+                        help="Encode pool workers for the throughput run (includes pool start-up)")
+    parser.add_argument("--output", help="Write machine-readable results to this JSON file")
+    args = parser.parse_args()
+
+    texts = generate_texts(args.texts)
+    queries = generate_texts(args.queries, min_words=2, max_words=12, seed=1)
+    print(f"Benchmarking {args.model}: {len(texts)} texts (batch {args.batch_size}), {len(queries)} queries")
+    results = [benchmark_backend(backend, args.model, texts, queries, args.batch_size, args.processes)
+               for backend in args.backends]
+
+    # Parity against the first backend (PyTorch by default): cosine of unit vectors
+    reference = results[0]["embeddings"]
+    for r in results:
+        similarities = np.sum(reference * r.pop("embeddings"), axis=1)
+        r["min_cosine"] = float(similarities.min())
+        r["mean_cosine"] = float(similarities.mean())
+
+    print(f"\nBackend   | Load (s) | Query p50 (ms) | Query p99 (ms) | Texts/s | Speedup | "
+          f"Min cos vs {results[0]['backend']} | Mean cos")
+    print("-" * 105)
+    for r in results:
+        print(f"{r['backend']:9s} | {r['load_time']:8.2f} | {r['query_p50_ms']:14.2f} | {r['query_p99_ms']:14.2f} | "
+              f"{r['texts_per_second']:7.1f} | {r['texts_per_second'] / results[0]['texts_per_second']:6.2f}x | "
+              f"{r['min_cosine']:17.4f} | {r['mean_cosine']:8.4f}")
+    print("\nThe first ONNX run exports (and quantizes) the model; its load time includes that.")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"model": args.model, "batch_size": args.batch_size, "processes": args.processes,
+                       "results": results}, f, indent=2, default=float)
+        print(f"\nResults written to {args.output}")
@@ -0,0 +1,71 @@
+import time
+import sys
+import os
+import argparse
+import numpy as np
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.vector_store import LocalVectorStore
+
+MODES = ["float32", "float16", "int8", "pq"]
+
+def generate_vectors(count: int, dimension: int = 384, clusters: int = 50, seed: int = 0) -> np.ndarray:
+    """Generate clustered unit vectors that mimic sentence embeddings"""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dimension))
+    data = centers[rng.integers(0, clusters, size=count)] + 0.6 * rng.normal(size=(count, dimension))
+    return (data / np.linalg.norm(data, axis=1, keepdims=True)).astype(np.float32)
+
+def recall_at_k(store: LocalVectorStore, queries: np.ndarray, exact: np.ndarray, k: int, rescore: bool) -> float:
+    hits = 0
+    for query, expected in zip(queries, exact):
+        found = {int(result["id"]) for result in store.search(query, k=k, rescore=rescore)}
+        hits += len(found & set(expected.tolist()))
+    return hits / (len(queries) * k)
+
+def benchmark_mode(mode: str, vectors: np.ndarray, queries: np.ndarray, exact: np.ndarray, k: int) -> dict:
+    """Build a store for one quantization mode and measure memory, recall and latency"""
+    store = LocalVectorStore(dimension=vectors.shape[1], quantization=mode)
+
+    start = time.perf_counter()
+    store.add([str(i) for i in range(len(vectors))], vectors)
+    build_time = time.perf_counter() - start
+
+    results = {
+        "mode": mode,
+        "build_time": build_time,
+        "code_bytes": store.encoded.nbytes,
+        "bytes_per_vector": store.encoded.nbytes / len(vectors),
+    }
+    for rescore in (False, True):
+        latencies = []
+        for query in queries:
+            start = time.perf_counter()
+            store.search(query, k=k, rescore=rescore)
+            latencies.append(time.perf_counter() - start)
+        suffix = "rescored" if rescore else "approx"
+        results[f"recall_{suffix}"] = recall_at_k(store, queries, exact, k, rescore)
+        results[f"p50_ms_{suffix}"] = np.percentile(latencies, 50) * 1000
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare vector quantization modes")
+    parser.add_argument("--vectors", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    vectors = generate_vectors(args.vectors)
+    queries = generate_vectors(args.queries, seed=1)
+    exact = np.argsort(-(queries @ vectors.T), axis=1)[:, :args.k]
+
+    print(f"Benchmarking {len(vectors)} vectors, {len(queries)} queries, recall@{args.k}")
+    results = [benchmark_mode(mode, vectors, queries, exact, args.k) for mode in MODES]
+
+    print("\nMode    | Bytes/vec | Codes (MB) | Build (s) | Recall approx | Recall rescored | p50 approx (ms) | p50 rescored (ms)")
+    print("-" * 115)
+    for r in results:
+        print(f"{r['mode']:7s} | {r['bytes_per_vector']:9.0f} | {r['code_bytes'] / 1e6:10.2f} | "
+              f"{r['build_time']:9.2f} | {r['recall_approx']:13.3f} | {r['recall_rescored']:15.3f} | "
+              f"{r['p50_ms_approx']:15.2f} | {r['p50_ms_rescored']:17.2f}")
+    print("\nRescoring keeps a float32 copy for the top candidates; memory above counts the compact codes only.")
@@ -0,0 +1,112 @@
+"""
+Real-time factor and word error rate of the transcription tiers.
+
+Runs each tier (or model size) on an audio sample with a reference transcript.
+The default sample is the JFK clip from the openai/whisper test suite,
+downloaded to benchmarks/samples/ on first run; pass --audio/--reference to
+use your own.
+
+    python benchmarks/benchmark_transcription.py --backend openai faster-whisper
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+import urllib.request
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pydub import AudioSegment
+from app.services.transcription import TranscriptionService, TRANSCRIPTION_TIERS
+
+SAMPLES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "samples")
+DEFAULT_AUDIO = os.path.join(SAMPLES_DIR, "jfk.flac")
+DEFAULT_REFERENCE = os.path.join(SAMPLES_DIR, "jfk.txt")
+DEFAULT_AUDIO_URL = "https://github.com/openai/whisper/raw/main/tests/jfk.flac"
+
+def normalize(text: str) -> list:
+    """Lowercase words without punctuation, the usual WER normalization"""
+    return re.sub(r"[^\w\s']", " ", text.lower()).split()
+
+def word_error_rate(reference: str, hypothesis: str) -> float:
+    """(substitutions + deletions + insertions) / reference words, via edit distance"""
+    ref, hyp = normalize(reference), normalize(hypothesis)
+    previous = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, 1):
+        current = [i] + [0] * len(hyp)
+        for j, hyp_word in enumerate(hyp, 1):
+            current[j] = min(
+                previous[j] + 1,                            # deletion
+                current[j - 1] + 1,                         # insertion
+                previous[j - 1] + (ref_word != hyp_word)    # substitution
+            )
+        previous = current
+    return previous[-1] / max(len(ref), 1)
+
+def ensure_sample(audio_path: str):
+    if audio_path == DEFAULT_AUDIO and not os.path.exists(audio_path):
+        print(f"Downloading sample audio from {DEFAULT_AUDIO_URL}...")
+        os.makedirs(SAMPLES_DIR, exist_ok=True)
+        urllib.request.urlretrieve(DEFAULT_AUDIO_URL, audio_path)
+
+def benchmark_tier(backend: str, tier: str, audio_path: str, reference: str,
+                   duration: float, runs: int) -> dict:
+    model_size, options = TRANSCRIPTION_TIERS[tier]
+    service = TranscriptionService(backend=backend, model_size=model_size)
+
+    # Warm-up run (also excluded: model load time)
+    service.transcribe_audio(audio_path, options=options)
+
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        segments = service.transcribe_audio(audio_path, options=options)
+        timings.append(time.perf_counter() - start)
+
+    hypothesis = " ".join(text for text, _, _ in segments)
+    best = min(timings)
+    return {
+        "backend": backend,
+        "tier": tier,
+        "model_size": model_size,
+        "beam_size": options.beam_size,
+        "seconds": best,
+        "rtf": best / duration,
+        "wer": word_error_rate(reference, hypothesis),
+        "hypothesis": hypothesis,
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Transcription RTF/WER benchmark")
+    parser.add_argument("--audio", default=DEFAULT_AUDIO)
+    parser.add_argument("--reference", default=DEFAULT_REFERENCE, help="Text file with the reference transcript")
+    parser.add_argument("--backend", nargs="+", default=["openai"], choices=TranscriptionService.BACKENDS)
+    parser.add_argument("--tier", nargs="+", default=list(TRANSCRIPTION_TIERS), choices=list(TRANSCRIPTION_TIERS))
+    parser.add_argument("--runs", type=int, default=3, help="Timed runs per tier; the fastest is reported")
+    parser.add_argument("--output", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    ensure_sample(args.audio)
+    with open(args.reference) as f:
+        reference = f.read().strip()
+    duration = AudioSegment.from_file(args.audio).duration_seconds
+    print(f"Sample: {args.audio} ({duration:.1f}s)")
+
+    results = []
+    for backend in args.backend:
+        for tier in args.tier:
+            print(f"Running {backend}/{tier}...")
+            results.append(benchmark_tier(backend, tier, args.audio, reference, duration, args.runs))
+
+    print("\nBackend          | Tier     | Model | Beam | Time (s) | RTF    | WER")
+    print("-" * 72)
+    for result in results:
+        print(f"{result['backend']:16} | {result['tier']:8} | {result['model_size']:5} | "
+              f"{result['beam_size'] or 'greedy':>4} | {result['seconds']:8.2f} | "
+              f"{result['rtf']:6.3f} | {result['wer']:.1%}")
+    print("\nRTF < 1 is faster than real time.")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,118 @@
+import os
+import shutil
+import wave
+import numpy as np
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.core.config import settings
+from app.models import Base
+from app.models.media import Media
+from app.services.audio_storage import AudioStorageService, audio_format
+from app.services.media_processor import MediaProcessor
+
+needs_ffmpeg = pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg is not installed")
+
+def write_wav(path, seconds=2.0, rate=44100, channels=1):
+    samples = (np.sin(np.arange(int(seconds * rate)) * 0.05) * 10000).astype(np.int16)
+    with wave.open(str(path), "wb") as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(np.repeat(samples, channels).tobytes())
+    return str(path)
+
+@pytest.fixture
+def upload_folder(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "UPLOAD_FOLDER", str(tmp_path))
+    return tmp_path
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    Base.metadata.create_all(engine)
+    yield sessionmaker(bind=engine, expire_on_commit=False)
+    engine.dispose()
+
+def add_media(session_factory, file_path, audio_path):
+    with session_factory() as db:
+        media = Media(filename=os.path.basename(file_path), file_path=file_path, audio_path=audio_path)
+        db.add(media)
+        db.commit()
+        return media.id
+
+def audio_paths(session_factory):
+    with session_factory() as db:
+        return [media.audio_path for media in db.query(Media).order_by(Media.id)]
+
+def test_wav_storage_keeps_mono_uploads(upload_folder, monkeypatch):
+    monkeypatch.setattr(settings, "AUDIO_STORAGE_FORMAT", "wav")
+    mono = write_wav(upload_folder / "mono.wav")
+    assert MediaProcessor.extract_audio(mono) == mono
+    assert MediaProcessor.decode_wav(mono) == mono
+    assert MediaProcessor.audio_duration(mono) == pytest.approx(2.0)
+
+@needs_ffmpeg
+@pytest.mark.parametrize("storage_format", ["flac", "opus"])
+def test_compressed_storage_decodes_for_transcription(upload_folder, monkeypatch, storage_format):
+    monkeypatch.setattr(settings, "AUDIO_STORAGE_FORMAT", storage_format)
+    source = write_wav(upload_folder / "talk.mp3", seconds=3.0, channels=2)
+    audio_path = MediaProcessor.extract_audio(source)
+    assert audio_path.endswith(f".{storage_format}")
+    assert MediaProcessor.audio_duration(audio_path) == pytest.approx(3.0, abs=0.1)
+
+    wav_path = MediaProcessor.decode_wav(audio_path)
+    assert wav_path.endswith(".decoded.wav")
+    with wave.open(wav_path) as wav:
+        assert (wav.getnchannels(), wav.getframerate()) == (1, settings.AUDIO_SAMPLE_RATE)
+    if storage_format == "flac":
+        assert os.path.getsize(audio_path) < os.path.getsize(source)
+
+def test_report(upload_folder, session_factory):
+    video = upload_folder / "a.mp4"
+    video.write_bytes(b"\0" * 1000)
+    audio = write_wav(upload_folder / "a.wav", seconds=1.0)
+    mono = write_wav(upload_folder / "b.wav", seconds=1.0)
+    rows = [(1, "a.mp4", str(video), audio), (2, "b.wav", mono, mono), (3, "c.mp4", "gone.mp4", None)]
+
+    report = AudioStorageService(session_factory).report(rows, skip=1, limit=5, update_metrics=False)
+    assert report["media_count"] == 3
+    assert report["original_bytes"] == 1000 + os.path.getsize(mono)
+    assert report["audio_bytes"] == os.path.getsize(audio)  # b's audio is its upload
+    assert [media["id"] for media in report["media"]] == [2, 3]
+    assert [media["audio_format"] for media in report["media"]] == ["wav", None]
+
+def test_compaction_drops_audio(upload_folder, session_factory):
+    video = upload_folder / "a.mp4"
+    video.write_bytes(b"video")
+    audio = write_wav(upload_folder / "a.wav")
+    mono = write_wav(upload_folder / "b.wav")
+    add_media(session_factory, str(video), audio)
+    add_media(session_factory, mono, mono)
+    add_media(session_factory, str(video), str(upload_folder / "missing.wav"))
+    audio_bytes = os.path.getsize(audio)
+
+    status = AudioStorageService(session_factory).compact(keep=False, batch_size=2)
+    assert status["state"] == "completed"
+    assert (status["dropped"], status["missing"], status["failed"]) == (2, 1, 0)
+    assert status["bytes_after"] == 0 and status["bytes_before"] == audio_bytes
+    assert audio_paths(session_factory) == [None, None, None]
+    assert not os.path.exists(audio)
+    assert os.path.isfile(mono)  # The upload itself is never deleted
+
+@needs_ffmpeg
+def test_compaction_reencodes_wav(upload_folder, session_factory):
+    video = upload_folder / "a.mp4"
+    video.write_bytes(b"video")
+    audio = write_wav(upload_folder / "a.wav", seconds=5.0)
+    add_media(session_factory, str(video), audio)
+
+    status = AudioStorageService(session_factory).compact(storage_format="flac", keep=True)
+    assert status["converted"] == 1
+    assert status["bytes_after"] < status["bytes_before"]
+    [flac] = audio_paths(session_factory)
+    assert flac == str(upload_folder / "a.flac") and audio_format(flac) == "flac"
+    assert os.path.isfile(flac) and not os.path.exists(audio)
+
+    # Already compacted media are left alone
+    assert AudioStorageService(session_factory).compact(storage_format="flac", keep=True)["skipped"] == 1
@@ -0,0 +1,47 @@
+import pytest
+from app.core.config import settings
+from app.services.checkpoints import TranscriptionCheckpoint
+from app.services.transcription import window_bounds
+
+@pytest.fixture
+def media_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "CHECKPOINT_DIR", str(tmp_path / "checkpoints"))
+    path = tmp_path / "lecture.wav"
+    path.write_bytes(b"RIFF" + bytes(range(256)) * 16)
+    return str(path)
+
+def test_checkpoint_resumes_completed_windows(media_file):
+    checkpoint = TranscriptionCheckpoint.open(media_file, model_size="base", window_seconds=600)
+    checkpoint.attach_media(7)
+    checkpoint.record_window(0, [("Hello.", 0.0, 2.0)])
+    checkpoint.mark_indexed(0)
+    checkpoint.record_window(1, [("Later.", 601.0, 603.0)])
+
+    # A restarted job with the same file and parameters picks up the saved state
+    resumed = TranscriptionCheckpoint.open(media_file, model_size="base", window_seconds=600)
+    assert resumed.media_id == 7
+    assert resumed.segments(0) == [("Hello.", 0.0, 2.0)]
+    assert resumed.is_indexed(0) and not resumed.is_indexed(1)
+    assert resumed.segments(2) is None
+
+    # Different parameters never reuse another run's transcripts
+    other = TranscriptionCheckpoint.open(media_file, model_size="small", window_seconds=600)
+    assert other.windows == {}
+
+def test_attach_new_media_requires_reindexing(media_file):
+    checkpoint = TranscriptionCheckpoint.open(media_file, window_seconds=600)
+    checkpoint.attach_media(1)
+    checkpoint.record_window(0, [("Hello.", 0.0, 2.0)])
+    checkpoint.mark_indexed(0)
+
+    checkpoint.attach_media(2)  # e.g. the partial media was deleted
+    assert checkpoint.segments(0) == [("Hello.", 0.0, 2.0)]
+    assert not checkpoint.is_indexed(0)
+
+    checkpoint.discard()
+    assert TranscriptionCheckpoint.open(media_file, window_seconds=600).windows == {}
+
+def test_window_bounds():
+    assert window_bounds(0, 600) == []
+    assert window_bounds(90, 600) == [(0, 90)]
+    assert window_bounds(1300, 600) == [(0, 600), (600, 1200), (1200, 1300)]
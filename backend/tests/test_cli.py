@@ -0,0 +1,49 @@
+import os
+import subprocess
+import sys
+from app.cli import IngestManifest, find_media, upload_path, place_upload
+from app.core.config import settings
+
+def test_find_media(tmp_path):
+    for path in ["b/talk.mp4", "a/talk.MP3", "c.wav", "notes.txt", ".cache/d.wav"]:
+        os.makedirs(tmp_path / os.path.dirname(path), exist_ok=True)
+        (tmp_path / path).write_bytes(b"media")
+    assert find_media(str(tmp_path)) == [os.path.join("a", "talk.MP3"), os.path.join("b", "talk.mp4"), "c.wav"]
+
+def test_upload_paths_dont_collide(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "UPLOAD_FOLDER", str(tmp_path / "uploads"))
+    first, second = upload_path(os.path.join("a", "talk.mp4")), upload_path(os.path.join("b", "talk.mp4"))
+    assert first != second and os.path.dirname(first) == settings.UPLOAD_FOLDER
+
+    source = tmp_path / "talk.mp4"
+    source.write_bytes(b"media")
+    place_upload(str(source), first)
+    place_upload(str(source), first)  # Placing again replaces the earlier copy
+    os.remove(first)
+    assert source.read_bytes() == b"media"  # The archive is untouched
+
+def test_manifest_resume(tmp_path):
+    media = tmp_path / "talk.mp4"
+    media.write_bytes(b"media")
+    stat = os.stat(media)
+    manifest = IngestManifest(str(tmp_path / "manifest.jsonl"))
+    manifest.record({"path": "talk.mp4", "size": stat.st_size, "mtime": stat.st_mtime, "status": "failed"})
+    manifest.record({"path": "talk.mp4", "size": stat.st_size, "mtime": stat.st_mtime, "status": "done", "media_id": 3})
+    with open(manifest.path, "a") as f:
+        f.write('{"path": "torn')  # A run killed mid-write
+
+    reloaded = IngestManifest(manifest.path)
+    assert reloaded.is_done("talk.mp4", stat)
+    assert reloaded.entries["talk.mp4"]["media_id"] == 3
+    assert not reloaded.is_done("other.mp4", stat)
+
+    # A changed file is ingested again
+    media.write_bytes(b"new media")
+    assert not reloaded.is_done("talk.mp4", os.stat(media))
+
+def test_importing_the_cli_leaves_the_pipeline_unloaded():
+    # Spawned workers import app.cli before _init_worker adjusts the settings
+    code = "import sys, app.cli; print(sorted(name for name in sys.modules if name.startswith('app.services')))"
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))).stdout
+    assert output.strip() == "[]"
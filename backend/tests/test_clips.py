@@ -0,0 +1,119 @@
+import os
+import shutil
+import subprocess
+import pytest
+from app.services.clips import ClipService, merge_spans, snap_to_keyframes
+
+def test_merge_spans():
+    assert merge_spans([(30, 40), (0, 10), (8, 12)]) == [(0, 12), (30, 40)]
+    assert merge_spans([(0, 10), (11, 20)], gap=2) == [(0, 20)]
+    assert merge_spans([(0, 10), (13, 20)], gap=2) == [(0, 10), (13, 20)]
+
+def test_snap_to_keyframes():
+    keyframes = [0.0, 4.0, 8.0, 12.0]
+    assert snap_to_keyframes([(5.5, 7), (12, 14)], keyframes) == [(4.0, 7), (12.0, 14)]
+    # Audio has no keyframes to snap to
+    assert snap_to_keyframes([(5.5, 7)], []) == [(5.5, 7)]
+
+@pytest.fixture
+def fake_ffmpeg(monkeypatch):
+    """Cuts write one byte per second of clip, so sizes are predictable"""
+    cuts = []
+    def cut(self, path, span, output):
+        cuts.append(span)
+        with open(output, "wb") as f:
+            f.write(b"\0" * int(span[1] - span[0]))
+    def concat(self, parts, output):
+        with open(output, "wb") as f:
+            for part in parts:
+                with open(part, "rb") as p:
+                    f.write(p.read())
+    monkeypatch.setattr(ClipService, "keyframes", lambda self, path, spans: [0.0, 10.0, 20.0])
+    monkeypatch.setattr(ClipService, "_cut", cut)
+    monkeypatch.setattr(ClipService, "_concat", concat)
+    return cuts
+
+def test_clips_are_snapped_concatenated_and_cached(tmp_path, fake_ffmpeg):
+    source = tmp_path / "video.mp4"
+    source.write_bytes(b"video")
+    service = ClipService(cache_dir=str(tmp_path / "clips"), max_bytes=1000, merge_gap=0)
+
+    clip = service.extract(str(source), [(25, 30), (12, 15)])
+    assert fake_ffmpeg == [(10.0, 15), (20.0, 30)]
+    assert os.path.getsize(clip) == 15
+    assert clip.endswith(".mp4")
+
+    assert service.extract(str(source), [(12, 15), (25, 30)]) == clip
+    assert len(fake_ffmpeg) == 2  # Served from the cache
+
+    # Spans whose snapped cuts overlap become one cut
+    service.extract(str(source), [(12, 15), (18, 22)])
+    assert fake_ffmpeg[2:] == [(10.0, 22)]
+
+def test_cache_evicts_least_recently_used(tmp_path, fake_ffmpeg):
+    source = tmp_path / "video.mp4"
+    source.write_bytes(b"video")
+    service = ClipService(cache_dir=str(tmp_path / "clips"), max_bytes=25, merge_gap=0, grace_seconds=0)
+
+    first = service.extract(str(source), [(0, 10)])
+    second = service.extract(str(source), [(10, 20)])
+    os.utime(first, (1, 1))
+    os.utime(second, (2, 2))
+    service.extract(str(source), [(0, 10)])  # A hit makes first the most recent
+    third = service.extract(str(source), [(20, 30)])
+
+    assert os.path.isfile(first) and os.path.isfile(third)
+    assert not os.path.exists(second)
+    assert [entry.is_file() for entry in os.scandir(service.cache_dir)] == [True, True]
+
+def test_recently_served_clips_are_not_evicted(tmp_path, fake_ffmpeg):
+    source = tmp_path / "video.mp4"
+    source.write_bytes(b"video")
+    service = ClipService(cache_dir=str(tmp_path / "clips"), max_bytes=15, merge_gap=0, grace_seconds=60)
+
+    first = service.extract(str(source), [(0, 10)])
+    second = service.extract(str(source), [(10, 20)])
+    # first may still be about to be streamed; the cache runs over budget instead
+    assert os.path.isfile(first) and os.path.isfile(second)
+
+    assert service.extract(str(source), [(0, 10)]) == first
+    assert service._building == {}  # Build locks don't outlive the request
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg is not installed")
+def test_stream_copy_clip(tmp_path):
+    source = tmp_path / "video.mp4"
+    subprocess.run([
+        "ffmpeg", "-v", "error", "-f", "lavfi", "-i", "testsrc=duration=20:size=160x120:rate=10",
+        "-f", "lavfi", "-i", "sine=duration=20", "-g", "50", "-c:v", "libx264", "-c:a", "aac",
+        "-shortest", str(source)
+    ], check=True)
+    service = ClipService(cache_dir=str(tmp_path / "clips"), merge_gap=0)
+
+    assert service.keyframes(str(source), [(7, 9), (16, 18)]) == [5.0, 15.0]
+    clip = service.extract(str(source), [(7, 9), (16, 18)])
+    duration = float(subprocess.run(
+        ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "csv=p=0", clip],
+        check=True, capture_output=True, text=True
+    ).stdout)
+    # 5-9 and 15-18, cut on keyframes
+    assert duration == pytest.approx(7, abs=0.5)
+
+def test_cache_hits_keep_the_clip_validators(tmp_path, fake_ffmpeg):
+    from fastapi import FastAPI, Request
+    from fastapi.testclient import TestClient
+    from app.services.streaming import stream_file
+
+    source = tmp_path / "video.mp4"
+    source.write_bytes(b"video")
+    service = ClipService(cache_dir=str(tmp_path / "clips"), merge_gap=0)
+    app = FastAPI()
+
+    @app.get("/clip")
+    async def clip(request: Request):
+        return stream_file(service.extract(str(source), [(0, 10)]), request.headers)
+
+    client = TestClient(app)
+    etag = client.get("/clip").headers["etag"]
+    assert client.get("/clip", headers={"If-None-Match": etag}).status_code == 304
+    assert client.get("/clip", headers={"Range": "bytes=0-3", "If-Range": etag}).status_code == 206
+    assert client.get("/clip").headers["etag"] == etag
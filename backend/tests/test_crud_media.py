@@ -0,0 +1,132 @@
+import asyncio
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from app.db.session import create_async_db_engine
+from app.crud import async_crud_media
+from app.models import Base
+from app.schemas.media import MediaCreate, MediaInDB
+
+@pytest.fixture
+def session_factory(tmp_path):
+    db_engine = create_async_db_engine(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}")
+
+    async def create_tables():
+        async with db_engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+
+    asyncio.run(create_tables())
+    yield async_sessionmaker(bind=db_engine, expire_on_commit=False)
+    asyncio.run(db_engine.dispose())
+
+@pytest.fixture
+def media_create():
+    return MediaCreate(filename="lecture.mp4", file_path="uploads/lecture.mp4", audio_path="uploads/lecture.wav")
+
+def test_async_create_with_transcription(session_factory, media_create):
+    segments = [("Hello there.", 0.0, 2.5), ("Welcome to the lecture.", 2.5, 6.0)]
+    chunks = [{"text": "Hello there. Welcome to the lecture.", "start_time": 0.0, "end_time": 6.0}]
+
+    async def run():
+        async with session_factory() as db:
+            created = await async_crud_media.create_with_transcription(
+                db, media=media_create, segments=segments, chunks=chunks
+            )
+        async with session_factory() as db:
+            return created, await async_crud_media.get_with_relations(db, created.id)
+
+    created, fetched = asyncio.run(run())
+    media = MediaInDB.model_validate(fetched)
+
+    assert media.id == created.id
+    assert [s.text for s in media.transcription.segments] == ["Hello there.", "Welcome to the lecture."]
+    assert len(media.chunks) == 1
+    assert media.chunks[0].end_time == 6.0
+
+def test_async_get_multi_and_remove(session_factory, media_create):
+    async def run():
+        async with session_factory() as db:
+            for _ in range(3):
+                await async_crud_media.create_with_transcription(
+                    db, media=media_create, segments=[], chunks=[]
+                )
+            listed = await async_crud_media.get_multi(db, skip=1, limit=5)
+            removed = await async_crud_media.remove(db, id=listed[0].id)
+            missing = await async_crud_media.remove(db, id=999)
+            remaining = await async_crud_media.get_multi(db)
+            return listed, removed, missing, remaining
+
+    listed, removed, missing, remaining = asyncio.run(run())
+
+    assert len(listed) == 2
+    assert removed.id == listed[0].id
+    assert missing is None
+    assert len(remaining) == 2
+
+def test_async_remove_many_cascades(session_factory, media_create):
+    segments = [("Hello there.", 0.0, 2.5)]
+    chunks = [{"text": "Hello there.", "start_time": 0.0, "end_time": 2.5}]
+
+    async def run():
+        async with session_factory() as db:
+            created = [
+                await async_crud_media.create_with_transcription(
+                    db, media=media_create, segments=segments, chunks=chunks
+                )
+                for _ in range(3)
+            ]
+            removed = await async_crud_media.remove_many(db, ids=[created[0].id, created[2].id, 999])
+        async with session_factory() as db:
+            counts = {}
+            for table in ("media", "transcriptions", "transcription_segments", "chunks"):
+                result = await db.execute(text(f"SELECT COUNT(*) FROM {table}"))
+                counts[table] = result.scalar()
+            return created, removed, counts
+
+    created, removed, counts = asyncio.run(run())
+
+    assert sorted(row[0] for row in removed) == [created[0].id, created[2].id]
+    assert removed[0][1] == "uploads/lecture.mp4"
+    assert counts == {"media": 1, "transcriptions": 1, "transcription_segments": 1, "chunks": 1}
+
+def test_async_replace_window_is_idempotent(session_factory, media_create):
+    first = [("Window one.", 0.0, 5.0)]
+    second = [("Window two.", 600.0, 604.0), ("Still two.", 604.0, 610.0)]
+
+    async def run():
+        async with session_factory() as db:
+            media = await async_crud_media.create_with_transcription(
+                db, media=media_create, segments=[], chunks=[]
+            )
+            media_id = media.id
+            for segments, start, end in ((first, 0.0, 600.0), (second, 600.0, float("inf")), (second, 600.0, float("inf"))):
+                await async_crud_media.replace_window(
+                    db, media_id=media_id, start_time=start, end_time=end, segments=segments,
+                    chunks=[{"text": " ".join(s[0] for s in segments), "start_time": segments[0][1], "end_time": segments[-1][2]}]
+                )
+            return await async_crud_media.get_with_relations(db, media_id)
+
+    media = MediaInDB.model_validate(asyncio.run(run()))
+    assert [s.text for s in media.transcription.segments] == ["Window one.", "Window two.", "Still two."]
+    assert sorted(chunk.start_time for chunk in media.chunks) == [0.0, 600.0]
+
+def test_fingerprint_index_round_trip(session_factory, media_create):
+    async def run():
+        async with session_factory() as db:
+            media = await async_crud_media.create_with_transcription(
+                db, media=media_create, segments=[("Later.", 5.0, 8.0), ("Hello.", 0.0, 2.0)], chunks=[]
+            )
+            await async_crud_media.replace_fingerprint(db, media_id=media.id, hashes=[11, 12, 13], frames=[0, 4, 9])
+            await async_crud_media.replace_fingerprint(db, media_id=media.id, hashes=[12, 14], frames=[3, 20])
+            rows = await async_crud_media.find_fingerprint_hashes(db, [12, 13, 99])
+            extent = await async_crud_media.fingerprint_extent(db, media.id)
+            segments = await async_crud_media.get_segments(db, media.id)
+            await async_crud_media.remove_many(db, ids=[media.id])
+            remaining = await async_crud_media.find_fingerprint_hashes(db, [12, 14])
+        return media.id, rows, extent, segments, remaining
+
+    media_id, rows, extent, segments, remaining = asyncio.run(run())
+    assert rows == [(12, media_id, 3)]
+    assert extent == 20
+    assert segments == [("Hello.", 0.0, 2.0), ("Later.", 5.0, 8.0)]
+    assert remaining == []
@@ -0,0 +1,86 @@
+import pytest
+from app.core.config import settings
+from app.services.dedup import NearDuplicateDetector, encode_signature, decode_signature
+from app.services.embedding import HashingEncoder
+from app.services.opensearch_service import OpenSearchService
+
+INTRO = ("Welcome back everyone to the machine learning lecture series. As always, please mute "
+         "your microphones, the slides are on the course website and questions go in the chat. "
+         "Today we continue with gradient descent, learning rates and how to pick them in practice")
+OTHER = "Coral reefs are bleaching because ocean temperatures keep rising, and recovery takes decades"
+
+@pytest.fixture
+def detector():
+    return NearDuplicateDetector(num_perm=64, bands=16, shingle_size=3, threshold=0.8)
+
+def test_signatures_estimate_similarity(detector):
+    intro = detector.signature(INTRO)
+    edited = detector.signature(INTRO.replace("in practice", "in real projects"))
+    assert detector.similarity(intro, detector.signature(INTRO.upper())) == 1.0
+    assert detector.similarity(intro, edited) >= 0.8
+    assert detector.similarity(intro, detector.signature(OTHER)) < 0.2
+    assert set(detector.band_keys(intro)) & set(detector.band_keys(edited))
+    assert detector.signature("...") is None
+    assert (decode_signature(encode_signature(intro)) == intro).all()
+
+def test_within_points_duplicates_at_the_first_copy(detector):
+    signatures = [detector.signature(text) for text in (INTRO, OTHER, INTRO, "", INTRO + " again")]
+    assert detector.within(signatures) == [None, None, 0, None, 0]
+
+def test_collapse_folds_near_duplicate_hits(detector):
+    hits = [
+        {"text": INTRO, "media_id": "1", "start_time": 0.0, "end_time": 30.0, "score": 0.9},
+        {"text": OTHER, "media_id": "2", "start_time": 0.0, "end_time": 10.0, "score": 0.8},
+        {"text": INTRO, "media_id": "3", "start_time": 5.0, "end_time": 35.0, "score": 0.7,
+         "duplicates": [{"media_id": "4", "start_time": 0.0, "end_time": 30.0}]},
+    ]
+    collapsed = detector.collapse(hits)
+    assert [hit["media_id"] for hit in collapsed] == ["1", "2"]
+    assert [dup["media_id"] for dup in collapsed[0]["duplicates"]] == ["3", "4"]
+
+def test_duplicates_reuse_the_indexed_vector(monkeypatch):
+    monkeypatch.setattr(settings, "OPENSEARCH_BACKEND", "local")
+    service = OpenSearchService()
+    encoder = HashingEncoder()
+    from app.services.dedup import dedup_service
+    signature = dedup_service.signature(INTRO)
+
+    service.index_chunk(0, media_id=1, text=INTRO, start_time=0.0, end_time=30.0,
+                        vector=encoder.encode(INTRO), signature=signature)
+    service.index_chunk(1, media_id=1, text=OTHER, start_time=30.0, end_time=40.0,
+                        vector=encoder.encode(OTHER), signature=dedup_service.signature(OTHER))
+    original, = service.find_duplicates([signature])
+    assert original == {"id": "1_0", "media_id": "1"}
+    assert service.find_duplicates([signature], exclude_ids=frozenset({"1_0"})) == [None]
+    assert service.find_duplicates([signature], collection_id="other") == [None]
+
+    for media_id in (2, 3):
+        service.index_duplicate(0, media_id=media_id, text=INTRO, start_time=60.0, end_time=90.0,
+                                duplicate_of=original)
+    results = service.search_similar(encoder.encode(INTRO), INTRO, k=5)
+    assert [result["media_id"] for result in results] == ["1", "1"]
+    assert sorted(dup["media_id"] for dup in results[0]["duplicates"]) == ["2", "3"]
+
+    # Deleting the original hands its vector to the first duplicate
+    service.delete_by_media_ids([1])
+    results = service.search_similar(encoder.encode(INTRO), INTRO, k=5)
+    assert len(results) == 1
+    assert results[0]["media_id"] in ("2", "3")
+    assert [dup["media_id"] for dup in results[0]["duplicates"]] == [{"2": "3", "3": "2"}[results[0]["media_id"]]]
+
+def test_promotion_rewrites_every_duplicate(monkeypatch):
+    monkeypatch.setattr(settings, "OPENSEARCH_BACKEND", "local")
+    service = OpenSearchService()
+    encoder = HashingEncoder()
+    service.index_chunk(0, media_id=1, text=INTRO, start_time=0.0, end_time=30.0, vector=encoder.encode(INTRO))
+    for media_id in range(2, 32):
+        service.index_duplicate(0, media_id=media_id, text=INTRO, start_time=0.0, end_time=30.0,
+                                duplicate_of={"id": "1_0", "media_id": "1"})
+
+    # Pages smaller than the number of duplicates
+    service._promote_duplicates(service.search_aliases(), ["1"], ["1"], batch_size=4)
+    docs = service.client.search(index=service.index_name, body={"size": 100})["hits"]["hits"]
+    promoted = [doc for doc in docs if "duplicate_of" not in doc["_source"] and doc["_id"] != "1_0"]
+    assert len(promoted) == 1
+    pointers = {doc["_source"].get("duplicate_of") for doc in docs if doc["_id"] not in ("1_0", promoted[0]["_id"])}
+    assert pointers == {promoted[0]["_id"]}
@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+from app.services.embedding import EmbeddingService, mean_pool
+
+SENTENCES = [
+    "The Renaissance period in Italy marked a dramatic cultural shift",
+    "Quantum mechanics introduced wave-particle duality",
+    "Coral reefs are bleaching due to rising ocean temperatures",
+    "short",
+    "A much longer sentence about training machine learning models on large datasets, "
+    "tuning their hyperparameters and evaluating them on held-out data before deployment",
+]
+
+def test_mean_pool_ignores_padding():
+    token_embeddings = np.array([[[1.0, 2.0], [3.0, 4.0], [100.0, 100.0]]], dtype=np.float32)
+    attention_mask = np.array([[1, 1, 0]])
+    np.testing.assert_allclose(mean_pool(token_embeddings, attention_mask), [[2.0, 3.0]])
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        EmbeddingService(model_name="hashing", backend="tensorrt")
+
+@pytest.mark.parametrize("backend,min_similarity", [("onnx", 0.999), ("onnx-int8", 0.97)])
+def test_onnx_backends_match_torch(backend, min_similarity):
+    pytest.importorskip("onnxruntime")
+    pytest.importorskip("transformers")
+    pytest.importorskip("torch")
+    reference = np.stack(EmbeddingService(backend="torch").generate_embeddings_batch(SENTENCES))
+    service = EmbeddingService(backend=backend)
+    candidate = np.stack(service.generate_embeddings_batch(SENTENCES))
+
+    # Both are unit-normalized, so the row-wise dot product is the cosine similarity
+    similarities = np.sum(reference * candidate, axis=1)
+    assert similarities.min() >= min_similarity
+    np.testing.assert_allclose(service.generate_embedding(SENTENCES[0]), candidate[0], atol=1e-5)
@@ -0,0 +1,50 @@
+import numpy as np
+from app.core.config import settings
+from app.services.embedding import EmbeddingService, HashingEncoder, parse_cpu_list
+
+TEXTS = [
+    "a much longer chunk of transcript text about several different topics at once",
+    "short",
+    "a medium length sentence here",
+    "tiny",
+    "another fairly long piece of text that should land in a later batch",
+]
+
+class RecordingEncoder(HashingEncoder):
+    def __init__(self):
+        super().__init__()
+        self.batches = []
+
+    def encode(self, text, **kwargs):
+        self.batches.append(list(text))
+        return super().encode(text, **kwargs)
+
+def test_batches_are_length_sorted_and_rows_keep_input_order():
+    service = EmbeddingService(model_name="hashing")
+    service.model = RecordingEncoder()
+    embeddings = service.generate_embeddings_batch(TEXTS, batch_size=2)
+
+    assert embeddings.dtype == np.float32
+    assert embeddings.shape == (len(TEXTS), settings.EMBEDDING_DIMENSION)
+    lengths = [[len(text) for text in batch] for batch in service.model.batches]
+    assert [length for batch in lengths for length in batch] == sorted(len(text) for text in TEXTS)
+    np.testing.assert_allclose(embeddings, HashingEncoder().encode(TEXTS), atol=1e-6)
+
+def test_empty_batch():
+    assert EmbeddingService(model_name="hashing").generate_embeddings_batch([]).shape == (0, settings.EMBEDDING_DIMENSION)
+
+def test_encode_pool_matches_in_process(monkeypatch):
+    monkeypatch.setattr(settings, "EMBEDDING_POOL_MIN_TEXTS", 1)
+    # Spawned workers import the services afresh; keep them off a real cluster
+    monkeypatch.setenv("OPENSEARCH_BACKEND", "local")
+    texts = [f"{' '.join(['word'] * (i % 17))} text number {i}" for i in range(300)]
+    service = EmbeddingService(model_name="hashing", processes=2)
+    try:
+        pooled = service.generate_embeddings_batch(texts, batch_size=8)
+    finally:
+        service.close()
+    np.testing.assert_allclose(pooled, HashingEncoder().encode(texts), atol=1e-6)
+
+def test_parse_cpu_list():
+    assert parse_cpu_list("0-3, 8,10-11") == [0, 1, 2, 3, 8, 10, 11]
+    assert parse_cpu_list("") == []
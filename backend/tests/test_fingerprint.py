@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+from app.services.fingerprint import AudioFingerprinter, align_segments
+
+SAMPLE_RATE = AudioFingerprinter.SAMPLE_RATE
+
+def recording(seconds: float, seed: int) -> np.ndarray:
+    """Random tone bursts: sparse, speech-like spectral peaks"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    samples = np.zeros_like(t)
+    for start in np.arange(0, seconds, 0.15):
+        burst = (t >= start) & (t < start + rng.uniform(0.05, 0.2))
+        samples[burst] += rng.uniform(0.1, 0.5) * np.sin(2 * np.pi * rng.uniform(150, 3500) * t[burst])
+    return samples.astype(np.float32)
+
+@pytest.fixture(scope="module")
+def indexed():
+    fingerprinter = AudioFingerprinter()
+    original = recording(180, seed=1)
+    return fingerprinter, original, fingerprinter.fingerprint(original)
+
+def lookup(fingerprinter, index, query, media_id=7):
+    # What the fingerprint table returns for the query's hashes
+    found = np.isin(index.hashes, query.hashes)
+    return fingerprinter.best_match(query, index.hashes[found], np.full(found.sum(), media_id), index.offsets[found])
+
+def test_trimmed_noisy_copy_matches_with_offset(indexed):
+    fingerprinter, original, index = indexed
+    trim = int(37.3 * SAMPLE_RATE)
+    copy = original[trim:trim + 90 * SAMPLE_RATE] * 0.7
+    copy = copy + np.random.default_rng(0).normal(0, 0.01, len(copy)).astype(np.float32)
+
+    query = fingerprinter.probe(fingerprinter.fingerprint(copy), 60)
+    assert query.duration == 60
+    match = lookup(fingerprinter, index, query)
+    assert match is not None and match.media_id == 7
+    assert match.offset == pytest.approx(37.3, abs=2 * fingerprinter.frame_seconds)
+
+def match_throughout(fingerprinter, index, upload, media_id=7):
+    probes = fingerprinter.probes(fingerprinter.fingerprint(upload), 60)
+    found = np.isin(index.hashes, np.concatenate([probe.hashes for probe in probes]))
+    return fingerprinter.match_throughout(probes, index.hashes[found], np.full(found.sum(), media_id),
+                                          index.offsets[found])
+
+def test_whole_copy_matches_throughout(indexed):
+    fingerprinter, original, index = indexed
+    trim = int(20.5 * SAMPLE_RATE)
+    match = match_throughout(fingerprinter, index, original[trim:trim + 150 * SAMPLE_RATE])
+    assert match is not None and match.offset == pytest.approx(20.5, abs=2 * fingerprinter.frame_seconds)
+
+def test_shared_intro_is_not_a_copy(indexed):
+    fingerprinter, original, index = indexed
+    # The same first minute, then a different recording
+    upload = np.concatenate([original[:60 * SAMPLE_RATE], recording(120, seed=3)])
+    assert lookup(fingerprinter, index, fingerprinter.probe(fingerprinter.fingerprint(upload), 60)) is not None
+    assert match_throughout(fingerprinter, index, upload) is None
+
+def test_probes_cover_start_middle_and_end():
+    fingerprinter = AudioFingerprinter()
+    fingerprint = fingerprinter.fingerprint(recording(200, seed=4))
+    probes = fingerprinter.probes(fingerprint, 60)
+    assert [probe.duration for probe in probes] == [60, 60, 60]
+    frames = [(probe.offsets.min() * fingerprinter.frame_seconds, probe.offsets.max() * fingerprinter.frame_seconds)
+              for probe in probes]
+    assert frames[0][0] < 1 and 70 <= frames[1][0] < 71 and frames[2][1] > 199
+    assert len(fingerprinter.probes(fingerprinter.fingerprint(recording(30, seed=4)), 60)) == 1
+
+def test_unrelated_audio_does_not_match(indexed):
+    fingerprinter, _, index = indexed
+    assert lookup(fingerprinter, index, fingerprinter.fingerprint(recording(60, seed=2))) is None
+
+def test_short_or_silent_audio_has_no_hashes():
+    fingerprinter = AudioFingerprinter()
+    assert len(fingerprinter.fingerprint(np.zeros(100, dtype=np.float32)).hashes) == 0
+    assert len(fingerprinter.fingerprint(np.zeros(SAMPLE_RATE * 5, dtype=np.float32)).hashes) == 0
+
+def test_align_segments_moves_onto_the_copy_timeline():
+    segments = [("intro", 0.0, 9.0), ("one", 10.0, 20.0), ("two", 20.0, 31.0), ("outro", 40.0, 50.0)]
+    assert align_segments(segments, offset=10.0, duration=20.5) == [("one", 0.0, 10.0), ("two", 10.0, 20.5)]
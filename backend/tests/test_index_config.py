@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+from app.services.opensearch_service import IndexConfig
+from app.core.config import settings
+
+def test_config_from_settings_with_overrides():
+    config = IndexConfig.from_settings(m=48, ef_search=None, unknown=1)
+    assert config.dimension == settings.EMBEDDING_DIMENSION
+    assert config.m == 48
+    assert config.ef_search == settings.OPENSEARCH_HNSW_EF_SEARCH
+
+@pytest.mark.parametrize("quantization,engine", [("float32", "nmslib"), ("float16", "faiss"), ("int8", "lucene")])
+def test_index_body_round_trip(quantization, engine):
+    config = IndexConfig.from_settings(engine="nmslib", space_type="innerproduct", m=16,
+                                       ef_construction=200, ef_search=64, quantization=quantization,
+                                       shards=3, byte_scale=400.0)
+    body = config.index_body()
+    vector_mapping = body["mappings"]["properties"]["my_vector"]
+
+    assert vector_mapping["method"]["engine"] == engine
+    assert vector_mapping["dimension"] == settings.EMBEDDING_DIMENSION
+    assert ("vector_fp" in body["mappings"]["properties"]) == (quantization != "float32")
+    assert body["settings"]["index"]["number_of_shards"] == 3
+
+    # Simulate what GET /<index> returns
+    index_info = {
+        "mappings": body["mappings"],
+        "settings": {"index": {"knn": "true", "number_of_shards": "3", "knn.algo_param": {"ef_search": "64"}}}
+    }
+    restored = IndexConfig.from_index(index_info)
+    assert restored.quantization == quantization
+    assert restored.effective_engine == engine
+    assert (restored.m, restored.ef_construction, restored.ef_search, restored.shards) == (16, 200, 64, 3)
+    assert restored.byte_scale == (400.0 if quantization == "int8" else 127.0)
+
+def test_pq_not_supported_by_opensearch():
+    with pytest.raises(ValueError):
+        IndexConfig.from_settings(quantization="pq").index_body()
+
+@pytest.mark.parametrize("space_type,engine,score_fn", [
+    ("l2", "nmslib", lambda cos: 1 / (1 + (2 - 2 * cos))),
+    ("cosinesimil", "nmslib", lambda cos: 1 / (2 - cos)),
+    ("cosinesimil", "lucene", lambda cos: (1 + cos) / 2),
+    ("innerproduct", "nmslib", lambda cos: cos + 1 if cos >= 0 else 1 / (1 - cos)),
+])
+def test_score_to_similarity(space_type, engine, score_fn):
+    config = IndexConfig.from_settings(space_type=space_type, engine=engine)
+    for cos in np.linspace(-0.9, 0.99, 7):
+        assert config.to_similarity(score_fn(cos)) == pytest.approx(cos)
+        assert config.to_score(cos) == pytest.approx(score_fn(cos))
+
+def test_reindex_rejects_unknown_parameters():
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from app.api.endpoints import index
+
+    app = FastAPI()
+    app.include_router(index.router)
+    client = TestClient(app)
+    for params in ({"engine": "annoy"}, {"space_type": "hamming"}, {"quantization": "pq"}):
+        response = client.post("/reindex", params=params)
+        assert response.status_code == 400
+        assert "Choose from" in response.json()["detail"]
@@ -0,0 +1,96 @@
+import asyncio
+import pytest
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from app.db.session import create_async_db_engine
+from app.crud import async_crud_media
+from app.models import Base
+from app.models.media import Chunk
+from app.schemas.media import MediaCreate
+from app.services.lexical_search import LexicalSearchService, fts_query, match_offsets
+
+LECTURES = {
+    "physics": [("Quantum mechanics describes particles.", 0.0, 4.0),
+                ("Quantum entanglement links distant particles.", 4.0, 9.0)],
+    "biology": [("Photosynthesis happens in the leaves.", 0.0, 5.0),
+                ("Particles of pollen drift between flowers.", 5.0, 9.0)],
+}
+
+@pytest.fixture
+def session_factory(tmp_path):
+    db_engine = create_async_db_engine(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}")
+
+    async def setup():
+        async with db_engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+        factory = async_sessionmaker(bind=db_engine, expire_on_commit=False)
+        async with factory() as db:
+            for name, segments in LECTURES.items():
+                await async_crud_media.create_with_transcription(
+                    db,
+                    media=MediaCreate(filename=f"{name}.mp4", file_path=f"uploads/{name}.mp4", audio_path=None,
+                                      collection_id=name),
+                    segments=segments,
+                    chunks=[{"text": " ".join(text for text, _, _ in segments), "start_time": 0.0, "end_time": 9.0}]
+                )
+        return factory
+
+    yield asyncio.run(setup())
+    asyncio.run(db_engine.dispose())
+
+def search(session_factory, query, **kwargs):
+    async def run():
+        async with session_factory() as db:
+            return await LexicalSearchService(snippet_tokens=4).search(db, query, **kwargs)
+    return asyncio.run(run())
+
+def test_fts_query():
+    assert fts_query('quantum "distant particles" entangle*') == \
+        '"quantum" OR "distant particles" OR "entangle"*'
+    # Operators and stray syntax are searched as words, never parsed
+    assert fts_query('NOT (physics) AND "unclosed') == '"NOT" OR "physics" OR "AND" OR "unclosed"'
+    assert fts_query('" - ( ') == ""
+
+def test_match_offsets():
+    assert match_offsets("a \x01quick\x02 fox \x01jumps\x02") == ("a quick fox jumps", [[2, 7], [12, 17]])
+
+def test_bm25_ranking_and_highlights(session_factory):
+    results = search(session_factory, "quantum particles")
+    assert [result["media_id"] for result in results] == ["1", "2"]
+    assert results[0]["score"] > results[1]["score"] > 0
+    best = results[0]
+    assert [best["text"][start:end] for start, end in best["highlights"]] == \
+        ["Quantum", "particles", "Quantum", "particles"]
+    assert [best["snippet"][start:end] for start, end in best["snippet_highlights"]] \
+        and len(best["snippet"]) < len(best["text"])
+
+def test_phrases_prefixes_and_stemming(session_factory):
+    assert [r["media_id"] for r in search(session_factory, '"distant particles"')] == ["1"]
+    assert search(session_factory, '"particles distant"') == []
+    assert [r["media_id"] for r in search(session_factory, "photo*")] == ["2"]
+    # Porter stemming: "flower" matches "flowers"
+    assert [r["media_id"] for r in search(session_factory, "flower")] == ["2"]
+
+def test_segments_and_collections(session_factory):
+    segments = search(session_factory, "particles", source="segments")
+    assert {(r["media_id"], r["start_time"]) for r in segments} == {("1", 0.0), ("1", 4.0), ("2", 5.0)}
+    assert [r["media_id"] for r in search(session_factory, "particles", collection_id="biology")] == ["2"]
+
+def test_index_follows_updates_and_deletes(session_factory):
+    async def change():
+        async with session_factory() as db:
+            await db.execute(update(Chunk).where(Chunk.media_id == 2).values(text="Mitochondria"))
+            await db.commit()
+            await async_crud_media.remove_many(db, ids=[1])
+    asyncio.run(change())
+
+    assert search(session_factory, "particles") == []
+    assert [r["media_id"] for r in search(session_factory, "particles", source="segments")] == ["2"]
+    assert [r["media_id"] for r in search(session_factory, "mitochondria")] == ["2"]
+
+def test_stream_yields_search_results(session_factory):
+    async def first(query):
+        async with session_factory() as db:
+            async for result in LexicalSearchService(snippet_tokens=4).stream(db, query):
+                return result
+    assert asyncio.run(first("quantum particles")) == search(session_factory, "quantum particles")[0]
@@ -0,0 +1,181 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pytest
+from app.core.config import settings
+from app.services.embedding import HashingEncoder
+from app.services.opensearch_service import OpenSearchService
+
+TEXTS = [
+    "The Renaissance period in Italy marked a dramatic cultural shift",
+    "Quantum mechanics introduced wave-particle duality",
+    "Coral reefs are bleaching due to rising ocean temperatures",
+]
+
+@pytest.fixture
+def local_service(monkeypatch):
+    monkeypatch.setattr(settings, "OPENSEARCH_BACKEND", "local")
+    return OpenSearchService()
+
+def test_local_backend_round_trip(local_service):
+    encoder = HashingEncoder()
+    for chunk_id, text in enumerate(TEXTS):
+        local_service.index_chunk(chunk_id, media_id=chunk_id % 2, text=text,
+                                  start_time=0.0, end_time=5.0, vector=encoder.encode(text))
+
+    results = local_service.search_similar(encoder.encode(TEXTS[2]), TEXTS[2], k=2)
+    assert results[0]["text"] == TEXTS[2]
+    assert results[0]["score"] == pytest.approx(1.0, abs=1e-5)
+    assert results[0]["score"] >= results[1]["score"]
+
+    # min_score (0-1, like the scores) drops the unrelated chunks
+    assert [result["text"] for result in local_service.search_similar(encoder.encode(TEXTS[2]), TEXTS[2], k=3,
+                                                                      min_score=0.9)] == [TEXTS[2]]
+
+    local_service.delete_by_media_ids([0])
+    remaining = local_service.search_similar(encoder.encode(TEXTS[2]), TEXTS[2], k=5)
+    assert [result["media_id"] for result in remaining] == ["1"]
+
+def test_hashing_encoder_is_deterministic_and_normalized():
+    encoder = HashingEncoder()
+    vectors = encoder.encode(TEXTS)
+    assert vectors.shape == (len(TEXTS), settings.EMBEDDING_DIMENSION)
+    np.testing.assert_allclose(np.linalg.norm(vectors, axis=1), 1.0, rtol=1e-5)
+    np.testing.assert_array_equal(encoder.encode(TEXTS[0]), vectors[0])
+
+def test_collections_are_searched_separately(local_service, monkeypatch):
+    monkeypatch.setattr(local_service, "dedicated_collections", {"big"})
+    encoder = HashingEncoder()
+    placement = {"default": TEXTS[0], "small": TEXTS[1], "big": TEXTS[2]}
+    for media_id, (collection_id, text) in enumerate(placement.items()):
+        local_service.index_chunk(0, media_id=media_id, text=text, start_time=0.0, end_time=5.0,
+                                  vector=encoder.encode(text), collection_id=collection_id)
+
+    assert local_service.search_aliases() == [local_service.index_name, local_service.collection_alias("big")]
+    for collection_id, text in placement.items():
+        results = local_service.search_similar(encoder.encode(TEXTS[0]), TEXTS[0], k=5,
+                                               collection_id=collection_id)
+        assert [result["text"] for result in results] == [text]
+
+    everywhere = local_service.search_similar(encoder.encode(TEXTS[2]), TEXTS[2], k=5)
+    assert len(everywhere) == 3
+    assert everywhere[0]["text"] == TEXTS[2]
+
+    local_service.delete_by_media_ids([2])
+    assert local_service.search_similar(encoder.encode(TEXTS[2]), TEXTS[2], k=5, collection_id="big") == []
+
+def test_local_backend_reindexes(local_service, monkeypatch):
+    from app.services.reindex import ReindexService
+    encoder = HashingEncoder()
+    for chunk_id, text in enumerate(TEXTS):
+        local_service.index_chunk(chunk_id, media_id=0, text=text, start_time=0.0, end_time=5.0,
+                                  vector=encoder.encode(text))
+
+    # Versioned index names have one-second resolution
+    monkeypatch.setattr(time, "strftime", lambda fmt: "20990101000000")
+    result = ReindexService(local_service).run(delete_old=True, batch_size=2, quantization="float16")
+    assert result["copied"] == len(TEXTS)
+    assert local_service.get_alias_indices() == [result["new_index"]]
+    assert local_service.quantization == "float16"
+    results = local_service.search_similar(encoder.encode(TEXTS[1]), TEXTS[1], k=1)
+    assert results[0]["text"] == TEXTS[1]
+
+def test_reindex_catches_up_with_concurrent_writes(local_service, monkeypatch):
+    from app.services.reindex import ReindexService
+    encoder = HashingEncoder()
+    def index(chunk_id, text):
+        local_service.index_chunk(chunk_id, media_id=0, text=text, start_time=0.0, end_time=5.0,
+                                  vector=encoder.encode(text))
+    for chunk_id, text in enumerate(TEXTS):
+        index(chunk_id, text)
+
+    service = ReindexService(local_service)
+    copy, swap = service._copy, local_service.swap_alias
+    def copy_then_write(*args):
+        copied = copy(*args)
+        index(0, "overwritten in place while copying")
+        local_service.client.delete_by_query(index=local_service.index_name,
+                                             body={"query": {"ids": {"values": ["0_1"]}}})
+        return copied
+    def write_around_swap(new_index, **kwargs):
+        index(2, "written just before the swap")
+        swap(new_index, **kwargs)
+        index(2, "written just after the swap")
+    monkeypatch.setattr(service, "_copy", copy_then_write)
+    monkeypatch.setattr(local_service, "swap_alias", write_around_swap)
+    monkeypatch.setattr(time, "strftime", lambda fmt: "20990101000000")
+    service.run(delete_old=True, quantization="float16")
+
+    hits = local_service.client.search(index=local_service.index_name, body={"size": 10})["hits"]["hits"]
+    assert {hit["_id"]: hit["_source"]["text"] for hit in hits} == {
+        "0_0": "overwritten in place while copying",
+        "0_2": "written just after the swap",
+    }
+
+def test_other_processes_follow_a_reindex(local_service, monkeypatch):
+    from app.services.reindex import ReindexService
+    encoder = HashingEncoder()
+    local_service.index_chunk(0, media_id=0, text=TEXTS[0], start_time=0.0, end_time=5.0,
+                              vector=encoder.encode(TEXTS[0]))
+    # Another process: same cluster, its own cached config
+    other = OpenSearchService()
+    other.client = local_service.client
+    other.refresh_index_config()
+
+    monkeypatch.setattr(time, "strftime", lambda fmt: "20990101000000")
+    ReindexService(local_service).run(quantization="int8")
+    other.index_chunk(1, media_id=0, text=TEXTS[1], start_time=0.0, end_time=5.0, vector=encoder.encode(TEXTS[1]))
+    assert other.quantization == "int8"
+    # Calibrated on the stored vectors, whose components are far below 1
+    assert other.index_config.byte_scale == local_service.index_config.byte_scale > 127
+    stored = local_service.client.mget(index=local_service.index_name, body={"ids": ["0_1"]})["docs"][0]
+    assert all(isinstance(value, int) for value in stored["_source"]["my_vector"])
+    assert other.search_similar(encoder.encode(TEXTS[1]), TEXTS[1], k=1)[0]["text"] == TEXTS[1]
+
+def test_small_collection_is_found_despite_post_filtering(local_service):
+    assert local_service.index_config.effective_engine == "nmslib"
+    encoder = HashingEncoder()
+    # Other collections crowd the query's nearest neighbours in the shared index
+    for chunk_id in range(10):
+        text = f"{TEXTS[0]} part {chunk_id}"
+        local_service.index_chunk(chunk_id, media_id=0, text=text, start_time=0.0, end_time=5.0,
+                                  vector=encoder.encode(text))
+    local_service.index_chunk(0, media_id=1, text=TEXTS[1], start_time=0.0, end_time=5.0,
+                              vector=encoder.encode(TEXTS[1]), collection_id="small")
+
+    results = local_service.search_similar(encoder.encode(TEXTS[0]), TEXTS[0], k=3, collection_id="small")
+    assert [result["text"] for result in results] == [TEXTS[1]]
+    assert results[0]["score"] == pytest.approx((float(encoder.encode(TEXTS[0]) @ encoder.encode(TEXTS[1])) + 1) / 2,
+                                                abs=1e-5)
+
+def test_each_alias_is_searched_with_its_own_config(local_service, monkeypatch):
+    from app.services.reindex import ReindexService
+    monkeypatch.setattr(local_service, "dedicated_collections", {"big"})
+    encoder = HashingEncoder()
+    for media_id, (collection_id, text) in enumerate([("default", TEXTS[0]), ("big", TEXTS[2])]):
+        local_service.index_chunk(0, media_id=media_id, text=text, start_time=0.0, end_time=5.0,
+                                  vector=encoder.encode(text), collection_id=collection_id)
+    monkeypatch.setattr(time, "strftime", lambda fmt: "20990101000000")
+    ReindexService(local_service).run(collection_id="big", space_type="l2")
+
+    results = local_service.search_similar(encoder.encode(TEXTS[2]), TEXTS[2], k=2)
+    assert results[0]["text"] == TEXTS[2] and results[0]["score"] == pytest.approx(1.0, abs=1e-5)
+
+def test_concurrent_writes_and_searches(local_service):
+    encoder = HashingEncoder()
+    vectors = encoder.encode(TEXTS)
+
+    def work(media_id):
+        for chunk_id in range(20):
+            local_service.index_chunk(chunk_id, media_id=media_id, text=TEXTS[chunk_id % 3], start_time=0.0,
+                                      end_time=5.0, vector=vectors[chunk_id % 3])
+            local_service.search_similar(vectors[media_id % 3], TEXTS[media_id % 3], k=5)
+        if media_id % 2:
+            local_service.delete_by_media_ids([media_id])
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(work, range(16)))
+    hits = local_service.client.search(index=local_service.index_name, body={"size": 1000})["hits"]["hits"]
+    assert len(hits) == 8 * 20
+    index = local_service.client.indices.indices[local_service.get_alias_indices()[-1]]
+    assert sorted(index.vectors.ids) == sorted(hit["_id"] for hit in hits)
@@ -0,0 +1,46 @@
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+from app.core.metrics import timed, track_stage
+from app.main import app
+
+client = TestClient(app)
+
+def stage_count(stage: str) -> float:
+    return REGISTRY.get_sample_value("pipeline_stage_duration_seconds_count", {"stage": stage}) or 0.0
+
+def stage_errors(stage: str) -> float:
+    return REGISTRY.get_sample_value("pipeline_stage_errors_total", {"stage": stage}) or 0.0
+
+def test_track_stage_counts_errors():
+    before_count, before_errors = stage_count("test_stage"), stage_errors("test_stage")
+    with track_stage("test_stage"):
+        pass
+    with pytest.raises(ValueError):
+        with track_stage("test_stage"):
+            raise ValueError("boom")
+
+    assert stage_count("test_stage") == before_count + 2
+    assert stage_errors("test_stage") == before_errors + 1
+
+def test_timed_decorator_sync_and_async():
+    @timed("test_sync")
+    def add(a, b):
+        return a + b
+
+    @timed("test_async")
+    async def add_async(a, b):
+        return a + b
+
+    assert add(1, 2) == 3
+    assert asyncio.run(add_async(1, 2)) == 3
+    assert stage_count("test_sync") >= 1
+    assert stage_count("test_async") >= 1
+
+def test_metrics_endpoint_reports_request_latency():
+    client.get("/health")
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert 'http_request_duration_seconds_count{method="GET",route="/health",status="200"}' in response.text
@@ -23,49 +23,13 @@ def test_opensearch_connection():
 def test_index_and_search():
     try:
         print("\nSetting up test index...")
-        # Force delete the index if it exists
-        if opensearch_service.client.indices.exists(opensearch_service.index_name):
-            print("Deleting existing index...")
-            opensearch_service.client.indices.delete(opensearch_service.index_name)
+        # Drop every index behind the alias, then let the service build a fresh versioned one
+        for index in opensearch_service.get_alias_indices():
+            print(f"Deleting existing index {index}...")
+            opensearch_service.client.indices.delete(index)
         
-        # Create mapping
-        mapping = {
-            "settings": {
-                "index": {
-                    "knn": True,
-                    "knn.algo_param.ef_search": 100
-                }
-            },
-            "mappings": {
-                "properties": {
-                    "chunk_id": {"type": "keyword"},
-                    "media_id": {"type": "keyword"},
-                    "text": {"type": "text"},
-                    "start_time": {"type": "float"},
-                    "end_time": {"type": "float"},
-                    "my_vector": {
-                        "type": "knn_vector",
-                        "dimension": 384,  # all-MiniLM-L6-v2 dimension
-                        "method": {
-                            "name": "hnsw",
-                            "space_type": "l2",
-                            "engine": "nmslib",
-                            "parameters": {
-                                "ef_construction": 128,
-                                "m": 24
-                            }
-                        }
-                    }
-                }
-            }
-        }
-        
-        # Create index with mapping
         print("Creating new index with k-NN mapping...")
-        opensearch_service.client.indices.create(
-            index=opensearch_service.index_name,
-            body=mapping
-        )
+        opensearch_service._ensure_index()
         
         # Test data - multiple chunks
         test_chunks = [
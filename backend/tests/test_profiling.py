@@ -0,0 +1,58 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+import pytest
+from fastapi.testclient import TestClient
+from app.core.config import settings
+from app.core.metrics import track_stage
+from app.core.profiling import profile_request, list_profiles, current_session
+from app.main import app
+
+client = TestClient(app)
+
+@pytest.fixture(autouse=True)
+def profile_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "PROFILE_DIR", str(tmp_path))
+    return tmp_path
+
+def allocate_stage():
+    with track_stage("test_allocate"):
+        return len([bytearray(1024) for _ in range(1000)])
+
+def test_profile_request_records_stages(profile_dir):
+    with profile_request("unit_test") as session:
+        allocate_stage()
+        # Threadpool stages see the session through the copied context
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            executor.submit(copy_context().run, allocate_stage).result()
+
+    assert current_session.get() is None
+    assert os.path.isfile(profile_dir / f"{session.profile_id}.json")
+    assert os.path.isfile(profile_dir / f"{session.profile_id}.prof")
+
+    stages = session.stages
+    assert [stage["stage"] for stage in stages] == ["test_allocate", "test_allocate"]
+    assert all(stage["peak_alloc_bytes"] >= 1000 * 1024 for stage in stages)
+
+def test_no_session_without_profiling():
+    allocate_stage()
+    assert current_session.get() is None
+    assert list_profiles() == []
+
+def test_profile_endpoints(profile_dir):
+    with profile_request("unit_test") as session:
+        allocate_stage()
+
+    listing = client.get("/api/v1/profiles/").json()
+    assert [profile["id"] for profile in listing] == [session.profile_id]
+
+    summary = client.get(f"/api/v1/profiles/{session.profile_id}").json()
+    assert summary["stages"][0]["stage"] == "test_allocate"
+    assert "top_functions" in summary
+
+    download = client.get(f"/api/v1/profiles/{session.profile_id}/download")
+    assert download.status_code == 200
+    assert len(download.content) > 0
+
+    assert client.get("/api/v1/profiles/..%2Fsecrets").status_code == 404
+    assert client.get("/api/v1/profiles/missing/download").status_code == 404
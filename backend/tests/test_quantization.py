@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+from app.services.quantization import (
+    get_codec, calibrate_byte_scale, to_byte_vector, encode_base64, decode_base64
+)
+from app.services.vector_store import LocalVectorStore
+
+DIMENSION = 384
+
+@pytest.fixture(scope="module")
+def vectors():
+    # Clustered unit vectors resemble sentence embeddings better than pure noise
+    rng = np.random.default_rng(42)
+    centers = rng.normal(size=(20, DIMENSION))
+    data = centers[rng.integers(0, 20, size=2000)] + 0.5 * rng.normal(size=(2000, DIMENSION))
+    return (data / np.linalg.norm(data, axis=1, keepdims=True)).astype(np.float32)
+
+@pytest.mark.parametrize("mode,max_error", [("float16", 1e-3), ("int8", 1e-2)])
+def test_scalar_codecs_round_trip(vectors, mode, max_error):
+    codec = get_codec(mode, DIMENSION)
+    encoded = codec.encode(vectors)
+    decoded = codec.decode(encoded)
+
+    assert encoded.nbytes < vectors.nbytes
+    assert np.abs(decoded - vectors).max() < max_error
+    np.testing.assert_allclose(codec.score(encoded, vectors[0]), decoded @ vectors[0], atol=1e-3)
+
+def test_product_quantizer_compression(vectors):
+    codec = get_codec("pq", DIMENSION, subvectors=48, centroids=64, iterations=5)
+    encoded = codec.fit(vectors).encode(vectors)
+
+    assert encoded.codes.shape == (len(vectors), 48)
+    assert encoded.nbytes == len(vectors) * 48
+    np.testing.assert_allclose(codec.score(encoded, vectors[0]), codec.decode(encoded) @ vectors[0], atol=1e-4)
+
+def test_unknown_mode():
+    with pytest.raises(ValueError):
+        get_codec("int4", DIMENSION)
+
+@pytest.mark.parametrize("mode", ["float32", "float16", "int8", "pq"])
+def test_local_store_recall_with_rescoring(vectors, mode):
+    options = {"subvectors": 48, "centroids": 64, "iterations": 5} if mode == "pq" else {}
+    store = LocalVectorStore(dimension=DIMENSION, quantization=mode, rescore_oversample=8, **options)
+    store.add([str(i) for i in range(len(vectors))], vectors, [{"row": i} for i in range(len(vectors))])
+
+    queries = vectors[:20]
+    exact = np.argsort(-(queries @ vectors.T), axis=1)[:, :10]
+    recall = np.mean([
+        len({r["row"] for r in store.search(query, k=10)} & set(expected)) / 10
+        for query, expected in zip(queries, exact)
+    ])
+    assert recall >= 0.9
+
+def test_local_store_fits_pq_once_it_has_enough_vectors(vectors):
+    store = LocalVectorStore(dimension=DIMENSION, quantization="pq", subvectors=48, centroids=64, iterations=5)
+    store.add(["a", "b"], vectors[:2])
+    assert not store.codec.is_trained
+    assert store.search(vectors[1], k=1)[0]["id"] == "b"
+
+    store.add([str(i) for i in range(2, 100)], vectors[2:100])
+    assert store.codec.is_trained and len(store.encoded) == 100
+    # Codebooks come from all 100 vectors, not copies of the first two
+    assert len(np.unique(store.codec.codebooks[0], axis=0)) == 64
+
+def test_local_store_remove(vectors):
+    store = LocalVectorStore(dimension=DIMENSION, quantization="int8")
+    store.add(["a", "b", "c"], vectors[:3])
+
+    assert store.remove(["b", "missing"]) == 1
+    assert len(store) == 2
+    assert store.search(vectors[1], k=3)[0]["id"] in {"a", "c"}
+
+def test_opensearch_encodings(vectors):
+    byte_vector = to_byte_vector(vectors[0])
+    assert len(byte_vector) == DIMENSION
+    assert all(-128 <= value <= 127 for value in byte_vector)
+    # A calibrated scale spreads the codes over the whole int8 range
+    scale = calibrate_byte_scale(vectors)
+    assert scale > 127
+    calibrated = np.array([to_byte_vector(vector, scale) for vector in vectors])
+    assert np.abs(calibrated).max() == 127
+    assert np.abs(calibrated).max() > 2 * np.abs([to_byte_vector(vector) for vector in vectors]).max()
+    np.testing.assert_array_equal(decode_base64(encode_base64(vectors[0])), vectors[0])
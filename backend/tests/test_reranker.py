@@ -0,0 +1,83 @@
+import pytest
+from app.services.reranker import RerankerService, sigmoid
+from app.services.result_grouping import group_results
+
+class FakeCrossEncoder:
+    """Scores a pair by how many query words the text contains"""
+    def __init__(self):
+        self.pairs_scored = 0
+
+    def predict(self, pairs, batch_size=32):
+        self.pairs_scored += len(pairs)
+        return [len(set(query.split()) & set(text.split())) / 10 for query, text in pairs]
+
+def results(*texts):
+    # Vector scores descending, i.e. the order search_similar returns
+    return [{"text": text, "media_id": "1", "start_time": float(i), "end_time": float(i + 1),
+             "score": 0.9 - i * 0.01} for i, text in enumerate(texts)]
+
+@pytest.fixture
+def reranker():
+    service = RerankerService(budget_ms=1000, batch_size=8, cache_size=100)
+    service._model = FakeCrossEncoder()
+    return service
+
+def test_rerank_reorders_by_cross_encoder_score(reranker):
+    reranked = reranker.rerank("coral reef bleaching", results("solar power", "coral reef bleaching", "reef fish"), k=3)
+    assert [r["text"] for r in reranked] == ["coral reef bleaching", "reef fish", "solar power"]
+    assert reranked[0]["vector_score"] == pytest.approx(0.89)
+    assert reranked[0]["score"] == pytest.approx(sigmoid(0.3))
+
+def test_rerank_caches_per_query_and_chunk(reranker):
+    candidates = results("a b", "b c", "c d")
+    reranker.rerank("b", candidates, k=3)
+    reranker.rerank("b", candidates, k=3)
+    assert reranker._model.pairs_scored == 3
+    reranker.rerank("c", candidates, k=3)
+    assert reranker._model.pairs_scored == 6
+
+def test_budget_truncates_pool_but_keeps_top_k(reranker):
+    reranker.seconds_per_pair = 0.5  # Budget of 1s affords two pairs
+    candidates = results("x", "y", "z", "w", "query match")
+    reranked = reranker.rerank("query match", candidates, k=2)
+    assert reranker._model.pairs_scored == 2
+    # Unscored candidates keep vector order after the re-ranked ones
+    assert [r["text"] for r in reranked] == ["x", "y", "z", "w", "query match"]
+    assert reranked[2]["vector_score"] == pytest.approx(0.88)
+    assert reranked[2]["score"] < reranked[1]["score"]
+
+    reranker.seconds_per_pair = 10.0  # Over budget: the top k are still scored
+    reranker.rerank("other", candidates, k=3)
+    assert reranker._model.pairs_scored == 5
+
+def test_sigmoid():
+    assert sigmoid(0.0) == 0.5
+    assert sigmoid(-1000.0) == 0.0 and sigmoid(1000.0) == 1.0
+    assert sigmoid(-2.0) == pytest.approx(1 - sigmoid(2.0))
+
+def test_grouping_ranks_reranked_media_above_the_unscored_tail():
+    class NegativeCrossEncoder(FakeCrossEncoder):
+        """Logits like ms-marco's: negative unless the text is relevant"""
+        def predict(self, pairs, batch_size=32):
+            return [score * 10 - 5 for score in super().predict(pairs, batch_size)]
+
+    service = RerankerService(budget_ms=1000, batch_size=8, cache_size=100)
+    service._model = NegativeCrossEncoder()
+    service.seconds_per_pair = 0.5  # Budget of 1s affords two pairs: the rest is a tail
+    candidates = results("coral reef", "solar power", "wind power", "tidal power", "coral bleaching")
+    for i, candidate in enumerate(candidates):
+        candidate["media_id"] = ["reef", "energy", "tail", "tail", "reef"][i]
+    reranked = service.rerank("coral reef", candidates, k=2)
+
+    assert [r["text"] for r in reranked[:2]] == ["coral reef", "solar power"]
+    assert reranked[1]["score"] < 0.01  # Logit -5
+    assert all(0 < r["score"] < reranked[1]["score"] for r in reranked[2:])
+    for rank_by in ("best", "sum"):
+        groups = group_results(reranked, rank_by=rank_by)
+        assert [group["media_id"] for group in groups] == ["reef", "energy", "tail"]
+
+def test_cache_is_bounded():
+    service = RerankerService(budget_ms=1000, batch_size=8, cache_size=2)
+    service._model = FakeCrossEncoder()
+    service.rerank("q", results("a", "b", "c"), k=3)
+    assert len(service._cache) == 2
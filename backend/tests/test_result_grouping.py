@@ -0,0 +1,41 @@
+import pytest
+from app.services.result_grouping import group_results, merge_spans
+
+def hit(media_id, start, end, score, text="chunk"):
+    return {"media_id": media_id, "start_time": start, "end_time": end, "score": score, "text": text}
+
+def test_merge_spans_joins_overlapping_and_adjacent_hits():
+    spans = merge_spans([
+        hit("1", 40.0, 50.0, 0.7, "late"),
+        hit("1", 0.0, 10.0, 0.8, "first"),
+        hit("1", 8.0, 20.0, 0.9, "overlap"),
+        hit("1", 20.5, 30.0, 0.6, "adjacent"),
+    ], merge_gap=1.0)
+    assert [(s["start_time"], s["end_time"], s["hit_count"]) for s in spans] == [(0.0, 30.0, 3), (40.0, 50.0, 1)]
+    assert spans[0]["score"] == 0.9
+    assert spans[0]["text"] == "overlap"
+
+def test_group_results_ranking_modes():
+    results = [
+        hit("a", 0, 10, 0.95),
+        hit("b", 0, 10, 0.80),
+        hit("b", 100, 110, 0.78),
+        hit("b", 200, 210, 0.77),
+    ]
+    best = group_results(results, rank_by="best", merge_gap=1.0)
+    assert [g["media_id"] for g in best] == ["a", "b"]
+
+    aggregate = group_results(results, rank_by="sum", merge_gap=1.0)
+    assert [g["media_id"] for g in aggregate] == ["b", "a"]
+    assert aggregate[0]["score"] == pytest.approx(2.35)
+
+def test_group_results_caps_spans_and_filters_scores():
+    results = [hit("a", i * 100, i * 100 + 10, 0.9 - i * 0.01) for i in range(5)] + [hit("c", 0, 10, 0.2)]
+    groups = group_results(results, max_hits_per_media=2, min_score=0.5)
+    assert [g["media_id"] for g in groups] == ["a"]
+    assert groups[0]["hit_count"] == 5
+    assert [span["start_time"] for span in groups[0]["spans"]] == [0, 100]
+
+def test_group_results_rejects_unknown_mode():
+    with pytest.raises(ValueError):
+        group_results([], rank_by="median")
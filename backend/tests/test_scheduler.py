@@ -0,0 +1,81 @@
+import asyncio
+import threading
+import time
+from app.services.scheduler import JobScheduler, threads_per_job
+
+def run_jobs(scheduler: JobScheduler, jobs):
+    """Submit (name, kwargs) jobs behind a blocker; return names in the order they ran"""
+    order = []
+    release = threading.Event()
+
+    async def main():
+        blocker = asyncio.create_task(scheduler.run(release.wait))
+        await asyncio.sleep(0.01)  # Let the blocker take the only slot
+        tasks = [asyncio.create_task(scheduler.run(order.append, name, **kwargs)) for name, kwargs in jobs]
+        await asyncio.sleep(0.01)  # Everything is queued before the slot frees up
+        release.set()
+        await asyncio.gather(blocker, *tasks)
+
+    asyncio.run(main())
+    return order
+
+def test_interactive_before_batch_and_short_before_long():
+    scheduler = JobScheduler("test", slots=1)
+    order = run_jobs(scheduler, [
+        ("batch", {"priority": "batch", "cost": 1}),
+        ("long", {"priority": "interactive", "cost": 600}),
+        ("short", {"priority": "interactive", "cost": 10}),
+    ])
+    assert order == ["short", "long", "batch"]
+
+def test_fair_queuing_across_tenants():
+    scheduler = JobScheduler("test", slots=1)
+    jobs = [(f"a{i}", {"tenant": "a", "cost": 10}) for i in range(3)]
+    jobs += [(f"b{i}", {"tenant": "b", "cost": 10}) for i in range(3)]
+    order = run_jobs(scheduler, jobs)
+    # Tenant b's jobs interleave with a's instead of waiting behind all of them
+    assert order == ["a0", "b0", "a1", "b1", "a2", "b2"]
+
+def test_slots_bound_concurrency():
+    scheduler = JobScheduler("test", slots=2)
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def job():
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+        time.sleep(0.02)
+        with lock:
+            active -= 1
+
+    async def main():
+        await asyncio.gather(*(scheduler.run(job) for _ in range(6)))
+
+    asyncio.run(main())
+    assert peak == 2
+    assert scheduler.running == 0
+
+def test_cancelled_waiter_does_not_leak_slot():
+    scheduler = JobScheduler("test", slots=1)
+    release = threading.Event()
+
+    async def main():
+        blocker = asyncio.create_task(scheduler.run(release.wait))
+        await asyncio.sleep(0.01)
+        waiter = asyncio.create_task(scheduler.run(lambda: None))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        release.set()
+        await blocker
+        assert await scheduler.run(lambda: "ran") == "ran"
+
+    asyncio.run(main())
+    assert scheduler.running == 0
+
+def test_threads_per_job():
+    assert threads_per_job(8, 2) == 4
+    assert threads_per_job(2, 4) == 1
+    assert threads_per_job(0, 1) >= 1
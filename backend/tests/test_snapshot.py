@@ -0,0 +1,134 @@
+import numpy as np
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+from app.core.config import settings
+from app.models import Base
+from app.models.media import Media, Transcription, TranscriptionSegment, Chunk, AudioFingerprint
+from app.services.dedup import dedup_service
+from app.services.embedding import HashingEncoder
+from app.services.opensearch_service import OpenSearchService
+from app.services.snapshot import SnapshotService, pack_strings, unpack_strings
+
+TEXTS = ["Grüße aus München, the lecture starts now", "Photosynthesis converts light into sugar", ""]
+
+@pytest.fixture
+def make_node(tmp_path, monkeypatch):
+    """A database and local chunk index, as on one environment"""
+    monkeypatch.setattr(settings, "OPENSEARCH_BACKEND", "local")
+    engines = []
+    def make(name):
+        engine = create_engine(f"sqlite:///{tmp_path / name}.db")
+        Base.metadata.create_all(engine)
+        engines.append(engine)
+        session_factory = sessionmaker(bind=engine, expire_on_commit=False)
+        return SnapshotService(OpenSearchService(), session_factory)
+    yield make
+    for engine in engines:
+        engine.dispose()
+
+def populate(node):
+    encoder = HashingEncoder()
+    search = node.search_service
+    with node.session_factory() as db:
+        for media_id, collection_id in ((3, "default"), (7, "lectures")):
+            db.add(Media(
+                id=media_id, filename=f"{media_id}.mp4", file_path=f"uploads/{media_id}.mp4",
+                audio_path=None if media_id == 3 else f"uploads/{media_id}.flac",
+                collection_id=collection_id,
+                transcription=Transcription(segments=[
+                    TranscriptionSegment(text=text, start_time=i, end_time=i + 1) for i, text in enumerate(TEXTS)
+                ]),
+                chunks=[Chunk(id=media_id * 10 + i, text=TEXTS[i], start_time=i, end_time=i + 1) for i in range(2)],
+                fingerprints=[AudioFingerprint(hash=media_id * 100 + i, frame=i) for i in range(5)]
+            ))
+        db.commit()
+    # As IngestService._store_window indexes them: document chunk ids count
+    # segments, unrelated to the ids of the chunk rows
+    for media_id, collection_id in ((3, "default"), (7, "lectures")):
+        search.index_chunk(0, media_id, TEXTS[0], 0.0, 1.0, encoder.encode(TEXTS[0]),
+                           collection_id=collection_id, signature=dedup_service.signature(TEXTS[0]))
+    search.index_chunk(1, 3, TEXTS[1], 1.0, 2.0, encoder.encode(TEXTS[1]))
+    search.index_duplicate(1, 7, TEXTS[1], 1.0, 2.0, {"id": "7_0", "media_id": "7"}, collection_id="lectures")
+
+def documents(node):
+    client = node.client
+    return {
+        hit["_id"]: hit["_source"]
+        for hit in client.search(index=node.search_service.search_aliases(), body={"size": 100})["hits"]["hits"]
+    }
+
+def rows(node):
+    queries = [
+        select(Media.id, Media.filename, Media.file_path, Media.audio_path, Media.collection_id, Media.created_at),
+        select(Transcription.media_id, TranscriptionSegment.text, TranscriptionSegment.start_time)
+        .join(TranscriptionSegment, TranscriptionSegment.transcription_id == Transcription.id),
+        select(Chunk.id, Chunk.media_id, Chunk.text, Chunk.start_time, Chunk.end_time),
+        select(AudioFingerprint.media_id, AudioFingerprint.hash, AudioFingerprint.frame),
+    ]
+    with node.session_factory() as db:
+        return [sorted(tuple(row) for row in db.execute(query).all()) for query in queries]
+
+def test_pack_strings_round_trip():
+    values = ["a", None, "", "Grüße", "x" * 1000]
+    assert unpack_strings(pack_strings("text", values), "text") == values
+    assert unpack_strings(pack_strings("text", []), "text") == []
+
+def test_snapshot_round_trip(make_node, tmp_path):
+    source = make_node("source")
+    populate(source)
+    result = source.export(str(tmp_path / "snapshot"), batch_size=2)
+    assert result["counts"] == {"media": 2, "segments": 6, "chunks": 4, "fingerprints": 10,
+                                "documents": 4, "vectors": 3}
+    vectors = np.load(tmp_path / "snapshot" / "vectors.npy", mmap_mode="r")
+    assert vectors.shape == (3, settings.EMBEDDING_DIMENSION) and vectors.dtype == np.float32
+
+    target = make_node("target")
+    target.import_snapshot(str(tmp_path / "snapshot"), batch_size=2)
+    assert rows(target) == rows(source)
+    assert documents(target) == documents(source)
+
+    # Searches on the new node find the same chunks without embedding anything
+    query = HashingEncoder().encode(TEXTS[1])
+    assert target.search_service.search_similar(query, TEXTS[1], k=3) == \
+        source.search_service.search_similar(query, TEXTS[1], k=3)
+
+def test_collection_export(make_node, tmp_path):
+    source = make_node("source")
+    populate(source)
+    result = source.export(str(tmp_path / "snapshot"), collection_id="lectures")
+    assert (result["counts"]["media"], result["counts"]["chunks"], result["counts"]["vectors"]) == (1, 2, 1)
+
+    target = make_node("target")
+    target.import_snapshot(str(tmp_path / "snapshot"))
+    assert set(documents(target)) == {"7_0", "7_1"}
+
+def test_import_refuses_clashes_and_other_models(make_node, tmp_path, monkeypatch):
+    source = make_node("source")
+    populate(source)
+    source.export(str(tmp_path / "snapshot"))
+
+    # The same ids are in the source database already; nothing is loaded twice
+    with pytest.raises(ValueError, match="already exist"):
+        source.import_snapshot(str(tmp_path / "snapshot"))
+
+    target = make_node("target")
+    monkeypatch.setattr(settings, "EMBEDDING_MODEL", "another-model")
+    with pytest.raises(ValueError, match="embeddings are from"):
+        target.import_snapshot(str(tmp_path / "snapshot"))
+    with pytest.raises(ValueError, match="No snapshot"):
+        target.import_snapshot(str(tmp_path))
+
+def test_failed_import_loads_nothing(make_node, tmp_path, monkeypatch):
+    source = make_node("source")
+    populate(source)
+    source.export(str(tmp_path / "snapshot"))
+
+    target = make_node("target")
+    def fail(*args, **kwargs):
+        raise RuntimeError("bulk request failed")
+    monkeypatch.setattr(target, "_load_documents", fail)
+    with pytest.raises(RuntimeError):
+        target.import_snapshot(str(tmp_path / "snapshot"))
+    with target.session_factory() as db:
+        assert db.execute(select(Media.id)).all() == []
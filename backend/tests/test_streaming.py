@@ -0,0 +1,105 @@
+import subprocess
+import wave
+import numpy as np
+import pytest
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.testclient import TestClient
+from app.services.streaming import parse_range, byte_offset, stream_file, wav_layout
+
+def test_parse_range():
+    assert parse_range(None, 100) is None
+    assert parse_range("bytes=0-9", 100) == (0, 9)
+    assert parse_range("bytes=90-", 100) == (90, 99)
+    assert parse_range("bytes=50-500", 100) == (50, 99)
+    assert parse_range("bytes=-10", 100) == (90, 99)
+    assert parse_range("bytes=-500", 100) == (0, 99)
+    # Multiple ranges and other units are ignored: the whole file is sent
+    assert parse_range("bytes=0-1,5-6", 100) is None
+    assert parse_range("items=0-1", 100) is None
+    for header in ("bytes=100-", "bytes=9-5", "bytes=-0", "bytes=x-", "bytes=-"):
+        with pytest.raises(HTTPException) as error:
+            parse_range(header, 100)
+        assert error.value.status_code == 416
+        assert error.value.headers["Content-Range"] == "bytes */100"
+
+def write_wav(path, seconds, rate=16000):
+    with wave.open(str(path), "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        # Each sample holds its index (mod 2**15), so offsets can be checked
+        wav.writeframes((np.arange(int(seconds * rate)) % 32768).astype(np.int16).tobytes())
+
+def test_wav_byte_offset_is_frame_exact(tmp_path):
+    path = tmp_path / "audio.wav"
+    write_wav(path, 10)
+    layout = wav_layout(str(path))
+    assert (layout.data_start, layout.byte_rate, layout.block_align) == (44, 32000, 2)
+
+    offset, exact = byte_offset(str(path), 2.5, 10.0)
+    assert exact and offset == 44 + 2.5 * 32000
+    with open(path, "rb") as f:
+        f.seek(offset)
+        assert np.frombuffer(f.read(2), dtype=np.int16)[0] == 2.5 * 16000 % 32768
+    assert byte_offset(str(path), 60, 10.0)[0] == path.stat().st_size - 1
+
+def test_compressed_byte_offset_is_interpolated(tmp_path, monkeypatch):
+    path = tmp_path / "video.mp4"
+    path.write_bytes(b"\0" * 1000)
+    def no_ffprobe(*args, **kwargs):
+        raise FileNotFoundError("ffprobe")
+    monkeypatch.setattr(subprocess, "run", no_ffprobe)
+    assert byte_offset(str(path), 2.5, 10.0) == (250, False)
+
+def test_compressed_byte_offset_is_the_keyframe_position(tmp_path, monkeypatch):
+    path = tmp_path / "video.mp4"
+    path.write_bytes(b"\0" * 1000)
+    commands = []
+    def ffprobe(command, **kwargs):
+        commands.append(command)
+        return subprocess.CompletedProcess(command, 0, stdout="612,K_\n")
+    monkeypatch.setattr(subprocess, "run", ffprobe)
+    assert byte_offset(str(path), 2.5, 10.0) == (612, True)
+    assert "2.500%+#1" in commands[0]
+
+@pytest.fixture
+def client(tmp_path):
+    path = tmp_path / "media.bin"
+    path.write_bytes(bytes(range(256)) * 4096)
+    app = FastAPI()
+
+    @app.api_route("/file", methods=["GET", "HEAD"])
+    async def serve(request: Request):
+        return stream_file(str(path), request.headers)
+
+    return TestClient(app)
+
+def test_range_requests(client):
+    full = client.get("/file")
+    assert full.status_code == 200
+    assert full.headers["accept-ranges"] == "bytes"
+    assert len(full.content) == 256 * 4096
+
+    part = client.get("/file", headers={"Range": "bytes=1000-300999"})
+    assert part.status_code == 206
+    assert part.headers["content-range"] == f"bytes 1000-300999/{256 * 4096}"
+    assert part.content == full.content[1000:301000]
+
+    head = client.head("/file", headers={"Range": "bytes=0-99"})
+    assert head.headers["content-length"] == "100"
+    assert head.content == b""
+
+    assert client.get("/file", headers={"Range": f"bytes={256 * 4096}-"}).status_code == 416
+
+def test_conditional_requests(client):
+    response = client.get("/file", headers={"Range": "bytes=0-9"})
+    etag, last_modified = response.headers["etag"], response.headers["last-modified"]
+
+    assert client.get("/file", headers={"If-None-Match": etag}).status_code == 304
+    assert client.get("/file", headers={"If-None-Match": f"W/{etag}"}).status_code == 304
+    assert client.get("/file", headers={"If-Modified-Since": last_modified}).status_code == 304
+    assert client.get("/file", headers={"If-None-Match": '"stale"'}).status_code == 200
+
+    # If-Range: a range of an outdated copy gets the whole file instead
+    assert client.get("/file", headers={"Range": "bytes=0-9", "If-Range": etag}).status_code == 206
+    assert client.get("/file", headers={"Range": "bytes=0-9", "If-Range": '"stale"'}).status_code == 200
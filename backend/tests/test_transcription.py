@@ -1,5 +1,8 @@
 import pytest
-from app.services.transcription import TranscriptionService
+from fastapi import HTTPException
+from app.services.transcription import (
+    TranscriptionService, DecodingOptions, FALLBACK_TEMPERATURES, TRANSCRIPTION_TIERS, resolve_tier
+)
 from pydub import AudioSegment
 
 @pytest.fixture
@@ -28,4 +31,26 @@ def test_transcribe_audio(test_audio_with_speech):
         assert len(segment) == 3  # (text, start_time, end_time)
         assert isinstance(segment[0], str)  # text
         assert isinstance(segment[1], float)  # start_time
-        assert isinstance(segment[2], float)  # end_time 
\ No newline at end of file
+        assert isinstance(segment[2], float)  # end_time 
+
+
+def test_resolve_tier_model_override():
+    assert resolve_tier() == (None, None)
+    model_size, options = resolve_tier("fast")
+    assert (model_size, options) == TRANSCRIPTION_TIERS["fast"]
+    assert resolve_tier("accurate", "base")[0] == "base"
+    with pytest.raises(HTTPException):
+        resolve_tier("ultra")
+    with pytest.raises(HTTPException):
+        resolve_tier(model_size="large-v3")
+
+def test_decoding_options_kwargs():
+    greedy = DecodingOptions(beam_size=0, condition_on_previous_text=False, temperature_fallback=False)
+    assert greedy.whisper_kwargs()["temperature"] == 0.0
+    assert "beam_size" not in greedy.whisper_kwargs()
+    assert greedy.faster_whisper_kwargs()["beam_size"] == 1
+
+    beam = DecodingOptions(beam_size=5)
+    assert beam.whisper_kwargs()["beam_size"] == 5
+    assert beam.whisper_kwargs()["temperature"] == FALLBACK_TEMPERATURES
+    assert DecodingOptions.from_settings(beam_size=3, temperature_fallback=None).beam_size == 3
@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+from pydub import AudioSegment
+from app.services.media_processor import MediaProcessor
+from app.services.vad import SpeechTimeline, VoiceActivityDetector
+
+SAMPLE_RATE = 16000
+
+def tone(seconds: float, amplitude: float = 0.3, freq: float = 220.0) -> np.ndarray:
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    return (amplitude * np.sin(2 * np.pi * freq * t)).astype(np.float32)
+
+def quiet(seconds: float) -> np.ndarray:
+    rng = np.random.default_rng(0)
+    return (rng.normal(scale=1e-4, size=int(seconds * SAMPLE_RATE))).astype(np.float32)
+
+@pytest.fixture
+def detector():
+    return VoiceActivityDetector(frame_ms=30, min_speech_ms=200, min_silence_ms=500, padding_ms=0)
+
+def test_detects_speech_regions(detector):
+    samples = np.concatenate([quiet(1.0), tone(1.0), quiet(2.0), tone(1.5), quiet(1.0)])
+    regions = detector.detect(samples, SAMPLE_RATE)
+    np.testing.assert_allclose(regions, [[1.0, 2.0], [4.0, 5.5]], atol=0.04)
+
+def test_bridges_short_pauses_and_drops_blips(detector):
+    samples = np.concatenate([quiet(1.0), tone(1.0), quiet(0.2), tone(1.0), quiet(1.0), tone(0.06), quiet(1.0)])
+    regions = detector.detect(samples, SAMPLE_RATE)
+    assert len(regions) == 1
+    np.testing.assert_allclose(regions[0], [1.0, 3.2], atol=0.04)
+
+def test_silence_and_constant_level_audio(detector):
+    assert len(detector.detect(np.zeros(SAMPLE_RATE * 2, dtype=np.float32), SAMPLE_RATE)) == 0
+    # A recording with no quiet parts is all speech rather than all noise floor
+    regions = detector.detect(tone(3.0), SAMPLE_RATE)
+    np.testing.assert_allclose(regions, [[0.0, 3.0]], atol=0.04)
+
+def test_padding_merges_overlapping_regions():
+    detector = VoiceActivityDetector(frame_ms=30, min_speech_ms=200, min_silence_ms=100, padding_ms=300)
+    samples = np.concatenate([quiet(1.0), tone(1.0), quiet(0.45), tone(1.0), quiet(1.0)])
+    regions = detector.detect(samples, SAMPLE_RATE)
+    assert len(regions) == 1
+    np.testing.assert_allclose(regions[0], [0.7, 3.75], atol=0.04)
+
+def test_timeline_maps_segments_back():
+    timeline = SpeechTimeline(regions=np.array([[1.0, 2.0], [4.0, 5.5]]), offsets=np.array([0.0, 1.0]))
+    assert timeline.speech_seconds == pytest.approx(2.5)
+    segments = timeline.map_segments([("first", 0.0, 1.0), ("second", 1.0, 2.0), ("spanning", 0.5, 1.5)])
+    assert segments == [("first", 1.0, 2.0), ("second", 4.0, 5.0), ("spanning", 1.5, 4.5)]
+
+def test_extract_speech_writes_compacted_audio(tmp_path, detector):
+    samples = np.concatenate([quiet(3.0), tone(1.0), quiet(3.0)])
+    audio = AudioSegment((samples * 32767).astype(np.int16).tobytes(), frame_rate=SAMPLE_RATE,
+                         sample_width=2, channels=1)
+    audio_path = str(tmp_path / "clip.wav")
+    audio.export(audio_path, format="wav")
+
+    speech_path, timeline = detector.extract_speech(audio_path)
+    assert speech_path != audio_path
+    assert AudioSegment.from_file(speech_path).duration_seconds == pytest.approx(1.0, abs=0.05)
+    assert timeline.to_original(0.5) == pytest.approx(3.5, abs=0.05)
+
+def test_block_features_match_whole_recording(detector):
+    samples = np.concatenate([quiet(1.0), tone(1.3), quiet(0.7)])
+    # Block edges fall mid-frame
+    blocks = np.split(samples, [1000, 1001, 7777, 20000])
+    energy_db, zcr, n_samples = detector.stream_features(blocks, SAMPLE_RATE)
+    expected_energy, expected_zcr = detector.frame_features(samples, SAMPLE_RATE)
+    assert n_samples == len(samples)
+    np.testing.assert_allclose(energy_db, expected_energy, rtol=1e-5)
+    np.testing.assert_array_equal(zcr, expected_zcr)
+
+def test_extract_speech_in_small_blocks(tmp_path, detector, monkeypatch):
+    samples = np.concatenate([quiet(2.0), tone(1.0), quiet(2.0), tone(0.8, freq=330.0), quiet(2.0)])
+    audio_path = str(tmp_path / "clip.wav")
+    AudioSegment((samples * 32767).astype(np.int16).tobytes(), frame_rate=SAMPLE_RATE,
+                 sample_width=2, channels=1).export(audio_path, format="wav")
+
+    speech_path, _ = detector.extract_speech(audio_path)
+    whole = AudioSegment.from_file(speech_path).raw_data
+    monkeypatch.setattr(detector, "stream_samples",
+                        lambda path: MediaProcessor.stream_samples(path, SAMPLE_RATE, block_seconds=0.37))
+    speech_path, timeline = detector.extract_speech(audio_path)
+    assert AudioSegment.from_file(speech_path).raw_data == whole
+    assert len(whole) // 2 == pytest.approx(timeline.speech_seconds * SAMPLE_RATE, abs=len(timeline.regions))